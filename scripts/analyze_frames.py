@@ -2,47 +2,42 @@
 """
 Analyze extracted slot machine frames using multimodal LLM.
 Writes analysis results to analysis.md
+
+Frames are walked lazily and sent one per request on a bounded worker pool
+(llm_client.LLMClient: concurrency, rate limit, retries, response cache,
+downscaled payloads). Each finished analysis is appended to analysis.md as
+soon as it completes, then recorded in analysis.md.progress.jsonl; a rerun
+skips frames already in the checkpoint, so an interrupted run resumes where it
+stopped. Frames whose request failed are not checkpointed and are retried.
+A frame that changed on disk since it was analyzed has its old section removed
+from analysis.md (and the checkpoint) before it is analyzed again.
+
+Usage:
+  python3 scripts/analyze_frames.py yt/CLEOPATRA/frames
+  python3 scripts/analyze_frames.py yt/CLEOPATRA/frames --llm-concurrency 8 --limit 20
+  python3 scripts/analyze_frames.py yt/CLEOPATRA/frames --restart   # ignore the checkpoint
+
+Offline: point --moonshot-base-url at `python3 scripts/llm_client.py --stub-port 8765`.
 """
 
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
 import os
-import sys
-import glob
-import base64
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from llm_client import LLMClient, add_llm_client_args, client_from_args
 
-# Configuration — hardcoded to CLEOPATRA
 VIDEO_NAME = "CLEOPATRA"
-FRAMES_DIR = sys.argv[1] if len(sys.argv) > 1 else f"yt/{VIDEO_NAME}/frames"
-OUTPUT_FILE = Path(FRAMES_DIR).parent / "analysis.md"
-
-def encode_image(image_path):
-    """Encode image to base64"""
-    with open(image_path, "rb") as f:
-        return base64.b64encode(f.read()).decode('utf-8')
-
-def analyze_frames():
-    """Analyze all frames in the directory"""
-    frames_dir = Path(FRAMES_DIR)
-    
-    if not frames_dir.exists():
-        print(f"Error: Frames directory not found: {frames_dir}")
-        sys.exit(1)
-    
-    # Get all image files
-    image_extensions = ['*.png', '*.jpg', '*.jpeg', '*.webp']
-    frame_files = []
-    for ext in image_extensions:
-        frame_files.extend(glob.glob(str(frames_dir / ext)))
-    
-    if not frame_files:
-        print(f"No image files found in {frames_dir}")
-        sys.exit(1)
-    
-    frame_files.sort()
-    print(f"Found {len(frame_files)} frames to analyze")
-    
-    # Build analysis prompt
-    analysis_prompt = """Analyze these slot machine video frames and extract detailed information:
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+ANALYSIS_PROMPT = """Analyze this slot machine video frame and extract detailed information:
 
 ## Analysis Requirements
 
@@ -71,58 +66,207 @@ def analyze_frames():
 - Possible paytable structure
 - Volatility indicators
 
-Format as markdown with clear sections. Be specific about what you can see vs. what you're inferring."""
+Format as markdown with clear sections (use #### headings or lower). Be specific about what you can see vs. what you're inferring."""
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Stream frames through a multimodal LLM into analysis.md.")
+    parser.add_argument("frames_dir", nargs="?", default=f"yt/{VIDEO_NAME}/frames")
+    parser.add_argument("--video-name", default=VIDEO_NAME)
+    parser.add_argument("--output", default=None, help="Markdown output (default: <frames_dir>/../analysis.md)")
+    parser.add_argument("--limit", type=int, default=0, help="Analyze at most N pending frames this run.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start a new analysis.md.")
+    parser.add_argument("--llm-model", default="kimi-k2.5")
+    parser.add_argument("--moonshot-base-url", default="https://api.moonshot.ai/v1")
+    add_llm_client_args(parser)
+    return parser.parse_args()
+
+
+def iter_frames(frames_dir: Path) -> Iterator[Path]:
+    """Image files in name order; only names are listed up front, never contents."""
+    names = sorted(
+        entry.name
+        for entry in os.scandir(frames_dir)
+        if entry.is_file() and Path(entry.name).suffix.lower() in IMAGE_EXTENSIONS
+    )
+    for name in names:
+        yield frames_dir / name
+
+
+def frame_stamp(path: Path) -> str:
+    st = path.stat()
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def load_checkpoint(path: Path) -> Dict[str, str]:
+    """frame name -> stamp for every frame already written to analysis.md."""
+    done: Dict[str, str] = {}
+    if not path.exists():
+        return done
+    raw = path.read_bytes()
+    if raw and not raw.endswith(b"\n"):
+        # Drop a torn last line from an interrupted run, or the next record would be appended to it.
+        raw = raw[: raw.rfind(b"\n") + 1]
+        with path.open("r+b") as fh:
+            fh.truncate(len(raw))
+    for line in raw.decode("utf-8").splitlines():
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        done[str(rec["frame"])] = str(rec.get("stamp", ""))
+    return done
 
-    # Write the prompt and frame list to output
-    output = f"""# Slot Machine Frame Analysis
+
+def drop_frames(output_file: Path, checkpoint_file: Path, names: Set[str]) -> None:
+    """Remove the `### <name>` sections and checkpoint records of `names`, rewriting both files atomically."""
+    text = output_file.read_text(encoding="utf-8")
+    # Frame sections start with "### name"; the prompt keeps the LLM's own headings at #### or lower.
+    parts = re.split(r"(?m)^(?=### )", text)
+    kept = [part for part in parts if not (part.startswith("### ") and part[4:].split("\n", 1)[0].strip() in names)]
+    records: List[str] = []
+    for line in checkpoint_file.read_text(encoding="utf-8").splitlines():
+        try:
+            if str(json.loads(line)["frame"]) in names:
+                continue
+        except (ValueError, KeyError):
+            continue
+        records.append(line + "\n")
+    for path, content in ((output_file, "".join(kept)), (checkpoint_file, "".join(records))):
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(content, encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def write_header(out: TextIO, frames_dir: Path, video_name: str, model: str) -> None:
+    out.write(
+        f"""# Slot Machine Frame Analysis
 
 ## Source
-- Video: {VIDEO_NAME}.webm
-- Frames analyzed: {len(frame_files)}
-- Frame timestamps: {[Path(f).stem for f in frame_files]}
+- Video: {video_name}.webm
+- Frames: `{frames_dir}`
+- Model: {model}
 
 ## Analysis Prompt
-{analysis_prompt}
+{ANALYSIS_PROMPT}
 
-## Frame Files
+## Frame Analyses
 """
-    for frame in frame_files:
-        output += f"- `{Path(frame).name}`\n"
-    
-    output += """
-## Manual Analysis Required
+    )
+    out.flush()
 
-The following analysis requires the multimodal LLM Kimi K-2.5 (Moonshot).
 
-To complete analysis, run:
-```python
-import openclaw
+def analyze_frame(client: LLMClient, frame: Path) -> str:
+    return client.chat([{"type": "text", "text": ANALYSIS_PROMPT}, client.image_part(frame)])
 
-# Analyze frames with vision model
-for frame in frame_files:
-    result = openclaw.image.analyze(frame, prompt=analysis_prompt)
-    # Append to analysis.md
-```
 
-Or manually review frames at:
-""" + str(frames_dir) + """
+def append_result(out: TextIO, checkpoint: TextIO, frame: Path, stamp: str, text: str, seconds: float) -> None:
+    """analysis.md first, then the checkpoint: a crash in between re-analyzes, never loses, a frame."""
+    out.write(f"\n### {frame.name}\n\n{text.strip()}\n")
+    out.flush()
+    os.fsync(out.fileno())
+    checkpoint.write(json.dumps({"frame": frame.name, "stamp": stamp, "seconds": round(seconds, 2)}) + "\n")
+    checkpoint.flush()
+    os.fsync(checkpoint.fileno())
+
+
+def analyze_frames() -> None:
+    """Analyze all pending frames in the directory"""
+    args = parse_args()
+    frames_dir = Path(args.frames_dir).expanduser().resolve()
+    if not frames_dir.is_dir():
+        raise SystemExit(f"Error: Frames directory not found: {frames_dir}")
+    output_file = Path(args.output).expanduser().resolve() if args.output else frames_dir.parent / "analysis.md"
+    checkpoint_file = output_file.with_name(output_file.name + ".progress.jsonl")
+
+    if args.restart or not output_file.exists():
+        output_file.unlink(missing_ok=True)
+        checkpoint_file.unlink(missing_ok=True)  # a checkpoint without its analysis.md is meaningless
+    done = load_checkpoint(checkpoint_file)
+    changed = {
+        name
+        for name, stamp in done.items()
+        if (frames_dir / name).is_file() and frame_stamp(frames_dir / name) != stamp
+    }
+    if changed:
+        print(f"{len(changed)} frames changed since they were analyzed; replacing their sections")
+        drop_frames(output_file, checkpoint_file, changed)
+        for name in changed:
+            del done[name]
+
+    def pending() -> Iterator[Tuple[Path, str]]:
+        queued = 0
+        for frame in iter_frames(frames_dir):
+            stamp = frame_stamp(frame)
+            if done.get(frame.name) == stamp:
+                continue
+            if args.limit and queued >= args.limit:
+                return
+            queued += 1
+            yield frame, stamp
+
+    frames = pending()
+    first = next(frames, None)
+    if first is None:
+        print(f"Nothing to analyze: all {len(done)} frames are already in {output_file}")
+        return
+    frames = itertools.chain([first], frames)
+
+    client = client_from_args(args)
+    if client is None:
+        raise SystemExit("MOONSHOT_API_KEY is not set; nothing can be analyzed.")
+
+    # No checkpoint means this run did not write the file: it is new or hand-written, so add our header.
+    fresh = not checkpoint_file.exists()
+    prior = output_file.exists() and output_file.stat().st_size > 0
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    completed = failed = 0
+    with output_file.open("a", encoding="utf-8") as out, checkpoint_file.open("a", encoding="utf-8") as checkpoint:
+        if fresh:
+            if prior:
+                out.write("\n")
+            write_header(out, frames_dir, args.video_name, args.llm_model)
+        elif done:
+            print(f"Resuming: {len(done)} frames already in {output_file.name}")
+
+        # Keep at most 2x concurrency frames in flight so memory stays flat on huge dirs.
+        window = max(1, client.concurrency) * 2
+        inflight: Dict[Future, Tuple[Path, str, float]] = {}
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=client.concurrency) as pool:
+            while inflight or not exhausted:
+                while not exhausted and len(inflight) < window:
+                    item: Optional[Tuple[Path, str]] = next(frames, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    frame, stamp = item
+                    inflight[pool.submit(analyze_frame, client, frame)] = (frame, stamp, time.perf_counter())
+                if not inflight:
+                    break
+                finished, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    frame, stamp, submitted = inflight.pop(fut)
+                    try:
+                        text = fut.result()
+                    except Exception as exc:  # one bad frame must not abort the run
+                        failed += 1
+                        print(f"[WARN] {frame.name}: {exc}")
+                        continue
+                    append_result(out, checkpoint, frame, stamp, text, time.perf_counter() - submitted)
+                    completed += 1
+                    print(f"[{completed}] {frame.name}")
+
+    client.close()
+    elapsed = time.perf_counter() - started
+    print(
+        f"Analyzed {completed} frames in {elapsed:.1f}s ({completed / max(elapsed, 1e-9):.2f} frames/s), "
+        f"{failed} failed (rerun to retry)"
+    )
+    print(client.summary())
+    print(f"Analysis written to: {output_file}")
 
-## Frame Previews
-"""
-    
-    # Add base64 encoded images (first few for reference)
-    for frame in frame_files[:5]:
-        encoded = encode_image(frame)
-        output += f"\n### {Path(frame).name}\n"
-        output += f"![{Path(frame).name}](data:image/png;base64,{encoded[:200]}...)\n"
-    
-    # Write output
-    with open(OUTPUT_FILE, 'w') as f:
-        f.write(output)
-    
-    print(f"Analysis template written to: {OUTPUT_FILE}")
-    print(f"\nNext step: Use a multimodal LLM to analyze these frames")
-    return frame_files
 
 if __name__ == "__main__":
     analyze_frames()
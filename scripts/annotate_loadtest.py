@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Load test for annotate_tool.py: requests/sec and latency percentiles.
+
+Opens --concurrency client connections that issue requests back to back for
+--duration seconds, drawn from a weighted mix of routes:
+  list   GET /api/list?dir=<dir>&limit=200
+  image  GET /api/image?path=<random image from the first list page>
+  html   GET /
+Connections are reused while the server allows keep-alive (HTTP/1.1) and
+reopened per request otherwise (the threaded server speaks HTTP/1.0), so the
+connection cost each server imposes is part of what is measured. Requests
+send Accept-Encoding: gzip like a browser (--no-gzip to disable).
+
+Pass --url more than once to compare servers in one run, e.g.:
+  python3 scripts/annotate_tool.py --root . --port 18792 &
+  python3 scripts/annotate_tool.py --root . --port 18793 --server threaded &
+  python3 scripts/annotate_loadtest.py --url http://127.0.0.1:18792 --url http://127.0.0.1:18793 \\
+      --dir yt/CLEOPATRA/frames --concurrency 64 --duration 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlparse
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    bytes: int = 0
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1))]
+
+
+def parse_mix(text: str) -> List[Tuple[str, int]]:
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition(":")
+        name = name.strip()
+        if name not in ("list", "image", "html"):
+            raise SystemExit(f"Unknown route in --mix: {name}")
+        mix.append((name, int(weight or 1)))
+    return [(n, w) for n, w in mix if w > 0]
+
+
+class Connection:
+    """One client socket speaking just enough HTTP/1.x for the annotation server."""
+
+    def __init__(self, host: str, port: int, gzip_ok: bool) -> None:
+        self.host = host
+        self.port = port
+        self.gzip_ok = gzip_ok
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.opened = 0
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def get(self, target: str) -> Tuple[int, int]:
+        """(status, body bytes); reconnects when the server closed the previous connection."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.opened += 1
+        accept = "Accept-Encoding: gzip\r\n" if self.gzip_ok else ""
+        request = f"GET {target} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n{accept}Connection: keep-alive\r\n\r\n"
+        self.writer.write(request.encode("latin-1"))
+        await self.writer.drain()
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        version, status_text = head[0].split(" ")[:2]
+        status = int(status_text)
+        headers = {}
+        for line in head[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        elif status in (204, 304):
+            body = b""
+        else:
+            body = await self.reader.read()
+        connection = headers.get("connection", "").lower()
+        if (version == "HTTP/1.0" and "keep-alive" not in connection) or "close" in connection:
+            await self.close()
+        return status, len(body)
+
+
+async def fetch_paths(host: str, port: int, directory: str) -> List[str]:
+    """Image paths on the first /api/list page, used as the image route's targets."""
+    reader, writer = await asyncio.open_connection(host, port)
+    target = f"/api/list?dir={quote(directory)}&limit=200"
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    body = raw.split(b"\r\n\r\n", 1)[1]
+    return list(json.loads(body.decode("utf-8")).get("files", []))
+
+
+async def worker(
+    host: str,
+    port: int,
+    routes: List[Tuple[str, str]],
+    weights: List[int],
+    deadline: float,
+    stats: Dict[str, RouteStats],
+    gzip_ok: bool,
+    rng: random.Random,
+) -> int:
+    conn = Connection(host, port, gzip_ok)
+    try:
+        while time.perf_counter() < deadline:
+            name, target = rng.choices(routes, weights=weights)[0]
+            started = time.perf_counter()
+            try:
+                status, size = await conn.get(target)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                stats[name].errors += 1
+                await conn.close()
+                continue
+            if status >= 400:
+                stats[name].errors += 1
+                continue
+            stats[name].latencies.append(time.perf_counter() - started)
+            stats[name].bytes += size
+    finally:
+        await conn.close()
+    return conn.opened
+
+
+async def run(url: str, args: argparse.Namespace) -> None:
+    parsed = urlparse(url)
+    host, port = parsed.hostname or "127.0.0.1", parsed.port or 80
+    mix = parse_mix(args.mix)
+    paths = await fetch_paths(host, port, args.dir) if any(n == "image" for n, _ in mix) else []
+    if not paths:
+        mix = [(n, w) for n, w in mix if n != "image"]
+        if any(n == "image" for n, _ in parse_mix(args.mix)):
+            print(f"[WARN] No images listed under {args.dir!r}; image requests skipped")
+    if not mix:
+        raise SystemExit("Nothing to request")
+
+    rng = random.Random(args.seed)
+    routes: List[Tuple[str, str]] = []
+    weights: List[int] = []
+    for name, weight in mix:
+        if name == "image":
+            targets = [f"/api/image?path={quote(p)}" for p in paths]
+        elif name == "list":
+            targets = [f"/api/list?dir={quote(args.dir)}&limit=200"]
+        else:
+            targets = ["/"]
+        for target in targets:
+            routes.append((name, target))
+            weights.append(max(1, weight * 1000 // len(targets)))
+
+    stats = {name: RouteStats() for name, _ in mix}
+    started = time.perf_counter()
+    deadline = started + args.duration
+    opened = await asyncio.gather(
+        *(
+            worker(host, port, routes, weights, deadline, stats, not args.no_gzip, random.Random(rng.random()))
+            for _ in range(args.concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{url}  ({args.concurrency} connections, {elapsed:.1f}s, {sum(opened)} TCP connects)")
+    print(f"  {'route':<6} {'req':>8} {'err':>6} {'req/s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    everything: List[float] = []
+    for name, st in list(stats.items()) + [("total", None)]:
+        if st is None:
+            lat = sorted(everything)
+            errors = sum(s.errors for s in stats.values())
+        else:
+            lat = sorted(st.latencies)
+            everything.extend(lat)
+            errors = st.errors
+        print(
+            f"  {name:<6} {len(lat):>8} {errors:>6} {len(lat) / elapsed:>9.1f} "
+            f"{percentile(lat, 50) * 1000:>8.2f} {percentile(lat, 90) * 1000:>8.2f} "
+            f"{percentile(lat, 99) * 1000:>8.2f} {(lat[-1] if lat else 0.0) * 1000:>8.2f}"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure requests/sec and p99 latency of annotate_tool.py.")
+    parser.add_argument("--url", action="append", default=None, help="Server base URL (repeat to compare servers).")
+    parser.add_argument("--dir", default="yt/CLEOPATRA/frames", help="Directory (relative to the server root).")
+    parser.add_argument("--mix", default="list:1,image:4,html:0", help="Weighted routes, e.g. list:1,image:4,html:1")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-gzip", action="store_true", help="Do not send Accept-Encoding: gzip.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    for url in args.url or ["http://127.0.0.1:18792"]:
+        asyncio.run(run(url, args))
+
+
+if __name__ == "__main__":
+    main()
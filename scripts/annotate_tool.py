@@ -7,21 +7,70 @@ Features:
 - Rectangle drawing
 - Move/resize rectangles
 - Undo / Redo
-- Save annotated image with *_annotated.png suffix
+- Save annotations as *_annotated.json; the *_annotated.png preview is rendered
+  server-side in the background (annotation_render.py), or uploaded by the
+  browser when opencv is not installed on the server
+
+Images are served with ETag/Last-Modified validators (304 on revalidation),
+Cache-Control, single HTTP Range requests, and sendfile streaming; small hot
+files are kept in a memory-capped LRU (--image-cache-mb).
+
+/api/list pages through an in-memory directory index (dir_index.py) kept
+current by inotify, or by a directory mtime check where inotify is missing;
+it supports ?offset=&limit=, ?prefix= (file name) and ?status=annotated|
+unannotated, and flags which frames already have an *_annotated.json.
+
+The server runs on asyncio by default: connections (with HTTP/1.1 keep-alive)
+live on the event loop, handlers that touch the filesystem run in a thread
+pool, and JSON/HTML bodies are gzipped. --server threaded keeps the old
+thread-per-connection server for comparison (scripts/annotate_loadtest.py).
+
+The file list shows server-made thumbnails, and opened images are drawn from a
+tile pyramid (image_pyramid.py): a coarse level first, then full-resolution
+tiles only for the visible part of the canvas. Thumbnails and tiles are built
+in a process pool and cached on disk until the source mtime changes.
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
 import base64
+import binascii
+import gzip
 import json
 import mimetypes
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import parse_qs, unquote, urlparse
 
+import annotation_render
+import image_pyramid
+from annotation_render import AnnotationRenderer, atomic_write_bytes
+from dir_index import STATUSES, DirIndex
+from image_pyramid import ImagePyramid
+
+DEFAULT_LIST_PAGE = 200
+MAX_LIST_PAGE = 5000
+DEFAULT_IMAGE_CACHE_MB = 256
+# Files above this fraction of the cache are streamed from disk and never cached.
+MAX_CACHED_FILE_FRACTION = 8
+# Text bodies (JSON, the page) at least this large are gzipped for clients that accept it.
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+DEFAULT_IO_WORKERS = 16
+DEFAULT_KEEPALIVE_TIMEOUT = 30.0
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_MB = 256
+
 
 HTML = """<!doctype html>
 <html lang="en">
@@ -42,7 +91,10 @@ HTML = """<!doctype html>
     .canvas-wrap { overflow: auto; padding: 10px; }
     .file-list { margin-top: 10px; display: grid; gap: 6px; }
     .file-item { background: #171717; border: 1px solid #333; padding: 6px; border-radius: 6px; cursor: pointer; word-break: break-all; }
+    .file-item img { display: block; max-width: 100%; height: 90px; object-fit: contain; margin-bottom: 4px; background: #0b0b0b; }
     .file-item:hover { background: #232323; }
+    .file-item.annotated { border-color: #2f7d4f; }
+    .file-item.annotated::after { content: 'annotated'; display: block; font-size: 11px; color: #6fd39a; }
     .status { margin-left: auto; font-size: 12px; color: #9ecbff; }
     #menuFile { position: relative; }
     #menuPanel { display: none; position: absolute; top: 34px; left: 0; background: #1b1b1b; border: 1px solid #444; border-radius: 6px; min-width: 140px; z-index: 10; }
@@ -74,9 +126,16 @@ HTML = """<!doctype html>
       <div style="margin-top:8px;">Directory (relative to workspace root)</div>
       <input id="dirInput" class="field" style="width:100%;" value="yt/CLEOPATRA/frames" />
       <div style="margin-top:8px; display:flex; gap:8px;">
+        <input id="prefixInput" class="field" style="flex:1; min-width:0;" placeholder="Name prefix" />
+        <select id="statusSelect" class="field">
+          <option value="all">All</option>
+          <option value="unannotated">Todo</option>
+          <option value="annotated">Done</option>
+        </select>
         <button class="btn" id="refreshBtn">Refresh</button>
       </div>
       <div class="file-list" id="fileList"></div>
+      <div id="fileMore" class="hint"></div>
       <div class="hint">
         - Click a file to open it.<br/>
         - Draw new rectangles by dragging on empty area.<br/>
@@ -109,15 +168,28 @@ HTML = """<!doctype html>
   const refreshBtn = document.getElementById('refreshBtn');
   const dirInput = document.getElementById('dirInput');
   const fileList = document.getElementById('fileList');
+  const fileMore = document.getElementById('fileMore');
+  const sidebar = document.querySelector('.sidebar');
+  const prefixInput = document.getElementById('prefixInput');
+  const statusSelect = document.getElementById('statusSelect');
   const menuPanel = document.getElementById('menuPanel');
   const fileMenuBtn = document.getElementById('fileMenuBtn');
 
   const setStatus = (msg) => { statusEl.textContent = msg; };
   const esc = (s) => (s || '').replace(/[&<>"']/g, (m) => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[m]));
 
+  let background = null;
+
+  // Rectangles only: the background (a full-size tile canvas) would otherwise be serialized as a data URL.
+  function annotationsJSON() {
+    const json = canvas.toJSON();
+    delete json.backgroundImage;
+    return json;
+  }
+
   function pushHistory() {
     if (restoring) return;
-    undoStack.push(JSON.stringify(canvas.toJSON()));
+    undoStack.push(JSON.stringify(annotationsJSON()));
     if (undoStack.length > 100) undoStack.shift();
     redoStack = [];
     updateButtons();
@@ -126,6 +198,7 @@ HTML = """<!doctype html>
   function restoreState(stateStr) {
     restoring = true;
     canvas.loadFromJSON(stateStr, () => {
+      canvas.backgroundImage = background;
       canvas.renderAll();
       restoring = false;
       updateButtons();
@@ -195,71 +268,186 @@ HTML = """<!doctype html>
     canvas.on('object:removed', () => pushHistory());
   }
 
+  const canvasWrap = document.querySelector('.canvas-wrap');
+  let tiles = null; // { path, meta, el, ctx, loaded: Set }
+
+  function loadTileImage(url) {
+    return new Promise((resolve, reject) => {
+      const img = new Image();
+      img.onload = () => resolve(img);
+      img.onerror = reject;
+      img.src = url;
+    });
+  }
+
+  // Draw the tiles of `level` that intersect the full-resolution rect into the backing canvas.
+  async function drawTiles(state, level, x0, y0, x1, y1) {
+    const info = state.meta.levels[level];
+    const ts = state.meta.tile_size;
+    const inv = 1 / info.scale;
+    const jobs = [];
+    const tx0 = Math.max(0, Math.floor(x0 * info.scale / ts));
+    const ty0 = Math.max(0, Math.floor(y0 * info.scale / ts));
+    const tx1 = Math.min(info.cols, Math.ceil(x1 * info.scale / ts));
+    const ty1 = Math.min(info.rows, Math.ceil(y1 * info.scale / ts));
+    for (let ty = ty0; ty < ty1; ty++) {
+      for (let tx = tx0; tx < tx1; tx++) {
+        const key = `${level}/${tx}/${ty}`;
+        if (state.loaded.has(key)) continue;
+        state.loaded.add(key);
+        const url = `/api/tile?path=${encodeURIComponent(state.path)}&level=${level}&x=${tx}&y=${ty}`;
+        jobs.push(loadTileImage(url).then((img) => {
+          if (tiles !== state) return;
+          state.ctx.drawImage(img, tx * ts * inv, ty * ts * inv, img.width * inv, img.height * inv);
+        }).catch(() => state.loaded.delete(key)));
+      }
+    }
+    await Promise.all(jobs);
+    if (tiles === state) canvas.requestRenderAll();
+  }
+
+  function visibleFullResTiles() {
+    if (!tiles) return Promise.resolve();
+    const x0 = Math.max(0, canvasWrap.scrollLeft - 10);
+    const y0 = Math.max(0, canvasWrap.scrollTop - 10);
+    return drawTiles(tiles, 0, x0, y0, x0 + canvasWrap.clientWidth, y0 + canvasWrap.clientHeight);
+  }
+
+  async function openImage(path) {
+    currentImagePath = path;
+    let meta = null;
+    try {
+      const resp = await fetch(`/api/tiles/meta?path=${encodeURIComponent(path)}`);
+      if (resp.ok) meta = await resp.json();
+    } catch (e) { meta = null; }
+    if (!meta) {
+      tiles = null;
+      clearAndSetImage(`/api/image?path=${encodeURIComponent(path)}`);
+      return;
+    }
+    const el = document.createElement('canvas');
+    el.width = meta.width;
+    el.height = meta.height;
+    const state = { path, meta, el, ctx: el.getContext('2d'), loaded: new Set() };
+    tiles = state;
+    // Coarsest level that is still at least as wide as the viewport.
+    let coarse = meta.levels.length - 1;
+    while (coarse > 0 && meta.levels[coarse].width < Math.min(meta.width, canvasWrap.clientWidth)) coarse--;
+    await drawTiles(state, coarse, 0, 0, meta.width, meta.height);
+    if (tiles !== state) return;
+    setBackground(new fabric.Image(el, { objectCaching: false }));
+    visibleFullResTiles();
+  }
+
+  function setBackground(img) {
+    canvas.clear();
+    background = img;
+    canvas.setWidth(img.width);
+    canvas.setHeight(img.height);
+    canvas.setBackgroundImage(img, canvas.renderAll.bind(canvas), {
+      originX: 'left',
+      originY: 'top',
+      crossOrigin: 'anonymous',
+    });
+    undoStack = [];
+    redoStack = [];
+    pushHistory();
+    setStatus('Image loaded');
+  }
+
+  let scrollTimer = null;
+  canvasWrap.addEventListener('scroll', () => {
+    clearTimeout(scrollTimer);
+    scrollTimer = setTimeout(visibleFullResTiles, 120);
+  });
+
   function clearAndSetImage(imageUrl) {
     canvas.clear();
-    fabric.Image.fromURL(imageUrl, (img) => {
-      canvas.setWidth(img.width);
-      canvas.setHeight(img.height);
-      canvas.setBackgroundImage(img, canvas.renderAll.bind(canvas), {
-        originX: 'left',
-        originY: 'top',
-        crossOrigin: 'anonymous',
-      });
-      undoStack = [];
-      redoStack = [];
-      pushHistory();
-      setStatus('Image loaded');
-    }, { crossOrigin: 'anonymous' });
+    fabric.Image.fromURL(imageUrl, setBackground, { crossOrigin: 'anonymous' });
   }
 
-  async function loadFiles() {
-    const dir = dirInput.value.trim();
-    if (!dir) return;
-    setStatus('Loading files...');
-    const resp = await fetch(`/api/list?dir=${encodeURIComponent(dir)}`);
+  const PAGE_SIZE = 200;
+  let listing = null; // { query, nextOffset, total, loading }
+
+  async function loadPage() {
+    const state = listing;
+    if (!state || state.loading || state.nextOffset === null) return;
+    state.loading = true;
+    const resp = await fetch(`/api/list?${state.query}&offset=${state.nextOffset}&limit=${PAGE_SIZE}`);
     const data = await resp.json();
-    fileList.innerHTML = '';
-    if (!data.files || data.files.length === 0) {
-      fileList.innerHTML = '<div class="hint">No image files found.</div>';
-      setStatus('No files found');
+    state.loading = false;
+    if (listing !== state) return;
+    if (!resp.ok) {
+      setStatus(`List failed: ${data.error || 'unknown error'}`);
       return;
     }
-    for (const p of data.files) {
+    data.files.forEach((p, i) => {
       const div = document.createElement('div');
-      div.className = 'file-item';
-      div.innerHTML = esc(p);
-      div.onclick = () => {
-        currentImagePath = p;
-        clearAndSetImage(`/api/image?path=${encodeURIComponent(p)}`);
-      };
+      div.className = data.annotated[i] ? 'file-item annotated' : 'file-item';
+      div.innerHTML = `<img loading="lazy" alt="" src="/api/thumb?path=${encodeURIComponent(p)}&size=160" onerror="this.remove()" />${esc(p)}`;
+      div.onclick = () => openImage(p);
       fileList.appendChild(div);
+    });
+    state.nextOffset = data.next_offset;
+    state.total = data.total;
+    const shown = fileList.querySelectorAll('.file-item').length;
+    if (data.total === 0) {
+      fileList.innerHTML = '<div class="hint">No image files found.</div>';
+      setStatus('No files found');
+    } else {
+      setStatus(`Loaded ${shown} of ${data.total} files`);
+    }
+    fileMore.textContent = state.nextOffset === null ? '' : `Scroll for more (${data.total - shown} left)`;
+    // The observer only fires on changes; keep filling while the marker is still on screen.
+    if (state.nextOffset !== null && fileMore.getBoundingClientRect().top < sidebar.getBoundingClientRect().bottom) {
+      loadPage();
     }
-    setStatus(`Loaded ${data.files.length} files`);
   }
 
+  async function loadFiles() {
+    const dir = dirInput.value.trim();
+    if (!dir) return;
+    setStatus('Loading files...');
+    fileList.innerHTML = '';
+    fileMore.textContent = '';
+    const params = new URLSearchParams({ dir, prefix: prefixInput.value.trim(), status: statusSelect.value });
+    listing = { query: params.toString(), nextOffset: 0, total: 0, loading: false };
+    await loadPage();
+  }
+
+  // Fetch the next page when the "more" marker scrolls into the sidebar.
+  new IntersectionObserver((entries) => {
+    if (entries.some((e) => e.isIntersecting)) loadPage();
+  }, { root: sidebar }).observe(fileMore);
+
   async function saveAnnotated() {
     if (!currentImagePath) {
       setStatus('Open an image first');
       return;
     }
     setStatus('Saving...');
-    const pngDataUrl = canvas.toDataURL({ format: 'png' });
-    const payload = {
-      path: currentImagePath,
-      image_data_url: pngDataUrl,
-      objects_json: canvas.toJSON(),
-    };
-    const resp = await fetch('/api/save', {
+    const payload = { path: currentImagePath, objects_json: annotationsJSON() };
+    const post = (body) => fetch('/api/save', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(payload),
+      body: JSON.stringify(body),
     });
-    const data = await resp.json();
+    let resp = await post(payload);
+    let data = await resp.json();
+    if (resp.status === 409 && data.need_image) {
+      // Server cannot render previews; upload the canvas PNG instead.
+      if (tiles) {
+        await drawTiles(tiles, 0, 0, 0, tiles.meta.width, tiles.meta.height);
+        canvas.renderAll();
+      }
+      resp = await post({ ...payload, image_data_url: canvas.toDataURL({ format: 'png' }) });
+      data = await resp.json();
+    }
     if (!resp.ok) {
       setStatus(`Save failed: ${data.error || 'unknown error'}`);
       return;
     }
-    setStatus(`Saved: ${data.annotated_path}`);
+    setStatus(data.render === 'queued' ? `Saved: ${data.annotations_json} (rendering preview)` : `Saved: ${data.annotated_path}`);
   }
 
   undoBtn.onclick = () => {
@@ -290,6 +478,8 @@ HTML = """<!doctype html>
   };
   refreshBtn.onclick = loadFiles;
   openBtn.onclick = loadFiles;
+  statusSelect.onchange = loadFiles;
+  prefixInput.addEventListener('keydown', (e) => { if (e.key === 'Enter') loadFiles(); });
   saveBtn.onclick = saveAnnotated;
 
   fileMenuBtn.onclick = () => {
@@ -323,127 +513,532 @@ def safe_resolve(root: Path, rel_path: str) -> Path:
     return resolved
 
 
-class Handler(BaseHTTPRequestHandler):
-    root: Path = Path.cwd()
-
-    def _send_json(self, payload: dict, status: int = HTTPStatus.OK) -> None:
-        data = json.dumps(payload).encode("utf-8")
-        self.send_response(status)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Content-Length", str(len(data)))
-        self.end_headers()
-        self.wfile.write(data)
+class HotFileCache:
+    """Thread-safe LRU of file bytes keyed by (path, size, mtime_ns), bounded by total bytes."""
 
-    def _send_bytes(self, data: bytes, content_type: str, status: int = HTTPStatus.OK) -> None:
-        self.send_response(status)
-        self.send_header("Content-Type", content_type)
-        self.send_header("Content-Length", str(len(data)))
-        self.end_headers()
-        self.wfile.write(data)
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_bytes // MAX_CACHED_FILE_FRACTION
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, int, int], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
 
-    def log_message(self, format: str, *args) -> None:  # noqa: A003
-        return
+    def get(self, key: Tuple[str, int, int]) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
 
-    def do_GET(self) -> None:  # noqa: N802
-        parsed = urlparse(self.path)
-        if parsed.path == "/":
-            self._send_bytes(HTML.encode("utf-8"), "text/html; charset=utf-8")
+    def put(self, key: Tuple[str, int, int], data: bytes) -> None:
+        if len(data) > self.max_file_bytes:
             return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total -= len(old)
+            self._entries[key] = data
+            self.total += len(data)
+            while self.total > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.total -= len(evicted)
+
+
+def file_etag(st: os.stat_result) -> str:
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single `bytes=` range; None to serve the whole file.
+
+    Malformed and multi-range headers are ignored (full 200 body, as RFC 9110
+    allows); a well-formed range that misses the file raises ValueError (416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first.isdigit() or first == "") or not (last.isdigit() or last == ""):
+        return None
+    if first == "":
+        if last == "":
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("range not satisfiable")
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class HTTPError(Exception):
+    """Raised by route handlers to answer with a JSON error body."""
+
+    def __init__(self, status: int, payload: Dict[str, Any]) -> None:
+        super().__init__(payload.get("error", ""))
+        self.status = status
+        self.payload = payload
+
+
+@dataclass
+class Request:
+    method: str
+    target: str
+    headers: Dict[str, str]  # lower-cased names
+    body: bytes = b""
+
+
+@dataclass
+class Response:
+    status: int
+    headers: List[Tuple[str, str]] = field(default_factory=list)
+    body: bytes = b""
+    file: Optional[Tuple[Path, int, int]] = None  # (path, offset, length) streamed after the headers
+
+    @property
+    def length(self) -> int:
+        return self.file[2] if self.file is not None else len(self.body)
+
+
+class AnnotateApp:
+    """Routes and handlers, independent of the HTTP server carrying them.
+
+    handle() may block (stat, reads, writes, tile generation), so servers call
+    it from worker threads.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        image_cache: Optional[HotFileCache] = None,
+        image_max_age: int = 0,
+        dir_index: Optional[DirIndex] = None,
+        pyramid: Optional[ImagePyramid] = None,
+        renderer: Optional[AnnotationRenderer] = None,
+    ) -> None:
+        self.root = root
+        self.image_cache = image_cache or HotFileCache(DEFAULT_IMAGE_CACHE_MB << 20)
+        self.image_max_age = image_max_age
+        self.dir_index = dir_index or DirIndex(use_inotify=False)
+        self.pyramid = pyramid
+        self.renderer = renderer
+        self._html = HTML.encode("utf-8")
+        self._html_gz = gzip.compress(self._html, compresslevel=GZIP_LEVEL)
+
+    def close(self) -> None:
+        if self.pyramid is not None:
+            self.pyramid.close()
+        if self.renderer is not None:
+            self.renderer.close()
+
+    def handle(self, req: Request) -> Response:
+        parsed = urlparse(req.target)
+        query = parse_qs(parsed.query)
+        try:
+            if req.method in ("GET", "HEAD"):
+                if parsed.path == "/":
+                    return self._bytes(req, self._html, "text/html; charset=utf-8", gzipped=self._html_gz)
+                if parsed.path == "/api/list":
+                    return self._list(req, query)
+                if parsed.path == "/api/image":
+                    img_path = self._image_from_query(query)
+                    content_type = mimetypes.guess_type(str(img_path))[0] or "application/octet-stream"
+                    return self._file(req, img_path, content_type)
+                if parsed.path in ("/api/thumb", "/api/tiles/meta", "/api/tile"):
+                    return self._pyramid(req, parsed.path, query)
+            elif req.method == "POST":
+                if parsed.path == "/api/save":
+                    return self._save(req)
+            else:
+                raise HTTPError(HTTPStatus.NOT_IMPLEMENTED, {"error": f"Unsupported method: {req.method}"})
+            raise HTTPError(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+        except HTTPError as exc:
+            return self._json(req, exc.payload, status=exc.status)
+        except Exception as exc:  # keep the connection (and the server) alive
+            print(f"[WARN] {req.method} {req.target} failed: {exc!r}")
+            return self._json(req, {"error": "Internal server error"}, status=HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def _bytes(
+        self,
+        req: Request,
+        data: bytes,
+        content_type: str,
+        status: int = HTTPStatus.OK,
+        gzipped: Optional[bytes] = None,
+    ) -> Response:
+        headers = [("Content-Type", content_type)]
+        if len(data) >= GZIP_MIN_BYTES and "gzip" in req.headers.get("accept-encoding", ""):
+            data = gzipped if gzipped is not None else gzip.compress(data, compresslevel=GZIP_LEVEL)
+            headers += [("Content-Encoding", "gzip"), ("Vary", "Accept-Encoding")]
+        return Response(status, headers, data)
+
+    def _json(self, req: Request, payload: Any, status: int = HTTPStatus.OK) -> Response:
+        return self._bytes(req, json.dumps(payload).encode("utf-8"), "application/json; charset=utf-8", status)
 
-        if parsed.path == "/api/list":
-            query = parse_qs(parsed.query)
-            rel_dir = query.get("dir", [""])[0]
+    def _not_modified(self, req: Request, etag: str, mtime: float) -> bool:
+        inm = req.headers.get("if-none-match")
+        if inm is not None:
+            tags = [t.strip() for t in inm.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+        ims = req.headers.get("if-modified-since")
+        if ims:
             try:
-                dir_path = safe_resolve(self.root, rel_dir)
-            except ValueError as exc:
-                self._send_json({"error": str(exc)}, status=HTTPStatus.BAD_REQUEST)
-                return
-            if not dir_path.exists() or not dir_path.is_dir():
-                self._send_json({"files": []})
-                return
-
-            files = []
-            for child in sorted(dir_path.iterdir()):
-                if child.is_file() and is_image_file(child):
-                    files.append(str(child.relative_to(self.root)).replace("\\", "/"))
-            self._send_json({"files": files})
-            return
+                return int(mtime) <= parsedate_to_datetime(ims).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _range_applies(self, req: Request, etag: str, last_modified: str) -> bool:
+        if_range = req.headers.get("if-range")
+        return if_range is None or if_range.strip() in (etag, last_modified)
+
+    def _file(self, req: Request, path: Path, content_type: str) -> Response:
+        """Serve a file with validators, Range support, the hot-file LRU and sendfile streaming."""
+        st = path.stat()
+        etag = file_etag(st)
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+        common = [
+            ("ETag", etag),
+            ("Last-Modified", last_modified),
+            ("Cache-Control", f"private, max-age={self.image_max_age}, must-revalidate"),
+            ("Accept-Ranges", "bytes"),
+        ]
+        if self._not_modified(req, etag, st.st_mtime):
+            return Response(HTTPStatus.NOT_MODIFIED, common)
 
-        if parsed.path == "/api/image":
-            query = parse_qs(parsed.query)
-            rel = query.get("path", [""])[0]
-            if not rel:
-                self._send_json({"error": "Missing path"}, status=HTTPStatus.BAD_REQUEST)
-                return
+        size = st.st_size
+        byte_range = None
+        range_header = req.headers.get("range")
+        if range_header and self._range_applies(req, etag, last_modified):
             try:
-                img_path = safe_resolve(self.root, rel)
-            except ValueError as exc:
-                self._send_json({"error": str(exc)}, status=HTTPStatus.BAD_REQUEST)
-                return
-            if not img_path.exists() or not img_path.is_file() or not is_image_file(img_path):
-                self._send_json({"error": "Image not found"}, status=HTTPStatus.NOT_FOUND)
-                return
-
-            content_type = mimetypes.guess_type(str(img_path))[0] or "application/octet-stream"
-            self._send_bytes(img_path.read_bytes(), content_type)
-            return
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                return Response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, [("Content-Range", f"bytes */{size}")])
+        start, end = byte_range if byte_range else (0, size - 1)
+        length = max(0, end - start + 1)
 
-        self._send_json({"error": "Not found"}, status=HTTPStatus.NOT_FOUND)
+        headers = [("Content-Type", content_type)]
+        if byte_range:
+            headers.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+        headers += common
+        status = HTTPStatus.PARTIAL_CONTENT if byte_range else HTTPStatus.OK
+        if length == 0 or req.method == "HEAD":
+            return Response(status, headers, file=(path, start, length) if length else None)
 
-    def do_POST(self) -> None:  # noqa: N802
-        parsed = urlparse(self.path)
-        if parsed.path != "/api/save":
-            self._send_json({"error": "Not found"}, status=HTTPStatus.NOT_FOUND)
-            return
+        key = (str(path), st.st_size, st.st_mtime_ns)
+        data = self.image_cache.get(key)
+        if data is None and size <= self.image_cache.max_file_bytes:
+            data = path.read_bytes()
+            if len(data) == size:
+                self.image_cache.put(key, data)
+        if data is not None:
+            return Response(status, headers, data[start : end + 1])
+        # Large file: the server streams it zero-copy from the page cache.
+        return Response(status, headers, file=(path, start, length))
 
+    def _list(self, req: Request, query: Dict[str, List[str]]) -> Response:
+        rel_dir = query.get("dir", [""])[0]
         try:
-            length = int(self.headers.get("Content-Length", "0"))
-            raw = self.rfile.read(length)
-            body = json.loads(raw.decode("utf-8"))
-        except Exception:
-            self._send_json({"error": "Invalid JSON body"}, status=HTTPStatus.BAD_REQUEST)
-            return
+            dir_path = safe_resolve(self.root, rel_dir)
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": str(exc)}) from exc
+        empty = {"files": [], "annotated": [], "total": 0, "offset": 0, "next_offset": None}
+        if not dir_path.exists() or not dir_path.is_dir():
+            return self._json(req, empty)
+        try:
+            offset = max(0, int(query.get("offset", ["0"])[0]))
+            limit = min(MAX_LIST_PAGE, max(1, int(query.get("limit", [str(DEFAULT_LIST_PAGE)])[0])))
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": "offset/limit must be integers"}) from exc
+        status = query.get("status", ["all"])[0]
+        if status not in STATUSES:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": f"status must be one of {', '.join(STATUSES)}"})
+        try:
+            rows, total = self.dir_index.page(dir_path, query.get("prefix", [""])[0], status, offset, limit)
+        except OSError:
+            return self._json(req, empty)
+
+        rel = str(dir_path.relative_to(self.root)).replace("\\", "/")
+        prefix = "" if rel == "." else rel + "/"
+        return self._json(
+            req,
+            {
+                "files": [prefix + name for name, _ in rows],
+                "annotated": [flag for _, flag in rows],
+                "total": total,
+                "offset": offset,
+                "next_offset": offset + len(rows) if offset + len(rows) < total else None,
+            },
+        )
+
+    def _image_from_query(self, query: Dict[str, List[str]]) -> Path:
+        """Resolve ?path= to an image under the root."""
+        rel = query.get("path", [""])[0]
+        if not rel:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": "Missing path"})
+        try:
+            img_path = safe_resolve(self.root, rel)
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": str(exc)}) from exc
+        if not img_path.exists() or not img_path.is_file() or not is_image_file(img_path):
+            raise HTTPError(HTTPStatus.NOT_FOUND, {"error": "Image not found"})
+        return img_path
+
+    def _pyramid(self, req: Request, route: str, query: Dict[str, List[str]]) -> Response:
+        if self.pyramid is None:
+            raise HTTPError(
+                HTTPStatus.NOT_IMPLEMENTED,
+                {"error": "Thumbnails/tiles unavailable (opencv-python not installed)"},
+            )
+        img_path = self._image_from_query(query)
+        try:
+            if route == "/api/tiles/meta":
+                return self._json(req, self.pyramid.meta(img_path))
+            if route == "/api/thumb":
+                path = self.pyramid.thumbnail(img_path, int(query.get("size", ["160"])[0]))
+            else:
+                level, x, y = (int(query.get(k, ["-1"])[0]) for k in ("level", "x", "y"))
+                path = self.pyramid.tile(img_path, level, x, y)
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": "Invalid size/level/x/y"}) from exc
+        except OSError as exc:
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Failed to build tiles: {exc}"}) from exc
+        if path is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, {"error": "Tile not found"})
+        try:
+            return self._file(req, path, mimetypes.guess_type(str(path))[0] or "application/octet-stream")
+        except FileNotFoundError as exc:
+            # The source changed and its old cache entry was dropped after we got the path.
+            raise HTTPError(HTTPStatus.NOT_FOUND, {"error": "Tile expired; reload"}) from exc
+
+    def _save(self, req: Request) -> Response:
+        try:
+            body = json.loads(req.body.decode("utf-8"))
+            if not isinstance(body, dict):
+                raise ValueError("body is not an object")
+        except ValueError as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": "Invalid JSON body"}) from exc
 
         rel_path = str(body.get("path", "")).strip()
         data_url = str(body.get("image_data_url", "")).strip()
         objects_json = body.get("objects_json", {})
 
-        if not rel_path or not data_url.startswith("data:image/png;base64,"):
-            self._send_json(
-                {"error": "Missing path or invalid image_data_url"},
-                status=HTTPStatus.BAD_REQUEST,
+        if not rel_path or not isinstance(objects_json, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": "Missing path or invalid objects_json"})
+        if data_url and not data_url.startswith("data:image/png;base64,"):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": "Invalid image_data_url"})
+        if not data_url and self.renderer is None:
+            raise HTTPError(
+                HTTPStatus.CONFLICT,
+                {"error": "Server cannot render previews (opencv-python not installed)", "need_image": True},
             )
-            return
 
         try:
             src = safe_resolve(self.root, rel_path)
         except ValueError as exc:
-            self._send_json({"error": str(exc)}, status=HTTPStatus.BAD_REQUEST)
-            return
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": str(exc)}) from exc
 
         if not src.exists():
-            self._send_json({"error": "Source image does not exist"}, status=HTTPStatus.BAD_REQUEST)
-            return
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": "Source image does not exist"})
 
         annotated_path = src.with_name(f"{src.stem}_annotated.png")
         json_path = src.with_name(f"{src.stem}_annotated.json")
         try:
-            b64 = data_url.split(",", 1)[1]
-            image_bytes = base64.b64decode(b64)
-            annotated_path.write_bytes(image_bytes)
-            json_path.write_text(json.dumps(objects_json, indent=2), encoding="utf-8")
-        except Exception as exc:
-            self._send_json({"error": f"Failed to save: {exc}"}, status=HTTPStatus.INTERNAL_SERVER_ERROR)
-            return
+            if data_url:
+                image_bytes = base64.b64decode(data_url.split(",", 1)[1], validate=True)
+                atomic_write_bytes(annotated_path, image_bytes)
+            atomic_write_bytes(json_path, json.dumps(objects_json, indent=2).encode("utf-8"))
+        except binascii.Error as exc:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, {"error": "Invalid image_data_url"}) from exc
+        except OSError as exc:
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Failed to save: {exc}"}) from exc
+        if not data_url:
+            self.renderer.submit(src, annotated_path, objects_json)
 
-        self._send_json(
+        return self._json(
+            req,
             {
                 "annotated_path": str(annotated_path.relative_to(self.root)).replace("\\", "/"),
                 "annotations_json": str(json_path.relative_to(self.root)).replace("\\", "/"),
-            }
+                "render": "client" if data_url else "queued",
+            },
         )
 
 
+def has_body(status: int) -> bool:
+    return status >= 200 and status not in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED)
+
+
+class AsyncServer:
+    """HTTP/1.1 server on asyncio: keep-alive connections on the event loop, handlers in a thread pool.
+
+    Slow or idle clients cost a coroutine, not a thread; file bodies are sent
+    with loop.sendfile (zero-copy where the transport supports it).
+    """
+
+    def __init__(
+        self,
+        app: AnnotateApp,
+        workers: int = DEFAULT_IO_WORKERS,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+        max_body_bytes: int = MAX_BODY_MB << 20,
+    ) -> None:
+        self.app = app
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="annotate-io")
+        self.keepalive_timeout = keepalive_timeout
+        self.max_body_bytes = max_body_bytes
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self._client, host, port, limit=MAX_HEADER_BYTES)
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._write_error(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+                    return
+                parsed = self._parse_head(head)
+                if parsed is None:
+                    await self._write_error(writer, HTTPStatus.BAD_REQUEST)
+                    return
+                req, keep_alive = parsed
+                if "transfer-encoding" in req.headers:
+                    await self._write_error(writer, HTTPStatus.LENGTH_REQUIRED)
+                    return
+                try:
+                    length = int(req.headers.get("content-length", "0"))
+                except ValueError:
+                    await self._write_error(writer, HTTPStatus.BAD_REQUEST)
+                    return
+                if length < 0 or length > self.max_body_bytes:
+                    await self._write_error(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+                    return
+                if length:
+                    try:
+                        req.body = await asyncio.wait_for(reader.readexactly(length), self.keepalive_timeout)
+                    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                        return
+                resp = await loop.run_in_executor(self.pool, self.app.handle, req)
+                await self._write(writer, req, resp, keep_alive)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            return
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Optional[Tuple[Request, bool]]:
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            return None
+        if not version.startswith("HTTP/1."):
+            return None
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                return None
+            name = name.strip().lower()
+            headers[name] = f"{headers[name]}, {value.strip()}" if name in headers else value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = "keep-alive" in connection if version == "HTTP/1.0" else "close" not in connection
+        return Request(method, target, headers), keep_alive
+
+    async def _write(self, writer: asyncio.StreamWriter, req: Request, resp: Response, keep_alive: bool) -> None:
+        status = HTTPStatus(resp.status)
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Date: {formatdate(usegmt=True)}"]
+        lines += [f"{k}: {v}" for k, v in resp.headers]
+        if has_body(status):
+            lines.append(f"Content-Length: {resp.length}")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if req.method == "HEAD" or not has_body(status):
+            await writer.drain()
+            return
+        if resp.file is None:
+            writer.write(resp.body)
+            await writer.drain()
+            return
+        loop = asyncio.get_running_loop()
+        path, offset, count = resp.file
+        fh = await loop.run_in_executor(self.pool, path.open, "rb")
+        try:
+            await writer.drain()
+            await loop.sendfile(writer.transport, fh, offset, count)
+        finally:
+            fh.close()
+
+    async def _write_error(self, writer: asyncio.StreamWriter, status: int) -> None:
+        req = Request("GET", "", {})
+        resp = self.app._json(req, {"error": HTTPStatus(status).phrase}, status=status)
+        try:
+            await self._write(writer, req, resp, keep_alive=False)
+        except ConnectionError:
+            pass
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Thread-per-connection transport for AnnotateApp (--server threaded)."""
+
+    app: Optional[AnnotateApp] = None
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A003
+        return
+
+    def _dispatch(self) -> None:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY_MB << 20:
+            self.send_error(HTTPStatus.BAD_REQUEST)
+            return
+        body = self.rfile.read(length) if length else b""
+        req = Request(self.command, self.path, {k.lower(): v for k, v in self.headers.items()}, body)
+        resp = self.app.handle(req)
+        self.send_response(resp.status)
+        for key, value in resp.headers:
+            self.send_header(key, value)
+        if has_body(resp.status):
+            self.send_header("Content-Length", str(resp.length))
+        self.end_headers()
+        if self.command == "HEAD" or not has_body(resp.status):
+            return
+        if resp.file is None:
+            self.wfile.write(resp.body)
+            return
+        path, offset, count = resp.file
+        with path.open("rb") as fh:
+            self.connection.sendfile(fh, offset, count)
+
+    do_GET = do_HEAD = do_POST = _dispatch  # noqa: N815
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Launch browser-based image annotation tool.")
     parser.add_argument(
@@ -457,6 +1052,48 @@ def parse_args() -> argparse.Namespace:
         type=int,
         default=int(os.environ.get("ANNOTATE_PORT", "18792")),
     )
+    parser.add_argument(
+        "--image-cache-mb",
+        type=int,
+        default=DEFAULT_IMAGE_CACHE_MB,
+        help="Memory cap for the in-process LRU of hot image bytes (0 disables it).",
+    )
+    parser.add_argument(
+        "--image-max-age",
+        type=int,
+        default=0,
+        help="Cache-Control max-age (seconds) for images; browsers revalidate with ETag after it.",
+    )
+    parser.add_argument(
+        "--tile-cache-dir",
+        default=image_pyramid.DEFAULT_CACHE_DIR,
+        help="Disk cache for thumbnails and tile pyramids (invalidated when a source mtime changes).",
+    )
+    parser.add_argument("--tile-workers", type=int, default=2, help="Processes generating thumbnails/tiles.")
+    parser.add_argument(
+        "--no-inotify",
+        action="store_true",
+        help="Revalidate directory listings by mtime instead of inotify.",
+    )
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=1,
+        help="Background threads rendering *_annotated.png previews from saved JSON.",
+    )
+    parser.add_argument(
+        "--server",
+        choices=("asyncio", "threaded"),
+        default="asyncio",
+        help="asyncio (keep-alive, handlers in a thread pool) or the old thread-per-connection server.",
+    )
+    parser.add_argument("--io-workers", type=int, default=DEFAULT_IO_WORKERS, help="asyncio: handler threads.")
+    parser.add_argument(
+        "--keepalive-timeout",
+        type=float,
+        default=DEFAULT_KEEPALIVE_TIMEOUT,
+        help="asyncio: seconds an idle keep-alive connection is kept open.",
+    )
     return parser.parse_args()
 
 
@@ -466,16 +1103,49 @@ def main() -> None:
     if not root.exists() or not root.is_dir():
         raise SystemExit(f"Invalid root directory: {root}")
 
-    Handler.root = root
-    server = ThreadingHTTPServer((args.host, args.port), Handler)
-    print(f"Annotation tool running at http://{args.host}:{args.port}")
+    dir_index = DirIndex(use_inotify=not args.no_inotify)
+    print(f"Directory listings: {dir_index.mode}")
+    pyramid = None
+    if image_pyramid.available():
+        pyramid = ImagePyramid(args.tile_cache_dir, workers=args.tile_workers)
+    else:
+        print("[WARN] opencv-python not installed; thumbnails and tiles disabled (full images only)")
+    renderer = None
+    if annotation_render.available():
+        renderer = AnnotationRenderer(workers=args.render_workers)
+    else:
+        print("[WARN] Annotated previews will be uploaded by the browser instead of rendered here")
+    app = AnnotateApp(
+        root,
+        image_cache=HotFileCache(max(0, args.image_cache_mb) << 20),
+        image_max_age=max(0, args.image_max_age),
+        dir_index=dir_index,
+        pyramid=pyramid,
+        renderer=renderer,
+    )
+
+    print(f"Annotation tool running at http://{args.host}:{args.port} ({args.server})")
     print(f"Workspace root: {root}")
+    if args.server == "threaded":
+        Handler.app = app
+        server = ThreadingHTTPServer((args.host, args.port), Handler)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            app.close()
+        return
+
+    async_server = AsyncServer(app, workers=args.io_workers, keepalive_timeout=args.keepalive_timeout)
     try:
-        server.serve_forever()
+        asyncio.run(async_server.serve(args.host, args.port))
     except KeyboardInterrupt:
         pass
     finally:
-        server.server_close()
+        async_server.close()
+        app.close()
 
 
 if __name__ == "__main__":
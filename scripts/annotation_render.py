@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Server-side rendering of *_annotated.png previews for the annotation tool.
+
+The browser saves only the Fabric objects JSON; the preview PNG is drawn here
+from the source frame plus the rectangles, on a background thread, so /api/save
+returns as soon as the JSON is on disk. Renders are coalesced per output file:
+if several saves of one image arrive while it is rendering, only the newest
+objects are drawn next, and two renders of the same file never overlap.
+
+All files are written atomically (temp file in the same directory, fsync,
+rename), so a reader or a concurrent save never sees a torn file.
+
+Usage (re-render a preview by hand):
+  python3 scripts/annotation_render.py yt/CLEOPATRA/frames/frame_0001.png
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+cv2 = None
+
+# Matches the look of the rectangles drawn in the browser.
+DEFAULT_FILL = ((255, 200, 0), 0.15)
+DEFAULT_STROKE = ((255, 200, 0), 1.0)
+
+RGBA_RE = re.compile(r"rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*([\d.]+)\s*)?\)")
+
+
+def lazy_imports() -> None:
+    global cv2
+    try:
+        import cv2 as _cv2  # type: ignore
+    except ImportError as exc:  # pragma: no cover
+        raise SystemExit(
+            "Missing dependency: opencv-python (cv2) is required to render annotated previews.\n"
+            "Install with: pip install opencv-python"
+        ) from exc
+    cv2 = _cv2
+
+
+def available() -> bool:
+    try:
+        lazy_imports()
+    except SystemExit:
+        return False
+    return True
+
+
+def atomic_write_bytes(dest: Path, data: bytes) -> None:
+    """Write `data` to a temp file next to `dest`, fsync it, then rename over `dest`."""
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp.open("wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def parse_color(value: Any) -> Optional[Tuple[Tuple[int, int, int], float]]:
+    """CSS '#rrggbb' / '#rgb' / 'rgb[a](...)' -> (BGR, alpha); None for empty or 'transparent'."""
+    text = str(value or "").strip().lower()
+    if not text or text in ("transparent", "none"):
+        return None
+    if text.startswith("#"):
+        hexpart = text[1:]
+        if len(hexpart) == 3:
+            hexpart = "".join(ch * 2 for ch in hexpart)
+        if len(hexpart) != 6:
+            return None
+        r, g, b = (int(hexpart[i : i + 2], 16) for i in (0, 2, 4))
+        return (b, g, r), 1.0
+    match = RGBA_RE.fullmatch(text)
+    if not match:
+        return None
+    r, g, b = (int(float(match.group(i))) for i in (1, 2, 3))
+    alpha = float(match.group(4)) if match.group(4) is not None else 1.0
+    return (b, g, r), max(0.0, min(1.0, alpha))
+
+
+def render_annotated(src: Path, objects_json: Dict[str, Any], dest: Path) -> None:
+    """Draw the Fabric rectangles of `objects_json` over `src` and write a PNG to `dest`."""
+    if cv2 is None:
+        lazy_imports()
+    image = cv2.imread(str(src), cv2.IMREAD_COLOR)
+    if image is None:
+        raise OSError(f"Unable to read image: {src}")
+    for item in objects_json.get("objects", []):
+        if item.get("type") != "rect":
+            continue
+        left = float(item.get("left", 0))
+        top = float(item.get("top", 0))
+        x1, y1 = int(round(left)), int(round(top))
+        x2 = int(round(left + float(item.get("width", 0)) * float(item.get("scaleX", 1))))
+        y2 = int(round(top + float(item.get("height", 0)) * float(item.get("scaleY", 1))))
+        fill = parse_color(item.get("fill")) if "fill" in item else DEFAULT_FILL
+        if fill is not None:
+            color, alpha = fill
+            if alpha >= 1.0:
+                cv2.rectangle(image, (x1, y1), (x2, y2), color, thickness=-1)
+            elif alpha > 0.0:
+                ys, xs = slice(max(0, y1), max(0, y2)), slice(max(0, x1), max(0, x2))
+                region = image[ys, xs]
+                if region.size:
+                    overlay = region.copy()
+                    overlay[:] = color
+                    image[ys, xs] = cv2.addWeighted(overlay, alpha, region, 1.0 - alpha, 0)
+        stroke = parse_color(item.get("stroke")) if "stroke" in item else DEFAULT_STROKE
+        width = int(round(float(item.get("strokeWidth", 2) or 0)))
+        if stroke is not None and width > 0:
+            cv2.rectangle(image, (x1, y1), (x2, y2), stroke[0], thickness=width)
+    ok, buf = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 3])
+    if not ok:
+        raise OSError(f"Failed to encode {dest.name}")
+    atomic_write_bytes(dest, buf.tobytes())
+
+
+class AnnotationRenderer:
+    def __init__(self, workers: int = 1) -> None:
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="annotate-render")
+        self._lock = threading.Lock()
+        self._pending: Dict[Path, Tuple[Path, Dict[str, Any]]] = {}
+        self._running: Set[Path] = set()
+        self.rendered = 0
+        self.failed = 0
+
+    def submit(self, src: Path, dest: Path, objects_json: Dict[str, Any]) -> None:
+        """Queue a render of `dest`; replaces any not-yet-started render of the same file."""
+        with self._lock:
+            self._pending[dest] = (src, objects_json)
+            if dest in self._running:
+                return
+            self._running.add(dest)
+        self.pool.submit(self._drain, dest)
+
+    def busy(self, dest: Path) -> bool:
+        with self._lock:
+            return dest in self._running
+
+    def _drain(self, dest: Path) -> None:
+        while True:
+            with self._lock:
+                job = self._pending.pop(dest, None)
+                if job is None:
+                    self._running.discard(dest)
+                    return
+            src, objects_json = job
+            try:
+                render_annotated(src, objects_json, dest)
+            except Exception as exc:  # a failed render must not wedge later saves of this file
+                print(f"[WARN] Render failed for {dest}: {exc}")
+                with self._lock:
+                    self.failed += 1
+                continue
+            with self._lock:
+                self.rendered += 1
+
+    def close(self) -> None:
+        """Finish queued renders, so a shutdown never leaves a preview older than its JSON."""
+        self.pool.shutdown(wait=True)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Render <stem>_annotated.png from <stem>_annotated.json.")
+    parser.add_argument("images", nargs="+", help="Source frame(s) with a sibling *_annotated.json")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    lazy_imports()
+    for name in args.images:
+        src = Path(name).expanduser().resolve()
+        json_path = src.with_name(f"{src.stem}_annotated.json")
+        if not json_path.exists():
+            print(f"[WARN] No annotations for {src}")
+            continue
+        dest = src.with_name(f"{src.stem}_annotated.png")
+        render_annotated(src, json.loads(json_path.read_text(encoding="utf-8")), dest)
+        print(f"Rendered {dest}")
+
+
+if __name__ == "__main__":
+    main()
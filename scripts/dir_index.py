@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+In-memory index of image directories for the annotation tool's file picker.
+
+Each listed directory is scanned once into a sorted list of image names plus
+the set of stems that have a <stem>_annotated.json. After that:
+  - on Linux the directory is watched with inotify (through ctypes, no extra
+    dependency) and create/delete/rename events update the index in place;
+  - elsewhere, or when inotify is unavailable or its queue overflows, each
+    request stats the directory and rescans only if its mtime changed.
+Pages are sliced from the sorted list (prefix filters use bisect), so a page of
+a 50k-frame directory costs about the same as a page of a 50-frame one.
+
+Usage (time a listing):
+  python3 scripts/dir_index.py yt/CLEOPATRA/frames --prefix frame_01 --limit 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
+ANNOTATION_SUFFIX = "_annotated.json"
+PREVIEW_STEM_SUFFIX = "_annotated"  # <stem>_annotated.png previews rendered on save
+STATUSES = ("all", "annotated", "unannotated")
+DEFAULT_MAX_DIRS = 64
+
+# <sys/inotify.h>
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_frame_name(name: str) -> bool:
+    """An image to annotate: not one of the *_annotated previews written by /api/save."""
+    stem, ext = os.path.splitext(name)
+    return ext.lower() in IMAGE_EXTENSIONS and not stem.endswith(PREVIEW_STEM_SUFFIX)
+
+
+@dataclass
+class DirListing:
+    path: Path
+    names: List[str] = field(default_factory=list)
+    annotated: Set[str] = field(default_factory=set)
+    mtime_ns: int = -1
+    wd: int = -1
+    stale: bool = True
+
+    def scan(self) -> None:
+        names: List[str] = []
+        annotated: Set[str] = set()
+        self.mtime_ns = os.stat(self.path).st_mtime_ns
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith(ANNOTATION_SUFFIX):
+                    annotated.add(entry.name[: -len(ANNOTATION_SUFFIX)])
+                elif is_frame_name(entry.name) and entry.is_file():
+                    names.append(entry.name)
+        names.sort()
+        self.names = names
+        self.annotated = annotated
+        self.stale = False
+
+    def added(self, name: str) -> None:
+        if name.endswith(ANNOTATION_SUFFIX):
+            self.annotated.add(name[: -len(ANNOTATION_SUFFIX)])
+        elif is_frame_name(name):
+            i = bisect.bisect_left(self.names, name)
+            if i == len(self.names) or self.names[i] != name:
+                self.names.insert(i, name)
+
+    def removed(self, name: str) -> None:
+        if name.endswith(ANNOTATION_SUFFIX):
+            self.annotated.discard(name[: -len(ANNOTATION_SUFFIX)])
+        elif is_frame_name(name):
+            i = bisect.bisect_left(self.names, name)
+            if i < len(self.names) and self.names[i] == name:
+                del self.names[i]
+
+    def is_annotated(self, name: str) -> bool:
+        return os.path.splitext(name)[0] in self.annotated
+
+    def page(self, prefix: str, status: str, offset: int, limit: int) -> Tuple[List[Tuple[str, bool]], int]:
+        """(name, annotated) rows [offset, offset+limit) of the filtered list, and the filtered total."""
+        lo = bisect.bisect_left(self.names, prefix) if prefix else 0
+        hi = bisect.bisect_left(self.names, prefix + "\U0010ffff") if prefix else len(self.names)
+        if status == "all":
+            names = self.names[lo + offset : min(hi, lo + offset + limit)]
+            return [(n, self.is_annotated(n)) for n in names], hi - lo
+        want = status == "annotated"
+        rows: List[Tuple[str, bool]] = []
+        total = 0
+        for name in self.names[lo:hi]:
+            if self.is_annotated(name) != want:
+                continue
+            if offset <= total < offset + limit:
+                rows.append((name, want))
+            total += 1
+        return rows, total
+
+
+class Inotify:
+    """Minimal inotify binding: one fd, a reader thread, and a callback per event."""
+
+    def __init__(self, on_event) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._on_event = on_event
+        self._thread = threading.Thread(target=self._read_loop, name="dir-index-inotify", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def create(on_event) -> Optional["Inotify"]:
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return Inotify(on_event)
+        except (OSError, AttributeError):
+            return None
+
+    def add_watch(self, path: Path) -> int:
+        wd = self._add(self.fd, os.fsencode(str(path)), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm(self.fd, wd)
+
+    def _read_loop(self) -> None:
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except OSError:
+                return
+            pos = 0
+            while pos + EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(buf, pos)
+                pos += EVENT_HEADER.size
+                name = os.fsdecode(buf[pos : pos + length].rstrip(b"\0"))
+                pos += length
+                self._on_event(wd, mask, name)
+
+
+class DirIndex:
+    """Thread-safe cache of DirListing for up to max_dirs directories (LRU)."""
+
+    def __init__(self, max_dirs: int = DEFAULT_MAX_DIRS, use_inotify: bool = True) -> None:
+        self.max_dirs = max(1, max_dirs)
+        self._lock = threading.Lock()
+        self._dirs: "OrderedDict[Path, DirListing]" = OrderedDict()
+        self._by_wd: Dict[int, DirListing] = {}
+        self.inotify = Inotify.create(self._on_event) if use_inotify else None
+        self.scans = 0
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.inotify is not None else "mtime-poll"
+
+    def _on_event(self, wd: int, mask: int, name: str) -> None:
+        with self._lock:
+            if mask & IN_Q_OVERFLOW:
+                for listing in self._dirs.values():
+                    listing.stale = True
+                return
+            listing = self._by_wd.get(wd)
+            if listing is None:
+                return
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                # Directory went away or the watch was dropped: fall back to stat checks.
+                self._by_wd.pop(wd, None)
+                if mask & IN_MOVE_SELF and self.inotify is not None:
+                    self.inotify.rm_watch(wd)
+                listing.wd = -1
+                listing.stale = True
+            elif mask & IN_ISDIR:
+                return
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                listing.added(name)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                listing.removed(name)
+
+    def _get(self, path: Path) -> DirListing:
+        """Fresh listing for `path`; caller holds the lock."""
+        listing = self._dirs.get(path)
+        if listing is None:
+            listing = DirListing(path)
+            self._dirs[path] = listing
+            while len(self._dirs) > self.max_dirs:
+                _, old = self._dirs.popitem(last=False)
+                if old.wd >= 0 and self.inotify is not None:
+                    self._by_wd.pop(old.wd, None)
+                    self.inotify.rm_watch(old.wd)
+        self._dirs.move_to_end(path)
+        if listing.wd < 0 and self.inotify is not None:
+            try:
+                # Watch before scanning, so nothing created during the scan is missed.
+                listing.wd = self.inotify.add_watch(path)
+                self._by_wd[listing.wd] = listing
+                listing.stale = True
+            except OSError:
+                listing.wd = -1
+        if listing.wd < 0 and not listing.stale:
+            listing.stale = os.stat(path).st_mtime_ns != listing.mtime_ns
+        if listing.stale:
+            listing.scan()
+            self.scans += 1
+        return listing
+
+    def page(
+        self, path: Path, prefix: str = "", status: str = "all", offset: int = 0, limit: int = 200
+    ) -> Tuple[List[Tuple[str, bool]], int]:
+        if status not in STATUSES:
+            raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+        with self._lock:
+            return self._get(path).page(prefix, status, max(0, offset), max(0, limit))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="List a frames directory through the annotation tool's index.")
+    parser.add_argument("directory")
+    parser.add_argument("--prefix", default="")
+    parser.add_argument("--status", choices=STATUSES, default="all")
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--no-inotify", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    path = Path(args.directory).expanduser().resolve()
+    if not path.is_dir():
+        raise SystemExit(f"Not a directory: {path}")
+    index = DirIndex(use_inotify=not args.no_inotify)
+    for label in ("cold", "warm"):
+        t0 = time.perf_counter()
+        rows, total = index.page(path, args.prefix, args.status, args.offset, args.limit)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"{label}: {total} matching, page of {len(rows)} in {ms:.2f} ms ({index.mode})")
+    for name, annotated in rows:
+        print(f"  {'*' if annotated else ' '} {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -56,8 +56,7 @@ video_path="$video_dir/$file_name_base.webm"
 mkdir -p "$video_dir" "$frames_dir"
 
 if [[ ! -f "$video_path" ]]; then
-  curl -fL "https://bettr-casino-assets.s3.us-west-2.amazonaws.com/yt/$file_name_base.webm" \
-    -o "$video_path"
+  python3 "$(dirname "$0")/fetch_video.py" --video-name "$file_name_base" --dest "$video_path"
 fi
 
 ts_to_seconds() {
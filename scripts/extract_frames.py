@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Single-pass frame extraction driven by tags.txt.
+
+Reads every entry of a human-authored tags.txt, converts single frames and 60fps
+ranges into one sorted set of frame indices, and decodes the video once in
+timestamp order. A single ffmpeg process emits only the requested frames as a
+PNG stream, which is split in-process and written straight to
+frames/frame__HH_MM_SS.FF.png (same naming as extract-frame.sh).
+
+With --workers N, long 60fps ranges are split on keyframe boundaries and the
+shards are decoded in a process pool; output indices match the serial path.
+
+Frames are also stored in the content-addressed frame cache (frame_cache.py),
+so a repeat extraction of the same video is a manifest lookup with no decode.
+
+tags.txt is read-only here; this script never modifies it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from fetch_video import fetch_video
+from frame_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_MB, FrameCache
+
+FPS = 60
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_PIPE_ARGS = ["-c:v", "png", "-f", "image2pipe", "-"]
+TAG_TS_RE = re.compile(r"^(\d{2}):(\d{2}):(\d{2})(?:\.(\d{2}))?$")
+
+
+@dataclass
+class TagEntry:
+    line_no: int
+    start_idx: int
+    end_idx: int
+    comment: str
+
+    @property
+    def is_range(self) -> bool:
+        return self.end_idx > self.start_idx
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Extract every tags.txt frame and 60fps range in one decode pass."
+    )
+    parser.add_argument("--video-name", default="CLEOPATRA")
+    parser.add_argument(
+        "--yt-base-dir",
+        default=os.environ.get("YT_BASE_DIR", "/workspaces/clawd-slots-assets-pipeline/yt"),
+    )
+    parser.add_argument("--tags", default=None, help="Path to tags.txt (default: yt/<VIDEO_NAME>/tags.txt)")
+    parser.add_argument("--video", default=None, help="Path to .webm (default: yt/<VIDEO_NAME>/video/<VIDEO_NAME>.webm)")
+    parser.add_argument("--frames-dir", default=None, help="Output frames dir (default: yt/<VIDEO_NAME>/frames)")
+    parser.add_argument(
+        "--max-gap",
+        type=float,
+        default=None,
+        help="Start a new seek when two requested frames are more than this many seconds apart "
+        "(default: never, decode everything in one pass).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Decode long ranges as keyframe-aligned shards in a process pool of this size.",
+    )
+    parser.add_argument(
+        "--min-shard-frames",
+        type=int,
+        default=2 * FPS,
+        help="Ranges shorter than this are never sharded (default: 2 seconds).",
+    )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Frame cache root (env FRAME_CACHE_DIR).")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_MB)
+    parser.add_argument("--no-cache", action="store_true", help="Always decode; do not read or fill the frame cache.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the extraction plan without decoding.")
+    return parser.parse_args()
+
+
+def resolve_paths(args: argparse.Namespace) -> Tuple[Path, Path, Path]:
+    base = Path(args.yt_base_dir).expanduser().resolve()
+    root = base / args.video_name
+    tags_path = Path(args.tags).expanduser().resolve() if args.tags else (root / "tags.txt")
+    video_path = (
+        Path(args.video).expanduser().resolve()
+        if args.video
+        else (root / "video" / f"{args.video_name}.webm")
+    )
+    frames_dir = (
+        Path(args.frames_dir).expanduser().resolve()
+        if args.frames_dir
+        else (root / "frames")
+    )
+    return tags_path, video_path, frames_dir
+
+
+def parse_tag_timestamp(value: str) -> int:
+    """Convert HH:MM:SS[.FF] (FF = 1-based frame within the second) to a 60fps index."""
+    m = TAG_TS_RE.match(value)
+    if not m:
+        raise ValueError(f"Invalid timestamp: {value}")
+    hh, mm, ss, ff = m.groups()
+    frame = int(ff) if ff else 1
+    if frame < 1 or frame > FPS:
+        raise ValueError(f"Frame suffix out of range (01-{FPS}): {value}")
+    return (int(hh) * 3600 + int(mm) * 60 + int(ss)) * FPS + frame - 1
+
+
+def load_tags(path: Path) -> List[TagEntry]:
+    """Parse tags.txt lines of the form `START END<whitespace>comment`.
+
+    start == end selects one frame. start < end selects the half-open range
+    [start, end), matching the end tag extract-frame.sh appends for ranges.
+    """
+    if not path.exists():
+        raise SystemExit(f"Missing tags.txt: {path}")
+    entries: List[TagEntry] = []
+    for line_no, raw in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(None, 2)
+        if len(parts) < 2:
+            print(f"[WARN] tags.txt:{line_no}: expected START END, skipping: {line}")
+            continue
+        try:
+            start_idx = parse_tag_timestamp(parts[0])
+            end_idx = parse_tag_timestamp(parts[1])
+        except ValueError as exc:
+            print(f"[WARN] tags.txt:{line_no}: {exc}, skipping")
+            continue
+        if end_idx < start_idx:
+            print(f"[WARN] tags.txt:{line_no}: end before start, skipping: {line}")
+            continue
+        comment = parts[2].strip() if len(parts) > 2 else ""
+        entries.append(TagEntry(line_no=line_no, start_idx=start_idx, end_idx=end_idx, comment=comment))
+    if not entries:
+        raise SystemExit(f"No tag entries found in {path}")
+    return entries
+
+
+def frame_indices(entries: List[TagEntry]) -> List[int]:
+    wanted = set()
+    for entry in entries:
+        if entry.is_range:
+            wanted.update(range(entry.start_idx, entry.end_idx))
+        else:
+            wanted.add(entry.start_idx)
+    return sorted(wanted)
+
+
+def frame_name(index: int) -> str:
+    seconds, frame = divmod(index, FPS)
+    hh, rem = divmod(seconds, 3600)
+    mm, ss = divmod(rem, 60)
+    return f"frame__{hh:02d}_{mm:02d}_{ss:02d}.{frame + 1:02d}.png"
+
+
+def split_passes(indices: List[int], max_gap: Optional[float]) -> List[List[int]]:
+    if not indices:
+        return []
+    if max_gap is None:
+        return [indices]
+    limit = int(max_gap * FPS)
+    passes: List[List[int]] = [[indices[0]]]
+    for idx in indices[1:]:
+        if idx - passes[-1][-1] > limit:
+            passes.append([idx])
+        else:
+            passes[-1].append(idx)
+    return passes
+
+
+def to_runs(indices: List[int]) -> List[Tuple[int, int]]:
+    runs: List[Tuple[int, int]] = []
+    for idx in indices:
+        if runs and idx == runs[-1][1] + 1:
+            runs[-1] = (runs[-1][0], idx)
+        else:
+            runs.append((idx, idx))
+    return runs
+
+
+def build_ffmpeg_cmd(
+    video_path: Path,
+    indices: List[int],
+    base: Optional[int] = None,
+    output_args: Optional[List[str]] = None,
+) -> List[str]:
+    """ffmpeg command that decodes once from `base` (a 60fps index) and pipes frames.
+
+    Output defaults to a PNG stream on stdout; pass `output_args` for another
+    format (e.g. rawvideo for in-process NumPy frames).
+
+    By default `base` is the first wanted whole second, which keeps frame 0 of
+    the fps=60 filter at .01 exactly like `extract-frame.sh`; `select` then
+    drops everything not requested. Shards pass their keyframe-aligned start.
+    """
+    if base is None:
+        base = (indices[0] // FPS) * FPS
+    last = indices[-1] - base
+    select = "+".join(f"between(n,{a - base},{b - base})" for a, b in to_runs(indices))
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-ss",
+        str(base // FPS) if base % FPS == 0 else f"{base / FPS:.6f}",
+        "-i",
+        str(video_path),
+        "-t",
+        f"{(last + 2) / FPS:.6f}",
+        "-vf",
+        f"fps={FPS},select='{select}'",
+        "-vsync",
+        "0",
+        "-frames:v",
+        str(len(indices)),
+        *(output_args if output_args is not None else PNG_PIPE_ARGS),
+    ]
+
+
+def iter_png_stream(stream: BinaryIO) -> Iterator[bytes]:
+    """Split a concatenated PNG byte stream (image2pipe) into individual files."""
+    while True:
+        sig = stream.read(len(PNG_SIGNATURE))
+        if not sig:
+            return
+        if sig != PNG_SIGNATURE:
+            raise RuntimeError("Unexpected data in ffmpeg PNG stream")
+        parts = [sig]
+        while True:
+            header = stream.read(8)
+            if len(header) < 8:
+                raise RuntimeError("Truncated PNG chunk header in ffmpeg stream")
+            length = int.from_bytes(header[:4], "big")
+            body = stream.read(length + 4)
+            if len(body) < length + 4:
+                raise RuntimeError("Truncated PNG chunk in ffmpeg stream")
+            parts.append(header)
+            parts.append(body)
+            if header[4:8] == b"IEND":
+                break
+        yield b"".join(parts)
+
+
+def decode_pass(
+    video_path: Path, indices: List[int], frames_dir: Path, base: Optional[int] = None
+) -> int:
+    cmd = build_ffmpeg_cmd(video_path, indices, base)
+    written = 0
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    try:
+        for png in iter_png_stream(proc.stdout):
+            if written >= len(indices):
+                break
+            (frames_dir / frame_name(indices[written])).write_bytes(png)
+            written += 1
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise SystemExit(f"ffmpeg failed (exit {returncode}) for pass starting at {frame_name(indices[0])}")
+    if written < len(indices):
+        print(
+            f"[WARN] ffmpeg produced {written}/{len(indices)} frames for pass starting at "
+            f"{frame_name(indices[0])} (video may end early)"
+        )
+    return written
+
+
+def decode_shard(task: Tuple[Path, List[int], Path, Optional[int]]) -> int:
+    video_path, indices, frames_dir, base = task
+    return decode_pass(video_path, indices, frames_dir, base)
+
+
+def probe_keyframes(video_path: Path, start_idx: int, end_idx: int) -> List[int]:
+    """Keyframe positions (as 60fps indices) inside [start_idx, end_idx].
+
+    Reads packet flags only, so no frames are decoded.
+    """
+    start_s = start_idx / FPS
+    end_s = (end_idx + 1) / FPS
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-read_intervals",
+        f"{start_s:.6f}%{end_s:.6f}",
+        "-show_entries",
+        "packet=pts_time,flags",
+        "-of",
+        "csv=p=0",
+        str(video_path),
+    ]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    keyframes = set()
+    for line in out.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or "K" not in parts[1]:
+            continue
+        try:
+            idx = math.ceil(float(parts[0]) * FPS - 1e-6)
+        except ValueError:
+            continue
+        if start_idx < idx <= end_idx:
+            keyframes.add(idx)
+    return sorted(keyframes)
+
+
+def shard_run(start_idx: int, end_idx: int, keyframes: List[int], shards: int) -> List[Tuple[int, int]]:
+    """Cut the inclusive run [start_idx, end_idx] into about `shards` pieces at keyframes."""
+    target = (end_idx - start_idx + 1) / max(1, shards)
+    pieces: List[Tuple[int, int]] = []
+    cur = start_idx
+    for kf in keyframes:
+        if kf - cur >= target and end_idx - kf + 1 >= target / 2:
+            pieces.append((cur, kf - 1))
+            cur = kf
+    pieces.append((cur, end_idx))
+    return pieces
+
+
+def plan_shards(
+    video_path: Path,
+    passes: List[List[int]],
+    workers: int,
+    min_shard_frames: int,
+) -> List[Tuple[List[int], Optional[int]]]:
+    """Split each pass into keyframe-aligned range shards plus one leftover pass.
+
+    Returns (frame indices, decode base) per task, where the base is a shard's
+    keyframe start, or None to use build_ffmpeg_cmd's default.
+
+    Runs of at least `min_shard_frames` consecutive indices become shards that
+    seek directly to their first keyframe; everything else (single frames,
+    short ranges) stays in a single-pass task. Indices are global, so the
+    stitched output names are identical to the serial path.
+    """
+    tasks: List[Tuple[List[int], Optional[int]]] = []
+    for frames in passes:
+        leftover: List[int] = []
+        for a, b in to_runs(frames):
+            if b - a + 1 < min_shard_frames:
+                leftover.extend(range(a, b + 1))
+                continue
+            keyframes = probe_keyframes(video_path, a, b)
+            shards = max(1, min(workers, (b - a + 1) // max(1, min_shard_frames // 2)))
+            for sa, sb in shard_run(a, b, keyframes, shards):
+                tasks.append((list(range(sa, sb + 1)), sa if sa != a else None))
+        if leftover:
+            tasks.append((leftover, None))
+    # Longest shards first keeps the pool busy until the end.
+    tasks.sort(key=lambda t: len(t[0]), reverse=True)
+    return tasks
+
+
+def restore_from_cache(
+    cache: FrameCache, video_hash: str, indices: List[int], frames_dir: Path
+) -> List[int]:
+    """Materialize cached frames into frames_dir; return the indices still to decode."""
+    missing: List[int] = []
+    for idx in indices:
+        cached = cache.get(cache.key(video_hash, idx))
+        if cached is None:
+            missing.append(idx)
+            continue
+        dest = frames_dir / frame_name(idx)
+        if not dest.exists() or dest.stat().st_size != cached.stat().st_size:
+            shutil.copyfile(cached, dest)
+    return missing
+
+
+def fill_cache(cache: FrameCache, video_hash: str, indices: List[int], frames_dir: Path) -> None:
+    for idx in indices:
+        path = frames_dir / frame_name(idx)
+        if path.exists():
+            cache.put_file(cache.key(video_hash, idx), path, {"index": idx, "video": video_hash})
+
+
+def ensure_video(video_path: Path, video_name: str) -> None:
+    if video_path.exists():
+        return
+    print(f"Video missing, fetching {video_name}.webm")
+    fetch_video(video_name, video_path)
+
+
+def main() -> None:
+    args = parse_args()
+    tags_path, video_path, frames_dir = resolve_paths(args)
+    entries = load_tags(tags_path)
+    indices = frame_indices(entries)
+    passes = split_passes(indices, args.max_gap)
+
+    singles = sum(1 for e in entries if not e.is_range)
+    print(
+        f"tags.txt: {len(entries)} entries ({singles} single, {len(entries) - singles} range) "
+        f"-> {len(indices)} frames in {len(passes)} decode pass(es)"
+    )
+    if args.dry_run:
+        for frames in passes:
+            print(f"  pass {frame_name(frames[0])} .. {frame_name(frames[-1])}: {len(frames)} frames")
+        return
+
+    if shutil.which("ffmpeg") is None:
+        raise SystemExit("Missing dependency: ffmpeg (apt install ffmpeg)")
+    ensure_video(video_path, args.video_name)
+    frames_dir.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    cache: Optional[FrameCache] = None
+    video_hash = ""
+    if not args.no_cache:
+        cache = FrameCache(args.cache_dir, max_bytes=args.cache_max_mb << 20)
+        video_hash = cache.video_hash(video_path)
+        to_decode = restore_from_cache(cache, video_hash, indices, frames_dir)
+        print(f"Frame cache: {cache.hits} hits, {cache.misses} misses ({cache.root})")
+        passes = split_passes(to_decode, args.max_gap)
+    else:
+        to_decode = indices
+
+    written = 0
+    if args.workers > 1:
+        if shutil.which("ffprobe") is None:
+            raise SystemExit("Missing dependency: ffprobe (apt install ffmpeg)")
+        shards = plan_shards(video_path, passes, args.workers, args.min_shard_frames)
+        print(f"Decoding {len(shards)} shard(s) with {args.workers} workers")
+        tasks = [(video_path, frames, frames_dir, base) for frames, base in shards]
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for count in pool.map(decode_shard, tasks):
+                written += count
+    else:
+        for frames in passes:
+            written += decode_pass(video_path, frames, frames_dir)
+    if cache is not None:
+        fill_cache(cache, video_hash, to_decode, frames_dir)
+        evicted = cache.evict()
+        if evicted:
+            print(f"Frame cache: evicted {evicted} LRU entries")
+        cache.save()
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {written} frames to {frames_dir}")
+    print(f"Throughput: {written / max(elapsed, 1e-9):.1f} frames/s ({elapsed:.2f}s wall)")
+
+
+if __name__ == "__main__":
+    main()
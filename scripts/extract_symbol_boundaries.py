@@ -13,9 +13,15 @@ from __future__ import annotations
 import argparse
 import csv
 import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import Deque, List, Optional, Tuple
+
+from feature_maps import FrameFeatures
+from frame_cache import FrameCache
+from frame_source import iter_source_frames
 
 cv2 = None
 np = None
@@ -83,6 +89,33 @@ def parse_args() -> argparse.Namespace:
         default=0.20,
         help="Lower values keep more crops; raise to filter fuzzy crops.",
     )
+    parser.add_argument(
+        "--frame-cache",
+        default=None,
+        help="Frame cache dir to read frames from when they are missing in --frames-dir.",
+    )
+    parser.add_argument(
+        "--video",
+        default=None,
+        help="Source video for frame cache lookups and --from-video (defaults under yt/<VIDEO_NAME>/video/<VIDEO_NAME>.webm)",
+    )
+    parser.add_argument(
+        "--from-video",
+        action="store_true",
+        help="Decode listed frames from the video into memory instead of reading PNGs.",
+    )
+    parser.add_argument("--write-frames", action="store_true", help="With --from-video, also write decoded PNGs.")
+    parser.add_argument(
+        "--frame-store",
+        default=None,
+        help="Memory-mapped frame store dir (see frame_store.py) to read frames from before PNGs.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Process frames in a pool of this many processes (report is identical to the serial run).",
+    )
     parser.add_argument(
         "--allow-non-yolo-override",
         action="store_true",
@@ -126,10 +159,6 @@ def load_frame_list(path: Path) -> List[str]:
     return frames
 
 
-def image_sharpness(gray: np.ndarray) -> float:
-    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
-
-
 def nms_boxes(
     boxes: List[Tuple[int, int, int, int, float]], iou_thresh: float = 0.35
 ) -> List[Tuple[int, int, int, int, float]]:
@@ -163,6 +192,82 @@ def nms_boxes(
     return [boxes[i] for i in keep]
 
 
+def external_boxes(mask: np.ndarray) -> np.ndarray:
+    """Bounding boxes (N, 4) of x, y, w, h for the mask's external contours.
+
+    Same boxes, in the same order, as cv2.findContours(RETR_EXTERNAL) +
+    cv2.boundingRect, without a Python loop. findContours treats everything
+    outside the image as background and drops blobs that sit inside another
+    blob's hole, so pad a background frame, fill holes (background not
+    4-connected to the outside), and take 8-connected component stats.
+    findContours returns contours in reverse order of discovery, i.e. of each
+    blob's first pixel in raster order; sort the components the same way so
+    NMS breaks score ties identically.
+    """
+    fg = (mask > 0).astype(np.uint8)
+    outside = cv2.copyMakeBorder(fg, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    flood_mask = np.zeros((outside.shape[0] + 2, outside.shape[1] + 2), dtype=np.uint8)
+    cv2.floodFill(outside, flood_mask, (0, 0), 1, flags=4)
+    filled = fg | (1 - outside[1:-1, 1:-1])
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(filled, connectivity=8)
+    if count <= 1:
+        return np.zeros((0, 4), dtype=np.int64)
+    ids = np.arange(1, count)
+    tops = stats[1:, cv2.CC_STAT_TOP]
+    # First pixel of each blob: leftmost pixel of the blob on its top row.
+    first_x = (labels[tops] == ids[:, None]).argmax(axis=1)
+    order = np.argsort(-(tops.astype(np.int64) * fg.shape[1] + first_x), kind="stable")
+    return stats[1:, :4][order].astype(np.int64)
+
+
+def score_boxes(
+    mask: np.ndarray,
+    boxes: np.ndarray,
+    min_area_ratio: float,
+    max_area_ratio: float,
+    min_aspect_ratio: float,
+    max_aspect_ratio: float,
+) -> List[Tuple[int, int, int, int, float]]:
+    """Filter and score all boxes at once; edge density comes from an integral image."""
+    if len(boxes) == 0:
+        return []
+    h, w = mask.shape[:2]
+    frame_area = float(h * w)
+    x, y, cw, ch = (boxes[:, i] for i in range(4))
+    area = (cw * ch).astype(np.float64)
+    area_ratio = area / frame_area
+    aspect = cw / np.maximum(1.0, ch.astype(np.float64))
+    keep = (
+        (area_ratio >= min_area_ratio)
+        & (area_ratio <= max_area_ratio)
+        & (aspect >= min_aspect_ratio)
+        & (aspect <= max_aspect_ratio)
+    )
+    if not keep.any():
+        return []
+    x, y, cw, ch, area, area_ratio = x[keep], y[keep], cw[keep], ch[keep], area[keep], area_ratio[keep]
+
+    # favor boxes near center and with dense edges
+    integral = cv2.integral((mask > 0).astype(np.uint8), sdepth=cv2.CV_64F)
+    x2 = x + cw
+    y2 = y + ch
+    nonzero = integral[y2, x2] - integral[y, x2] - integral[y2, x] + integral[y, x]
+    edge_density = nonzero / np.maximum(1.0, area)
+    cx = x + cw / 2.0
+    cy = y + ch / 2.0
+    center_bias = 1.0 - (
+        np.abs(cx - w / 2.0) / (w / 2.0) * 0.35 + np.abs(cy - h / 2.0) / (h / 2.0) * 0.65
+    )
+    area_bonus = np.minimum(1.0, area_ratio / 0.12)
+    # Larger boxes are favored to reduce partial-symbol crops.
+    score = (
+        np.maximum(0.0, center_bias) * 0.45
+        + np.minimum(1.0, edge_density * 2.0) * 0.25
+        + area_bonus * 0.30
+    )
+    return list(zip(x.tolist(), y.tolist(), cw.tolist(), ch.tolist(), score.tolist()))
+
+
 def detect_candidates(
     image: np.ndarray,
     min_area_ratio: float,
@@ -171,8 +276,6 @@ def detect_candidates(
     max_aspect_ratio: float,
     max_crops_per_frame: int,
 ) -> List[Tuple[int, int, int, int, float]]:
-    h, w = image.shape[:2]
-    frame_area = float(h * w)
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     blur = cv2.GaussianBlur(gray, (5, 5), 0)
 
@@ -190,36 +293,9 @@ def detect_candidates(
     mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=2)
     mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=1)
 
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    raw_boxes: List[Tuple[int, int, int, int, float]] = []
-    for contour in contours:
-        x, y, cw, ch = cv2.boundingRect(contour)
-        area = float(cw * ch)
-        area_ratio = area / frame_area
-        if area_ratio < min_area_ratio or area_ratio > max_area_ratio:
-            continue
-        aspect = cw / max(1.0, float(ch))
-        if aspect < min_aspect_ratio or aspect > max_aspect_ratio:
-            continue
-
-        # favor boxes near center and with dense edges
-        patch = mask[y : y + ch, x : x + cw]
-        edge_density = float(np.count_nonzero(patch)) / max(1.0, area)
-        cx = x + cw / 2.0
-        cy = y + ch / 2.0
-        center_bias = 1.0 - (
-            abs(cx - w / 2.0) / (w / 2.0) * 0.35 + abs(cy - h / 2.0) / (h / 2.0) * 0.65
-        )
-        area_bonus = min(1.0, area_ratio / 0.12)
-        # Larger boxes are favored to reduce partial-symbol crops.
-        score = (
-            max(0.0, center_bias) * 0.45
-            + min(1.0, edge_density * 2.0) * 0.25
-            + area_bonus * 0.30
-        )
-        raw_boxes.append((x, y, cw, ch, score))
-
+    raw_boxes = score_boxes(
+        mask, external_boxes(mask), min_area_ratio, max_area_ratio, min_aspect_ratio, max_aspect_ratio
+    )
     merged = nms_boxes(raw_boxes, iou_thresh=0.35)
     merged.sort(key=lambda b: b[4], reverse=True)
     return merged[:max_crops_per_frame]
@@ -284,15 +360,7 @@ def save_report(candidates: List[Candidate], output_dir: Path) -> None:
     report_md.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
 
-def main() -> None:
-    args = parse_args()
-    if not args.allow_non_yolo_override:
-        raise SystemExit(
-            "Blocked by policy: non-YOLO extraction is disabled by default.\n"
-            "If explicitly instructed by a human, rerun with:\n"
-            "  --allow-non-yolo-override"
-        )
-
+def lazy_imports() -> None:
     global cv2, np
     try:
         import cv2 as _cv2  # type: ignore
@@ -306,80 +374,140 @@ def main() -> None:
     cv2 = _cv2
     np = _np
 
-    symbol_frames_path, frames_dir, output_dir = resolve_paths(args)
-    output_dir.mkdir(parents=True, exist_ok=True)
 
-    frame_names = load_frame_list(symbol_frames_path)
-    accepted: List[Candidate] = []
+def process_frame(
+    frame_name: str,
+    frame_path: Path,
+    image: Optional[np.ndarray],
+    output_dir: Path,
+    args: argparse.Namespace,
+) -> List[Candidate]:
+    """Detect, score and export crops for one frame (runs in pool workers too)."""
+    if cv2 is None:
+        lazy_imports()
+    if image is None:
+        image = cv2.imread(str(frame_path), cv2.IMREAD_COLOR)
+    if image is None:
+        print(f"[WARN] Failed to read image: {frame_path}")
+        return []
 
-    for frame_name in frame_names:
-        frame_path = frames_dir / frame_name
-        if not frame_path.exists():
-            print(f"[WARN] Missing frame: {frame_path}")
+    features = FrameFeatures(image)
+    boxes = detect_candidates(
+        image=image,
+        min_area_ratio=args.min_area_ratio,
+        max_area_ratio=args.max_area_ratio,
+        min_aspect_ratio=args.min_aspect_ratio,
+        max_aspect_ratio=args.max_aspect_ratio,
+        max_crops_per_frame=args.max_crops_per_frame,
+    )
+
+    accepted: List[Candidate] = []
+    h, w = image.shape[:2]
+    frame_stem = Path(frame_name).stem
+    for idx, (x, y, bw, bh, score) in enumerate(boxes, start=1):
+        dynamic_pad = int(max(bw, bh) * args.padding_ratio) + args.padding
+        dynamic_pad = max(args.min_padding, min(args.max_padding, dynamic_pad))
+        x0 = max(0, x - dynamic_pad)
+        y0 = max(0, y - dynamic_pad)
+        x1 = min(w, x + bw + dynamic_pad)
+        y1 = min(h, y + bh + dynamic_pad)
+
+        crop = image[y0:y1, x0:x1]
+        if crop.size == 0:
             continue
 
-        image = cv2.imread(str(frame_path), cv2.IMREAD_COLOR)
-        if image is None:
-            print(f"[WARN] Failed to read image: {frame_path}")
+        crop_sharpness = features.sharpness(x0, y0, x1, y1)
+        edge_density = features.edge_density(x0, y0, x1, y1)
+
+        # score fusion: contour score + crop sharpness + edge density
+        sharp_norm = min(1.0, crop_sharpness / 350.0)
+        final_score = score * 0.45 + sharp_norm * 0.40 + min(1.0, edge_density * 3.0) * 0.15
+        if final_score < args.min_score:
             continue
 
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        frame_sharpness = image_sharpness(gray)
-        boxes = detect_candidates(
-            image=image,
-            min_area_ratio=args.min_area_ratio,
-            max_area_ratio=args.max_area_ratio,
-            min_aspect_ratio=args.min_aspect_ratio,
-            max_aspect_ratio=args.max_aspect_ratio,
-            max_crops_per_frame=args.max_crops_per_frame,
+        crop_name = f"{frame_stem}__cand_{idx:02d}.png"
+        crop_path = output_dir / crop_name
+        cv2.imwrite(str(crop_path), crop)
+
+        accepted.append(
+            Candidate(
+                frame_name=frame_name,
+                contour_idx=idx,
+                x=x0,
+                y=y0,
+                w=x1 - x0,
+                h=y1 - y0,
+                area_px=(x1 - x0) * (y1 - y0),
+                sharpness=float(crop_sharpness),
+                edge_density=float(edge_density),
+                score=float(final_score),
+                crop_path=crop_path,
+            )
         )
+    return accepted
 
-        h, w = image.shape[:2]
-        frame_stem = Path(frame_name).stem
-        for idx, (x, y, bw, bh, score) in enumerate(boxes, start=1):
-            dynamic_pad = int(max(bw, bh) * args.padding_ratio) + args.padding
-            dynamic_pad = max(args.min_padding, min(args.max_padding, dynamic_pad))
-            x0 = max(0, x - dynamic_pad)
-            y0 = max(0, y - dynamic_pad)
-            x1 = min(w, x + bw + dynamic_pad)
-            y1 = min(h, y + bh + dynamic_pad)
-
-            crop = image[y0:y1, x0:x1]
-            if crop.size == 0:
-                continue
 
-            crop_gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-            crop_sharpness = image_sharpness(crop_gray)
-            edges = cv2.Canny(crop_gray, 40, 120)
-            edge_density = float(np.count_nonzero(edges)) / max(
-                1.0, float(crop_gray.shape[0] * crop_gray.shape[1])
-            )
+def process_frame_task(task: Tuple[str, Path, Optional[np.ndarray], Path, argparse.Namespace]) -> List[Candidate]:
+    return process_frame(*task)
 
-            # score fusion: contour score + crop sharpness + edge density
-            sharp_norm = min(1.0, crop_sharpness / 350.0)
-            final_score = score * 0.45 + sharp_norm * 0.40 + min(1.0, edge_density * 3.0) * 0.15
-            if final_score < args.min_score:
-                continue
 
-            crop_name = f"{frame_stem}__cand_{idx:02d}.png"
-            crop_path = output_dir / crop_name
-            cv2.imwrite(str(crop_path), crop)
-
-            accepted.append(
-                Candidate(
-                    frame_name=frame_name,
-                    contour_idx=idx,
-                    x=x0,
-                    y=y0,
-                    w=x1 - x0,
-                    h=y1 - y0,
-                    area_px=(x1 - x0) * (y1 - y0),
-                    sharpness=float(crop_sharpness),
-                    edge_density=float(edge_density),
-                    score=float(final_score),
-                    crop_path=crop_path,
-                )
-            )
+def main() -> None:
+    args = parse_args()
+    if not args.allow_non_yolo_override:
+        raise SystemExit(
+            "Blocked by policy: non-YOLO extraction is disabled by default.\n"
+            "If explicitly instructed by a human, rerun with:\n"
+            "  --allow-non-yolo-override"
+        )
+
+    lazy_imports()
+
+    symbol_frames_path, frames_dir, output_dir = resolve_paths(args)
+    frame_cache = FrameCache(args.frame_cache) if args.frame_cache else None
+    video_path = (
+        Path(args.video).expanduser().resolve()
+        if args.video
+        else Path(args.yt_base_dir).expanduser().resolve() / args.video_name / "video" / f"{args.video_name}.webm"
+    )
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    frame_names = load_frame_list(symbol_frames_path)
+    accepted: List[Candidate] = []
+
+    frame_iter = iter_source_frames(
+        frame_names,
+        video_path,
+        frames_dir,
+        args.from_video,
+        args.write_frames,
+        Path(args.frame_store).expanduser().resolve() if args.frame_store else None,
+    )
+    # Frames stream through the pool: at most 2 * workers decoded frames are in flight, and
+    # results are collected in submission order, so the merge matches the serial run.
+    pool = ProcessPoolExecutor(max_workers=args.workers, initializer=lazy_imports) if args.workers > 1 else None
+    window: Deque[Future] = deque()
+    try:
+        for frame_name, image in frame_iter:
+            frame_path = frames_dir / frame_name
+            if image is None and not frame_path.exists() and frame_cache is not None:
+                frame_path = frame_cache.frame_path(video_path, frame_name) or frame_path
+            if image is None and not frame_path.exists():
+                print(f"[WARN] Missing frame: {frame_path}")
+                continue
+            task = (frame_name, frame_path, image, output_dir, args)
+            if pool is None:
+                accepted.extend(process_frame(*task))
+                continue
+            window.append(pool.submit(process_frame_task, task))
+            while len(window) >= 2 * args.workers:
+                accepted.extend(window.popleft().result())
+        if frame_cache is not None:
+            frame_cache.save_video_hashes()
+        while window:
+            accepted.extend(window.popleft().result())
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
 
     if not accepted:
         print("No crops passed thresholds. Try lowering --min-score or --min-area-ratio.")
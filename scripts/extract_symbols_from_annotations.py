@@ -11,18 +11,23 @@ deduped symbol, and writes final PNGs to output/symbols.
 from __future__ import annotations
 
 import argparse
-import base64
 import csv
 import json
 import os
 import shutil
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
+
+from feature_maps import FrameFeatures
+from frame_source import iter_source_frames
+from hamming_index import cluster_by_hamming
+from llm_client import LLMClient, LLMError, add_llm_client_args, client_from_args, parse_json_reply
+from perceptual_hash import HASHERS, hash_batch, to_ints
+from symbol_index import IndexedCrop, KnownSymbol, SymbolIndex, default_index_path
 
 cv2 = None
 np = None
-requests = None
 
 
 @dataclass
@@ -40,7 +45,7 @@ class CropCandidate:
     area_ratio: float
     sharpness: float
     score: float
-    dhash64: int
+    hash64: int
     crop_path: Path
 
 
@@ -67,31 +72,63 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--symbol-frames", default=None)
     parser.add_argument("--frames-dir", default=None)
     parser.add_argument("--output-dir", default=None, help="Final symbols dir (default: .../output/symbols)")
+    parser.add_argument("--video", default=None, help="Source video for --from-video decoding.")
+    parser.add_argument(
+        "--from-video",
+        action="store_true",
+        help="Decode listed frames from the video into memory instead of reading PNGs.",
+    )
+    parser.add_argument("--write-frames", action="store_true", help="With --from-video, also write decoded PNGs.")
+    parser.add_argument(
+        "--frame-store",
+        default=None,
+        help="Memory-mapped frame store dir (see frame_store.py) to read frames from before PNGs.",
+    )
     parser.add_argument("--annotation-suffix", default="_annotated.json")
     parser.add_argument("--min-width", type=int, default=20)
     parser.add_argument("--min-height", type=int, default=20)
     parser.add_argument("--min-area-ratio", type=float, default=0.001)
     parser.add_argument("--dedup-hamming-threshold", type=int, default=8)
+    parser.add_argument(
+        "--dedup-hash",
+        choices=sorted(HASHERS),
+        default="dhash",
+        help="Perceptual hash used for dedup (phash is sturdier to rescaling/compression).",
+    )
+    parser.add_argument(
+        "--symbol-index",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="Read and update the persistent hash index shared across runs/videos "
+        "(PATH defaults to <yt-base-dir>/symbol-index.sqlite). Off unless given.",
+    )
     parser.add_argument("--llm-label", action="store_true", help="Use Kimi to label deduped symbols.")
     parser.add_argument("--llm-model", default="kimi-k2.5")
     parser.add_argument("--moonshot-base-url", default="https://api.moonshot.ai/v1")
+    parser.add_argument(
+        "--llm-batch-size",
+        type=int,
+        default=1,
+        help="Crops per labeling request (>1 sends one multi-image message; unparseable replies are split).",
+    )
+    add_llm_client_args(parser)
     return parser.parse_args()
 
 
 def lazy_imports() -> None:
-    global cv2, np, requests
+    global cv2, np
     try:
         import cv2 as _cv2  # type: ignore
         import numpy as _np
-        import requests as _requests
     except Exception as exc:  # pragma: no cover
         raise SystemExit(
             "Missing dependencies. Install with:\n"
-            "  pip install opencv-python numpy requests\n"
+            "  pip install opencv-python numpy\n"
         ) from exc
     cv2 = _cv2
     np = _np
-    requests = _requests
 
 
 def resolve_paths(args: argparse.Namespace) -> tuple[Path, Path, Path]:
@@ -151,28 +188,15 @@ def parse_rectangles(json_path: Path) -> List[Dict[str, Any]]:
     return rows
 
 
-def image_sharpness(gray: "np.ndarray") -> float:
-    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
-
-
-def dhash64(image: "np.ndarray") -> int:
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    resized = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
-    diff = resized[:, 1:] > resized[:, :-1]
-    bits = 0
-    for i, v in enumerate(diff.flatten()):
-        if bool(v):
-            bits |= 1 << i
-    return bits
-
-
-def hamming(a: int, b: int) -> int:
-    return (a ^ b).bit_count()
-
-
-def encode_image_data_uri(path: Path) -> str:
-    data = base64.b64encode(path.read_bytes()).decode("utf-8")
-    return f"data:image/png;base64,{data}"
+def unique_label(base: str, used: Set[str], taken: Set[str] = frozenset()) -> str:
+    """`base`, or `base_02`, `base_03`, ... if already used in this run or taken in the index."""
+    label = base
+    n = 1
+    while label in used or label in taken:
+        n += 1
+        label = f"{base}_{n:02d}"
+    used.add(label)
+    return label
 
 
 def sanitize_label(label: str) -> str:
@@ -181,10 +205,7 @@ def sanitize_label(label: str) -> str:
     return clean or "unknown"
 
 
-def llm_label_crop(crop_path: Path, model_name: str, base_url: str) -> Optional[tuple[str, str]]:
-    api_key = os.environ.get("MOONSHOT_API_KEY")
-    if not api_key:
-        return None
+def llm_label_crop(client: LLMClient, crop_path: Path) -> Optional[tuple[str, str]]:
     prompt = (
         "You are labeling slot machine symbol crops.\n"
         "Return strict JSON only:\n"
@@ -194,45 +215,75 @@ def llm_label_crop(crop_path: Path, model_name: str, base_url: str) -> Optional[
         "- do not include 'symbol_' prefix.\n"
         "- if uncertain, still provide best short label.\n"
     )
-    payload = {
-        "model": model_name,
-        "temperature": 0,
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": encode_image_data_uri(crop_path)}},
-                ],
-            }
-        ],
-    }
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    content = [
+        {"type": "text", "text": prompt},
+        client.image_part(crop_path),
+    ]
     try:
-        resp = requests.post(
-            f"{base_url.rstrip('/')}/chat/completions",
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=45,
-        )
-        resp.raise_for_status()
-        text = resp.json()["choices"][0]["message"]["content"]
-        if isinstance(text, list):
-            text = "".join([x.get("text", "") for x in text if isinstance(x, dict)])
-        text = str(text).strip()
-        if text.startswith("```"):
-            text = text.strip("`")
-            if text.lower().startswith("json"):
-                text = text[4:].strip()
-        obj = json.loads(text)
+        obj = client.chat(content, parse=parse_json_reply)
         label = sanitize_label(str(obj.get("label", "unknown")))
         reason = str(obj.get("reason", "llm_label")).strip() or "llm_label"
         return label, reason
-    except Exception:
+    except (LLMError, ValueError, AttributeError) as exc:
+        print(f"[WARN] LLM label failed for {crop_path.name}: {exc}")
         return None
 
 
-def write_reports(base_dir: Path, candidates: List[CropCandidate], finals: List[FinalSymbol]) -> None:
+def parse_batch_labels(text: str, count: int) -> List[tuple[str, str]]:
+    """(label, reason) per image from a JSON array reply; ValueError unless all `count` are present."""
+    items = parse_json_reply(text)
+    if not isinstance(items, list):
+        raise ValueError("batch reply is not a JSON array")
+    by_index: Dict[int, tuple[str, str]] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("batch reply item is not an object")
+        idx = int(item.get("index", 0))
+        label = sanitize_label(str(item.get("label", "unknown")))
+        reason = str(item.get("reason", "llm_label")).strip() or "llm_label"
+        by_index[idx] = (label, reason)
+    missing = [i for i in range(1, count + 1) if i not in by_index]
+    if missing:
+        raise ValueError(f"batch reply missing indices {missing}")
+    return [by_index[i] for i in range(1, count + 1)]
+
+
+def llm_label_batch(client: LLMClient, crop_paths: List[Path]) -> List[Optional[tuple[str, str]]]:
+    """Label several crops with one multi-image request; halve the batch when the reply does not parse."""
+    if len(crop_paths) == 1:
+        return [llm_label_crop(client, crop_paths[0])]
+    n = len(crop_paths)
+    prompt = (
+        f"You are labeling {n} slot machine symbol crops, attached in order as images 1..{n}.\n"
+        "Return strict JSON only, one entry per image:\n"
+        '[{"index":1,"label":"snake_case_symbol_name","reason":"short reason"}, ...]\n'
+        "Rules:\n"
+        "- label must be short, lowercase snake_case.\n"
+        "- do not include 'symbol_' prefix.\n"
+        "- if uncertain, still provide best short label.\n"
+    )
+    content: List[Dict[str, Any]] = [{"type": "text", "text": prompt}]
+    for path in crop_paths:
+        content.append(client.image_part(path))
+    try:
+        labels = client.chat(content, parse=lambda text: parse_batch_labels(text, n))
+        return [(label, f"{reason}|batch={n}") for label, reason in labels]
+    except LLMError as exc:
+        print(f"[WARN] LLM batch label failed for {n} crops: {exc}")
+        return [None] * n
+    except (ValueError, TypeError) as exc:
+        print(f"[WARN] Unparseable batch reply for {n} crops ({exc}); splitting")
+    mid = n // 2
+    return llm_label_batch(client, crop_paths[:mid]) + llm_label_batch(client, crop_paths[mid:])
+
+
+def write_reports(
+    base_dir: Path,
+    candidates: List[CropCandidate],
+    finals: List[FinalSymbol],
+    llm_summary: Optional[str] = None,
+    hash_method: str = "dhash",
+) -> None:
     csv_path = base_dir / "annotation-extract-report.csv"
     md_path = base_dir / "annotation-extract-report.md"
 
@@ -253,8 +304,10 @@ def write_reports(base_dir: Path, candidates: List[CropCandidate], finals: List[
                 "area_ratio",
                 "sharpness",
                 "score",
-                "dhash64",
+                "dhash64",  # kept for existing readers; filled only with --dedup-hash dhash
                 "crop_path",
+                "hash_method",
+                "hash64",
             ]
         )
         for c in candidates:
@@ -273,8 +326,10 @@ def write_reports(base_dir: Path, candidates: List[CropCandidate], finals: List[
                     f"{c.area_ratio:.6f}",
                     f"{c.sharpness:.4f}",
                     f"{c.score:.4f}",
-                    hex(c.dhash64),
+                    hex(c.hash64) if hash_method == "dhash" else "",
                     str(c.crop_path),
+                    hash_method,
+                    hex(c.hash64),
                 ]
             )
 
@@ -284,9 +339,10 @@ def write_reports(base_dir: Path, candidates: List[CropCandidate], finals: List[
         f"- Total candidates: {len(candidates)}",
         f"- Final deduplicated symbols: {len(finals)}",
         f"- Candidate report: `{csv_path}`",
-        "",
-        "## Final outputs",
     ]
+    if llm_summary:
+        lines.append(f"- {llm_summary}")
+    lines += ["", "## Final outputs"]
     for s in finals:
         lines.append(
             f"- `{s.output_name}` from `{s.frame_name}` ({s.candidate_id}) score={s.score:.3f} reason={s.reason}"
@@ -300,6 +356,11 @@ def main() -> None:
     symbol_frames, frames_dir, output_dir = resolve_paths(args)
 
     frame_names = load_frame_list(symbol_frames)
+    video_path = (
+        Path(args.video).expanduser().resolve()
+        if args.video
+        else Path(args.yt_base_dir).expanduser().resolve() / args.video_name / "video" / f"{args.video_name}.webm"
+    )
     output_dir.mkdir(parents=True, exist_ok=True)
     run_dir = output_dir.parent / "symbols-annotation"
     candidates_dir = run_dir / "candidates"
@@ -309,9 +370,17 @@ def main() -> None:
     candidates: List[CropCandidate] = []
     candidate_counter = 0
 
-    for frame_name in frame_names:
+    frame_iter = iter_source_frames(
+        frame_names,
+        video_path,
+        frames_dir,
+        args.from_video,
+        args.write_frames,
+        Path(args.frame_store).expanduser().resolve() if args.frame_store else None,
+    )
+    for frame_name, image in frame_iter:
         frame_path = frames_dir / frame_name
-        if not frame_path.exists():
+        if image is None and not frame_path.exists():
             print(f"[WARN] Missing frame: {frame_path}")
             continue
         ann_path = frame_path.with_name(f"{frame_path.stem}{args.annotation_suffix}")
@@ -319,7 +388,8 @@ def main() -> None:
             print(f"[WARN] Missing annotation JSON for frame: {ann_path.name}")
             continue
 
-        image = cv2.imread(str(frame_path), cv2.IMREAD_COLOR)
+        if image is None:
+            image = cv2.imread(str(frame_path), cv2.IMREAD_COLOR)
         if image is None:
             print(f"[WARN] Unable to read frame: {frame_path}")
             continue
@@ -328,6 +398,9 @@ def main() -> None:
         if not rects:
             print(f"[WARN] No rectangle annotations in: {ann_path.name}")
             continue
+        features = FrameFeatures(image)
+        frame_crops: List["np.ndarray"] = []
+        frame_candidates: List[CropCandidate] = []
 
         for rect in rects:
             x1 = max(0, min(w, int(rect["x1"])))
@@ -346,19 +419,18 @@ def main() -> None:
             crop = image[y1:y2, x1:x2]
             if crop.size == 0:
                 continue
-            gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-            sharp = image_sharpness(gray)
+            sharp = features.sharpness(x1, y1, x2, y2)
             area_norm = min(1.0, area_ratio / 0.08)
             sharp_norm = min(1.0, sharp / 320.0)
             score = sharp_norm * 0.60 + area_norm * 0.40
-            digest = dhash64(crop)
 
             candidate_counter += 1
             cid = f"cand_{candidate_counter:04d}"
             crop_path = candidates_dir / f"{Path(frame_name).stem}__{cid}.png"
             cv2.imwrite(str(crop_path), crop)
 
-            candidates.append(
+            frame_crops.append(crop)
+            frame_candidates.append(
                 CropCandidate(
                     candidate_id=cid,
                     frame_name=frame_name,
@@ -373,47 +445,83 @@ def main() -> None:
                     area_ratio=area_ratio,
                     sharpness=sharp,
                     score=score,
-                    dhash64=digest,
+                    hash64=0,
                     crop_path=crop_path,
                 )
             )
 
+        for cand, digest in zip(frame_candidates, to_ints(hash_batch(frame_crops, args.dedup_hash))):
+            cand.hash64 = digest
+        candidates.extend(frame_candidates)
+
     if not candidates:
         raise SystemExit(
             "No annotation crops found. Ensure frame entries exist in symbol-frames.txt "
             "and each frame has a matching *_annotated.json with rectangles."
         )
 
-    # Dedup by dHash + score.
-    clusters: List[List[CropCandidate]] = []
-    for cand in sorted(candidates, key=lambda c: c.score, reverse=True):
-        assigned = False
-        for cluster in clusters:
-            rep = cluster[0]
-            if hamming(cand.dhash64, rep.dhash64) <= args.dedup_hamming_threshold:
-                cluster.append(cand)
-                assigned = True
-                break
-        if not assigned:
-            clusters.append([cand])
+    index: Optional[SymbolIndex] = None
+    known: List[KnownSymbol] = []
+    if args.symbol_index is not None:
+        index = SymbolIndex(
+            Path(args.symbol_index).expanduser().resolve()
+            if args.symbol_index
+            else default_index_path(args.yt_base_dir)
+        )
+        # Only LLM-given labels are worth reusing when the run would ask the LLM anyway.
+        known = index.known_symbols(args.dedup_hash, llm_only=args.llm_label)
+
+    # Dedup by perceptual hash + score; known symbols seed the first clusters.
+    ranked = sorted(candidates, key=lambda c: c.score, reverse=True)
+    groups = cluster_by_hamming([c.hash64 for c in ranked], args.dedup_hamming_threshold, [k.hash64 for k in known])
+    clusters: List[List[CropCandidate]] = [[ranked[i] for i in ids] for ids in groups]
+
+    bests = [max(cluster, key=lambda c: c.score) if cluster else None for cluster in clusters]
+    llm_labels: Dict[int, Optional[tuple[str, str]]] = {}
+    client = client_from_args(args) if args.llm_label else None
+    if client is not None:
+        todo = [n for n, best in enumerate(bests) if best is not None and n >= len(known)]
+        size = max(1, args.llm_batch_size)
+        batches = [todo[i : i + size] for i in range(0, len(todo), size)]
+        results = client.map(lambda batch: llm_label_batch(client, [bests[n].crop_path for n in batch]), batches)
+        llm_labels = {n: label for batch, labels in zip(batches, results) for n, label in zip(batch, labels)}
+        client.close()
+        print(client.summary())
 
     finals: List[FinalSymbol] = []
-    used_names: Dict[str, int] = {}
-    for idx, cluster in enumerate(clusters, start=1):
-        best = sorted(cluster, key=lambda c: c.score, reverse=True)[0]
-        label = f"symbol_{idx:03d}"
-        reason = f"dhash_dedup(size={len(cluster)})"
-
-        if args.llm_label:
-            llm = llm_label_crop(best.crop_path, args.llm_model, args.moonshot_base_url)
+    # Labels must stay unique across the whole index: they name a symbol in later runs.
+    taken: Set[str] = index.labels(args.dedup_hash) if index is not None else set()
+    used: Set[str] = set()
+    indexed: List[IndexedCrop] = []
+    matched = 0
+    idx = 0
+    for cluster_no, cluster in enumerate(clusters):
+        if not cluster:
+            continue
+        best = bests[cluster_no]
+        llm_labeled = False
+        if cluster_no < len(known):
+            symbol = known[cluster_no]
+            matched += 1
+            label = symbol.label
+            llm_labeled = symbol.llm_labeled
+            base_name = unique_label(sanitize_label(label), used)
+            reason = f"index_match(size={len(cluster)},video={symbol.video},frame={symbol.frame_name})"
+        else:
+            idx += 1
+            # With an index, labels outlive the run: derive the placeholder from the hash so it never
+            # names a different symbol later. Without one, a per-run counter is enough.
+            label = f"{best.hash64:016x}" if index is not None else f"symbol_{idx:03d}"
+            reason = f"{args.dedup_hash}_dedup(size={len(cluster)})"
+
+            llm = llm_labels.get(cluster_no)
             if llm is not None:
                 label, llm_reason = llm
+                llm_labeled = True
                 reason = f"{reason}|{llm_reason}"
+            base_name = unique_label(sanitize_label(label), used, taken)
 
-        base_name = sanitize_label(label)
-        used_names[base_name] = used_names.get(base_name, 0) + 1
-        suffix = f"_{used_names[base_name]:02d}" if used_names[base_name] > 1 else ""
-        output_name = f"symbol_{base_name}{suffix}.png"
+        output_name = f"symbol_{base_name}.png"
         out_path = output_dir / output_name
         shutil.copy2(best.crop_path, out_path)
         finals.append(
@@ -427,8 +535,29 @@ def main() -> None:
                 score=best.score,
             )
         )
+        for c in cluster:
+            indexed.append(
+                IndexedCrop(
+                    video=args.video_name,
+                    frame_name=c.frame_name,
+                    rect_idx=c.rect_idx,
+                    x1=c.x1,
+                    y1=c.y1,
+                    x2=c.x2,
+                    y2=c.y2,
+                    hash64=c.hash64,
+                    label=base_name,
+                    llm_labeled=llm_labeled,
+                    # Members of a known symbol leave its representative flag untouched.
+                    is_rep=(c is best) if cluster_no >= len(known) else None,
+                )
+            )
 
-    write_reports(run_dir, candidates, finals)
+    write_reports(run_dir, candidates, finals, client.summary() if client is not None else None, args.dedup_hash)
+    if index is not None:
+        index.record(args.dedup_hash, indexed)
+        print(f"Symbol index: {matched} known symbols matched, {len(indexed)} crops recorded in {index.path}")
+        index.close()
     print(f"Done. Wrote {len(finals)} deduplicated symbols to: {output_dir}")
     print(f"Candidates: {candidates_dir}")
     print(f"Report: {run_dir / 'annotation-extract-report.csv'}")
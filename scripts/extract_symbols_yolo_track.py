@@ -5,7 +5,11 @@ YOLO + object tracking + optional LLM review for symbol extraction.
 Pipeline:
 1) Read curated frames from symbol-frames.txt
 2) Run YOLO detection (open-vocab world model supported) on each frame
+   (--backend onnx/openvino exports the model once with the prompt vocabulary
+   baked in and reuses the cached export on later runs)
 3) Track detections across frames (ByteTrack)
+   Frame loading runs in a prefetch thread and crop PNG encoding in a writer
+   pool, so disk I/O and compression overlap with inference.
 4) Build candidate crops per track
 5) Optionally send top-K candidates to LLM critic to pick best symbol crop
 6) Export final symbol PNGs and report
@@ -14,19 +18,32 @@ Pipeline:
 from __future__ import annotations
 
 import argparse
-import base64
 import csv
+import hashlib
 import json
 import os
+import queue
 import shutil
-from dataclasses import dataclass
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from feature_maps import FrameFeatures
+from frame_cache import FrameCache, sha256_file
+from frame_source import iter_source_frames
+from llm_client import LLMClient, LLMError, add_llm_client_args, client_from_args, parse_json_reply
 
 cv2 = None
 np = None
 YOLO = None
-requests = None
+
+DEFAULT_MODEL = "yolov8s-world.pt"
+# YOLO-World v1 weights cannot be exported; the onnx/openvino backends default to v2.
+DEFAULT_EXPORT_MODEL = "yolov8s-worldv2.pt"
 
 
 @dataclass
@@ -45,6 +62,39 @@ class DetectionCandidate:
     crop_path: Path
 
 
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    busy: float = 0.0
+    blocked: float = 0.0
+    depth_sum: int = 0
+    depth_max: int = 0
+    depth_samples: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def sample_depth(self, depth: int) -> None:
+        with self.lock:
+            self.depth_sum += depth
+            self.depth_max = max(self.depth_max, depth)
+            self.depth_samples += 1
+
+    def add(self, items: int, busy: float) -> None:
+        with self.lock:
+            self.items += items
+            self.busy += busy
+
+    def summary(self) -> str:
+        rate = self.items / self.busy if self.busy > 0 else 0.0
+        line = f"{self.name:<9} items={self.items:<5} busy={self.busy:7.2f}s ({rate:.1f}/s)"
+        if self.blocked:
+            line += f" blocked={self.blocked:.2f}s"
+        if self.depth_samples:
+            avg = self.depth_sum / self.depth_samples
+            line += f" queue avg={avg:.1f} max={self.depth_max}"
+        return line
+
+
 @dataclass
 class SelectedCrop:
     track_id: str
@@ -66,12 +116,49 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--symbol-frames", default=None)
     parser.add_argument("--frames-dir", default=None)
     parser.add_argument("--output-dir", default=None)
-    parser.add_argument("--model", default="yolov8s-world.pt")
+    parser.add_argument(
+        "--frame-cache",
+        default=None,
+        help="Frame cache dir to read frames from when they are missing in --frames-dir.",
+    )
+    parser.add_argument("--video", default=None, help="Source video for frame cache lookups and --from-video.")
+    parser.add_argument(
+        "--from-video",
+        action="store_true",
+        help="Decode listed frames from the video into memory instead of reading PNGs.",
+    )
+    parser.add_argument("--write-frames", action="store_true", help="With --from-video, also write decoded PNGs.")
+    parser.add_argument(
+        "--frame-store",
+        default=None,
+        help="Memory-mapped frame store dir (see frame_store.py) to read frames from before PNGs.",
+    )
+    parser.add_argument(
+        "--model",
+        default=None,
+        help=(
+            f"Ultralytics weights (default: {DEFAULT_MODEL}; {DEFAULT_EXPORT_MODEL} with --backend onnx/openvino, "
+            "which need exportable weights: YOLO-World v2, not v1)."
+        ),
+    )
     parser.add_argument(
         "--prompts",
         default="slot symbol,reel symbol,icon,egyptian symbol",
         help="Comma-separated prompts for YOLO world models.",
     )
+    parser.add_argument(
+        "--backend",
+        choices=["torch", "onnx", "openvino"],
+        default="torch",
+        help="Inference backend. onnx/openvino use a cached export keyed by (model, prompts, imgsz).",
+    )
+    parser.add_argument(
+        "--export-cache-dir",
+        default=os.environ.get(
+            "YOLO_EXPORT_CACHE_DIR",
+            str(Path.home() / ".cache" / "clawd-slots" / "yolo-export"),
+        ),
+    )
     parser.add_argument("--conf", type=float, default=0.20)
     parser.add_argument("--iou", type=float, default=0.45)
     parser.add_argument("--imgsz", type=int, default=960)
@@ -83,30 +170,50 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--max-padding", type=int, default=90)
     parser.add_argument("--max-candidates-per-track", type=int, default=6)
     parser.add_argument("--min-cv-score", type=float, default=0.15)
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=1,
+        help="Frames per inference call (preloaded arrays are fed to the model in chunks).",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=8,
+        help="Max decoded frames buffered ahead of inference by the prefetch thread.",
+    )
+    parser.add_argument(
+        "--writers",
+        type=int,
+        default=4,
+        help="Threads encoding candidate PNGs (0 = write inline on the inference thread).",
+    )
     parser.add_argument("--tracker", default="bytetrack.yaml")
     parser.add_argument("--no-track", action="store_true", help="Disable tracking.")
     parser.add_argument("--llm-review", action="store_true")
     parser.add_argument("--llm-topk", type=int, default=3)
     parser.add_argument("--llm-model", default="kimi-k2.5")
     parser.add_argument("--moonshot-base-url", default="https://api.moonshot.ai/v1")
-    return parser.parse_args()
+    add_llm_client_args(parser)
+    args = parser.parse_args()
+    if args.model is None:
+        args.model = DEFAULT_MODEL if args.backend == "torch" else DEFAULT_EXPORT_MODEL
+    return args
 
 
 def lazy_imports() -> None:
-    global cv2, np, YOLO, requests
+    global cv2, np, YOLO
     try:
         import cv2 as _cv2  # type: ignore
         import numpy as _np
-        import requests as _requests
         from ultralytics import YOLO as _YOLO
     except Exception as exc:  # pragma: no cover
         raise SystemExit(
             "Missing dependencies. Install with:\n"
-            "  pip install ultralytics opencv-python numpy requests\n"
+            "  pip install ultralytics opencv-python numpy\n"
         ) from exc
     cv2 = _cv2
     np = _np
-    requests = _requests
     YOLO = _YOLO
 
 
@@ -145,30 +252,15 @@ def load_frame_list(path: Path) -> List[str]:
     return frames
 
 
-def img_sharpness(gray: "np.ndarray") -> float:
-    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
-
-
 def clamp(v: int, lo: int, hi: int) -> int:
     return max(lo, min(hi, v))
 
 
-def encode_image_data_uri(path: Path) -> str:
-    mime = "image/png"
-    data = base64.b64encode(path.read_bytes()).decode("utf-8")
-    return f"data:{mime};base64,{data}"
-
-
 def llm_pick_candidate(
+    client: LLMClient,
     track_id: str,
     candidates: List[DetectionCandidate],
-    model_name: str,
-    base_url: str,
 ) -> Optional[Tuple[int, str]]:
-    api_key = os.environ.get("MOONSHOT_API_KEY")
-    if not api_key:
-        return None
-
     top = sorted(candidates, key=lambda c: c.cv_score, reverse=True)[:3]
     lines = []
     for i, c in enumerate(top, start=1):
@@ -184,48 +276,321 @@ def llm_pick_candidate(
 
     content: List[dict] = [{"type": "text", "text": "Candidates:\n" + "\n".join(lines) + "\n" + rubric}]
     for c in top:
-        content.append({"type": "image_url", "image_url": {"url": encode_image_data_uri(c.crop_path)}})
+        content.append(client.image_part(c.crop_path))
 
-    payload = {
-        "model": model_name,
-        "temperature": 0,
-        "messages": [{"role": "user", "content": content}],
-    }
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
     try:
-        resp = requests.post(
-            f"{base_url.rstrip('/')}/chat/completions",
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=45,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        text = data["choices"][0]["message"]["content"]
-        if isinstance(text, list):
-            text = "".join([x.get("text", "") for x in text if isinstance(x, dict)])
-        text = str(text).strip()
-        if text.startswith("```"):
-            text = text.strip("`")
-            if text.lower().startswith("json"):
-                text = text[4:].strip()
-        obj = json.loads(text)
+        obj = client.chat(content, parse=parse_json_reply)
         pick = int(obj.get("pick", 1))
         label = str(obj.get("label", f"track_{track_id}")).strip() or f"track_{track_id}"
         reason = str(obj.get("reason", "llm_pick")).strip() or "llm_pick"
         idx = clamp(pick - 1, 0, len(top) - 1)
         return idx, f"llm:{reason}|label:{label}"
-    except Exception:
+    except (LLMError, ValueError, TypeError, AttributeError) as exc:
+        print(f"[WARN] LLM pick failed for {track_id}: {exc}")
         return None
 
 
+def apply_prompts(model, prompt_list: List[str]) -> None:
+    """Set the open-vocabulary prompts; a failure propagates rather than silently keeping the default classes."""
+    if hasattr(model, "set_classes") and prompt_list:
+        model.set_classes(prompt_list)
+
+
+def is_exportable(model_name: str) -> bool:
+    """YOLO-World v1 weights cannot be exported to ONNX/OpenVINO; v2 and plain YOLO weights can."""
+    stem = Path(model_name).stem.lower()
+    return "world" not in stem or "worldv2" in stem
+
+
+def cached_export(args: argparse.Namespace, prompt_list: List[str]) -> Path:
+    """Export the (world) model with prompts baked in, once per (model, prompts, imgsz)."""
+    import ultralytics
+
+    if not is_exportable(args.model):
+        raise SystemExit(
+            f"{args.model} is a YOLO-World v1 model and cannot be exported to {args.backend}.\n"
+            "Use --model yolov8s-worldv2.pt (or another v2 / non-world model), or --backend torch."
+        )
+    model_file = Path(args.model).expanduser()
+    model_id = sha256_file(model_file) if model_file.is_file() else args.model
+    key_src = {
+        "model": model_id,
+        "prompts": prompt_list,
+        "imgsz": args.imgsz,
+        "format": args.backend,
+        "dynamic": True,
+        "ultralytics": getattr(ultralytics, "__version__", "unknown"),
+    }
+    key = hashlib.sha256(json.dumps(key_src, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    stem = model_file.stem
+    cache_dir = Path(args.export_cache_dir).expanduser().resolve() / f"{stem}-{args.backend}-{key}"
+    # Ultralytics picks the runtime from the artifact name, so keep its suffixes.
+    artifact = cache_dir / (f"{stem}.onnx" if args.backend == "onnx" else f"{stem}_openvino_model")
+    if artifact.exists():
+        return artifact
+
+    print(f"Exporting {args.model} to {args.backend} (imgsz={args.imgsz}, {len(prompt_list)} prompts)...")
+    model = YOLO(args.model)
+    apply_prompts(model, prompt_list)
+    exported = Path(model.export(format=args.backend, imgsz=args.imgsz, dynamic=True, verbose=False))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(exported), str(artifact))
+    (cache_dir / "export.json").write_text(json.dumps(key_src, indent=2), encoding="utf-8")
+    return artifact
+
+
+def load_model(args: argparse.Namespace, prompt_list: List[str]):
+    started = time.perf_counter()
+    if args.backend == "torch":
+        model = YOLO(args.model)
+        apply_prompts(model, prompt_list)
+        source = args.model
+    else:
+        artifact = cached_export(args, prompt_list)
+        model = YOLO(str(artifact), task="detect")
+        source = str(artifact)
+    print(f"Model ready in {time.perf_counter() - started:.2f}s ({args.backend}: {source})")
+    return model
+
+
+def load_frames(
+    frame_iter: Iterator[Tuple[str, Optional["np.ndarray"]]],
+    frames_dir: Path,
+    frame_cache: Optional[FrameCache],
+    video_path: Path,
+) -> Iterator[Tuple[str, "np.ndarray"]]:
+    """Resolve each listed frame to a loaded BGR array, skipping unreadable ones."""
+    for frame_name, image in frame_iter:
+        frame_path = frames_dir / frame_name
+        if image is None and not frame_path.exists() and frame_cache is not None:
+            frame_path = frame_cache.frame_path(video_path, frame_name) or frame_path
+        if image is None and not frame_path.exists():
+            print(f"[WARN] Missing frame: {frame_path}")
+            continue
+        if image is None:
+            image = cv2.imread(str(frame_path), cv2.IMREAD_COLOR)
+        if image is None:
+            print(f"[WARN] Unable to read image: {frame_path}")
+            continue
+        yield frame_name, image
+
+
+_PREFETCH_DONE = object()
+
+
+def start_prefetch(
+    loaded: Iterator[Tuple[str, "np.ndarray"]], maxsize: int, stats: StageStats
+) -> "queue.Queue[Any]":
+    """Run the frame loader on a background thread feeding a bounded queue."""
+    q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, maxsize))
+
+    def run() -> None:
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(loaded)
+                except StopIteration:
+                    break
+                stats.add(1, time.perf_counter() - started)
+                started = time.perf_counter()
+                q.put(item)
+                stats.blocked += time.perf_counter() - started
+        except BaseException as exc:  # surface loader errors on the consumer side
+            q.put(exc)
+            return
+        q.put(_PREFETCH_DONE)
+
+    threading.Thread(target=run, name="frame-prefetch", daemon=True).start()
+    return q
+
+
+def drain_prefetch(q: "queue.Queue[Any]", stats: StageStats) -> Iterator[Tuple[str, "np.ndarray"]]:
+    while True:
+        stats.sample_depth(q.qsize())
+        item = q.get()
+        if item is _PREFETCH_DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+class CropWriter:
+    """PNG writer stage: encodes crops on a thread pool (or inline with 0 workers).
+
+    At most 2 * workers writes are queued; past that, the caller waits on the
+    oldest one, so crops cannot pile up in memory. Write errors are raised on
+    the caller's thread as soon as the failed write is reaped.
+    """
+
+    def __init__(self, workers: int, stats: StageStats) -> None:
+        self.stats = stats
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crop-writer") if workers > 0 else None
+        self.limit = 2 * workers
+        self.pending: Deque[Future] = deque()
+
+    def _write(self, path: Path, crop: "np.ndarray") -> None:
+        started = time.perf_counter()
+        if not cv2.imwrite(str(path), crop):
+            raise IOError(f"Failed to write crop: {path}")
+        self.stats.add(1, time.perf_counter() - started)
+
+    def __call__(self, path: Path, crop: "np.ndarray") -> None:
+        if self.pool is None:
+            self._write(path, crop)
+            return
+        finished: List[Future] = []
+        running: Deque[Future] = deque()
+        for fut in self.pending:
+            (finished if fut.done() else running).append(fut)
+        self.pending = running
+        for fut in finished:
+            fut.result()
+        while len(self.pending) >= self.limit:
+            self.pending.popleft().result()
+        self.stats.sample_depth(len(self.pending))
+        self.pending.append(self.pool.submit(self._write, path, crop))
+
+    def close(self) -> None:
+        if self.pool is None:
+            return
+        self.pool.shutdown(wait=True)
+        for fut in self.pending:
+            fut.result()
+        self.pending.clear()
+
+
+def iter_batches(items: Iterator[Tuple[str, "np.ndarray"]], size: int) -> Iterator[List[Tuple[str, "np.ndarray"]]]:
+    batch: List[Tuple[str, "np.ndarray"]] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_inference(model, images: List["np.ndarray"], args: argparse.Namespace) -> list:
+    """Run one batch of preloaded arrays through the model; one result per image, in order.
+
+    In track mode the whole list goes through a single `model.track` call with
+    persist=True; Ultralytics updates the tracker once per result in list order,
+    so ByteTrack still sees frames in symbol-frames.txt order.
+    """
+    if args.no_track:
+        results = model.predict(
+            source=images,
+            conf=args.conf,
+            iou=args.iou,
+            imgsz=args.imgsz,
+            max_det=args.max_det,
+            batch=len(images),
+            verbose=False,
+        )
+    else:
+        results = model.track(
+            source=images,
+            conf=args.conf,
+            iou=args.iou,
+            imgsz=args.imgsz,
+            max_det=args.max_det,
+            batch=len(images),
+            persist=True,
+            tracker=args.tracker,
+            verbose=False,
+        )
+    results = list(results or [])
+    if len(results) != len(images):
+        raise SystemExit(f"Model returned {len(results)} results for a batch of {len(images)} frames")
+    return results
+
+
+def collect_candidates(
+    r,
+    frame_name: str,
+    image: "np.ndarray",
+    w: int,
+    h: int,
+    args: argparse.Namespace,
+    candidates_dir: Path,
+    grouped: Dict[str, List[DetectionCandidate]],
+    track_counter: int,
+    write_crop: Callable[[Path, "np.ndarray"], None],
+) -> int:
+    """Crop and score one frame's detections into `grouped`; return the updated counter."""
+    xyxy = r.boxes.xyxy.cpu().numpy()
+    confs = r.boxes.conf.cpu().numpy() if r.boxes.conf is not None else np.zeros(len(xyxy))
+    clss = r.boxes.cls.cpu().numpy() if r.boxes.cls is not None else np.zeros(len(xyxy))
+    ids = None
+    if r.boxes.id is not None:
+        ids = r.boxes.id.cpu().numpy()
+    features = FrameFeatures(image)
+
+    for i, box in enumerate(xyxy):
+        x1, y1, x2, y2 = [int(v) for v in box]
+        bw = max(1, x2 - x1)
+        bh = max(1, y2 - y1)
+        area_ratio = float((bw * bh) / float(w * h))
+        if area_ratio < args.min_area_ratio or area_ratio > args.max_area_ratio:
+            continue
+
+        pad = int(max(bw, bh) * args.padding_ratio)
+        pad = clamp(pad, args.min_padding, args.max_padding) + args.min_padding
+        cx1 = clamp(x1 - pad, 0, w)
+        cy1 = clamp(y1 - pad, 0, h)
+        cx2 = clamp(x2 + pad, 0, w)
+        cy2 = clamp(y2 + pad, 0, h)
+        crop = image[cy1:cy2, cx1:cx2]
+        if crop.size == 0:
+            continue
+
+        sharp = features.sharpness(cx1, cy1, cx2, cy2)
+        sharp_norm = min(1.0, sharp / 320.0)
+        conf = float(confs[i]) if i < len(confs) else 0.0
+        score = conf * 0.55 + sharp_norm * 0.45
+        if score < args.min_cv_score:
+            continue
+
+        if ids is not None and i < len(ids):
+            track_id = f"trk_{int(ids[i])}"
+        else:
+            track_counter += 1
+            track_id = f"trk_u_{track_counter:04d}"
+
+        crop_name = f"{Path(frame_name).stem}__{track_id}__{i:02d}.png"
+        crop_path = candidates_dir / crop_name
+        write_crop(crop_path, crop)
+
+        cand = DetectionCandidate(
+            track_id=track_id,
+            frame_name=frame_name,
+            conf=conf,
+            cls_id=int(clss[i]) if i < len(clss) else -1,
+            x1=cx1,
+            y1=cy1,
+            x2=cx2,
+            y2=cy2,
+            area_ratio=area_ratio,
+            sharpness=sharp,
+            cv_score=score,
+            crop_path=crop_path,
+        )
+        grouped.setdefault(track_id, []).append(cand)
+    return track_counter
+
+
 def main() -> None:
     args = parse_args()
     lazy_imports()
     symbol_frames_path, frames_dir, out_dir = resolve_paths(args)
+    frame_cache = FrameCache(args.frame_cache) if args.frame_cache else None
+    video_path = (
+        Path(args.video).expanduser().resolve()
+        if args.video
+        else Path(args.yt_base_dir).expanduser().resolve() / args.video_name / "video" / f"{args.video_name}.webm"
+    )
     frames_list = load_frame_list(symbol_frames_path)
 
     candidates_dir = out_dir / "candidates"
@@ -234,132 +599,87 @@ def main() -> None:
     candidates_dir.mkdir(parents=True, exist_ok=True)
     final_dir.mkdir(parents=True, exist_ok=True)
 
-    model = YOLO(args.model)
     prompt_list = [p.strip() for p in args.prompts.split(",") if p.strip()]
-    if hasattr(model, "set_classes") and prompt_list:
-        try:
-            model.set_classes(prompt_list)
-        except Exception:
-            pass
+    model = load_model(args, prompt_list)
 
     grouped: Dict[str, List[DetectionCandidate]] = {}
     track_counter = 0
 
-    for frame_name in frames_list:
-        frame_path = frames_dir / frame_name
-        if not frame_path.exists():
-            print(f"[WARN] Missing frame: {frame_path}")
-            continue
-        image = cv2.imread(str(frame_path), cv2.IMREAD_COLOR)
-        if image is None:
-            print(f"[WARN] Unable to read image: {frame_path}")
-            continue
-        h, w = image.shape[:2]
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-        if args.no_track:
-            res = model.predict(
-                source=str(frame_path),
-                conf=args.conf,
-                iou=args.iou,
-                imgsz=args.imgsz,
-                max_det=args.max_det,
-                verbose=False,
-            )
-        else:
-            res = model.track(
-                source=str(frame_path),
-                conf=args.conf,
-                iou=args.iou,
-                imgsz=args.imgsz,
-                max_det=args.max_det,
-                persist=True,
-                tracker=args.tracker,
-                verbose=False,
-            )
-        if not res:
-            continue
-        r = res[0]
-        if r.boxes is None or len(r.boxes) == 0:
-            continue
-
-        xyxy = r.boxes.xyxy.cpu().numpy()
-        confs = r.boxes.conf.cpu().numpy() if r.boxes.conf is not None else np.zeros(len(xyxy))
-        clss = r.boxes.cls.cpu().numpy() if r.boxes.cls is not None else np.zeros(len(xyxy))
-        ids = None
-        if r.boxes.id is not None:
-            ids = r.boxes.id.cpu().numpy()
-
-        for i, box in enumerate(xyxy):
-            x1, y1, x2, y2 = [int(v) for v in box]
-            bw = max(1, x2 - x1)
-            bh = max(1, y2 - y1)
-            area_ratio = float((bw * bh) / float(w * h))
-            if area_ratio < args.min_area_ratio or area_ratio > args.max_area_ratio:
-                continue
-
-            pad = int(max(bw, bh) * args.padding_ratio)
-            pad = clamp(pad, args.min_padding, args.max_padding) + args.min_padding
-            cx1 = clamp(x1 - pad, 0, w)
-            cy1 = clamp(y1 - pad, 0, h)
-            cx2 = clamp(x2 + pad, 0, w)
-            cy2 = clamp(y2 + pad, 0, h)
-            crop = image[cy1:cy2, cx1:cx2]
-            if crop.size == 0:
-                continue
-
-            crop_gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-            sharp = img_sharpness(crop_gray)
-            sharp_norm = min(1.0, sharp / 320.0)
-            conf = float(confs[i]) if i < len(confs) else 0.0
-            score = conf * 0.55 + sharp_norm * 0.45
-            if score < args.min_cv_score:
-                continue
-
-            if ids is not None and i < len(ids):
-                track_id = f"trk_{int(ids[i])}"
-            else:
-                track_counter += 1
-                track_id = f"trk_u_{track_counter:04d}"
-
-            crop_name = f"{Path(frame_name).stem}__{track_id}__{i:02d}.png"
-            crop_path = candidates_dir / crop_name
-            cv2.imwrite(str(crop_path), crop)
-
-            cand = DetectionCandidate(
-                track_id=track_id,
-                frame_name=frame_name,
-                conf=conf,
-                cls_id=int(clss[i]) if i < len(clss) else -1,
-                x1=cx1,
-                y1=cy1,
-                x2=cx2,
-                y2=cy2,
-                area_ratio=area_ratio,
-                sharpness=sharp,
-                cv_score=score,
-                crop_path=crop_path,
-            )
-            grouped.setdefault(track_id, []).append(cand)
+    frame_iter = iter_source_frames(
+        frames_list,
+        video_path,
+        frames_dir,
+        args.from_video,
+        args.write_frames,
+        Path(args.frame_store).expanduser().resolve() if args.frame_store else None,
+    )
+    loaded = load_frames(frame_iter, frames_dir, frame_cache, video_path)
+    batch_size = max(1, args.batch)
+    load_stats = StageStats("load")
+    infer_stats = StageStats("inference")
+    crop_stats = StageStats("crop")
+    write_stats = StageStats("write")
+    prefetch = start_prefetch(loaded, args.prefetch, load_stats)
+    writer = CropWriter(args.writers, write_stats)
+    pipeline_started = time.perf_counter()
+    try:
+        for batch in iter_batches(drain_prefetch(prefetch, load_stats), batch_size):
+            started = time.perf_counter()
+            results = run_inference(model, [image for _, image in batch], args)
+            infer_stats.add(len(batch), time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for (frame_name, image), r in zip(batch, results):
+                h, w = image.shape[:2]
+                if r.boxes is None or len(r.boxes) == 0:
+                    continue
+                track_counter = collect_candidates(
+                    r, frame_name, image, w, h, args, candidates_dir, grouped, track_counter, writer
+                )
+            crop_stats.add(len(batch), time.perf_counter() - started)
+    finally:
+        writer.close()
+        if frame_cache is not None:
+            frame_cache.save_video_hashes()
+    pipeline_seconds = time.perf_counter() - pipeline_started
+
+    if infer_stats.items:
+        print(
+            f"Pipeline: {infer_stats.items} frames in {pipeline_seconds:.2f}s "
+            f"({infer_stats.items / max(pipeline_seconds, 1e-9):.2f} frames/s end-to-end, batch={batch_size})"
+        )
+        for stats in (load_stats, infer_stats, crop_stats, write_stats):
+            print(f"  {stats.summary()}")
 
     if not grouped:
         raise SystemExit("No detection candidates found. Try lowering --conf or --min-area-ratio.")
 
+    tracks = [
+        (track_id, sorted(items, key=lambda c: c.cv_score, reverse=True)[: args.max_candidates_per_track])
+        for track_id, items in sorted(grouped.items())
+    ]
+    llm_picks: Dict[str, Optional[Tuple[int, str]]] = {}
+    client = client_from_args(args) if args.llm_review else None
+    if client is not None:
+        todo = [(track_id, items) for track_id, items in tracks if len(items) > 1]
+        picks = client.map(lambda t: llm_pick_candidate(client, t[0], t[1][: args.llm_topk]), todo)
+        llm_picks = {track_id: pick for (track_id, _), pick in zip(todo, picks)}
+        client.close()
+        print(client.summary())
+
     selections: List[SelectedCrop] = []
-    for track_id, items in sorted(grouped.items()):
-        items = sorted(items, key=lambda c: c.cv_score, reverse=True)[: args.max_candidates_per_track]
+    for track_id, items in tracks:
         pick_idx = 0
         pick_reason = "cv_top_score"
         label = track_id
 
-        if args.llm_review and len(items) > 1:
-            llm = llm_pick_candidate(track_id, items[: args.llm_topk], args.llm_model, args.moonshot_base_url)
-            if llm is not None:
-                pick_idx, reason = llm
-                pick_idx = clamp(pick_idx, 0, len(items) - 1)
-                pick_reason = reason
-                if "|label:" in reason:
-                    label = reason.split("|label:", 1)[1].strip().replace(" ", "_")
+        llm = llm_picks.get(track_id)
+        if llm is not None:
+            pick_idx, reason = llm
+            pick_idx = clamp(pick_idx, 0, len(items) - 1)
+            pick_reason = reason
+            if "|label:" in reason:
+                label = reason.split("|label:", 1)[1].strip().replace(" ", "_")
 
         chosen = items[pick_idx]
         safe_label = "".join(ch if ch.isalnum() or ch in ("_", "-") else "_" for ch in label.lower())
@@ -393,9 +713,10 @@ def main() -> None:
         f"- Candidates dir: `{candidates_dir}`",
         f"- Final dir: `{final_dir}`",
         f"- Report CSV: `{report_csv}`",
-        "",
-        "## Selected outputs",
     ]
+    if client is not None:
+        lines.append(f"- {client.summary()}")
+    lines += ["", "## Selected outputs"]
     for s in selections:
         lines.append(f"- `{s.selected_crop.name}` from `{s.source_frame}` ({s.track_id}) reason={s.reason}")
     report_md.write_text("\n".join(lines) + "\n", encoding="utf-8")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Per-frame feature maps with summed-area tables for O(1) crop scoring.
+
+Grayscale, Laplacian, squared Laplacian and Canny edges are computed once per
+frame; their integral images turn the Laplacian variance (sharpness) and edge
+density of any box into four lookups. Shared by the CV, YOLO and annotation
+extractors instead of re-running cvtColor + Laplacian + Canny per crop.
+
+Values are taken from the full-frame maps, so pixels on a crop edge see their
+real neighbours rather than the reflected border a standalone crop would use.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+cv2 = None
+np = None
+
+CANNY_LOW = 40
+CANNY_HIGH = 120
+
+
+def lazy_imports() -> None:
+    global cv2, np
+    try:
+        import cv2 as _cv2  # type: ignore
+        import numpy as _np
+    except ImportError as exc:  # pragma: no cover
+        raise SystemExit(
+            "Missing dependency: opencv-python (cv2) and numpy are required.\n"
+            "Install with: pip install opencv-python numpy"
+        ) from exc
+    cv2 = _cv2
+    np = _np
+
+
+def _box_sum(table: "np.ndarray", x0: int, y0: int, x1: int, y1: int) -> float:
+    """Sum over [y0:y1, x0:x1] from an (h+1, w+1) integral image."""
+    return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+
+class FrameFeatures:
+    """Lazily built feature maps for one BGR (or grayscale) frame.
+
+    Boxes are half-open pixel ranges x0:x1, y0:y1 (the same slices used to crop).
+    """
+
+    def __init__(self, image: "np.ndarray") -> None:
+        if cv2 is None:
+            lazy_imports()
+        self.gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        self.height, self.width = self.gray.shape[:2]
+        self._lap: Optional[Tuple["np.ndarray", "np.ndarray"]] = None
+        self._edges: Optional["np.ndarray"] = None
+
+    @property
+    def laplacian_tables(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        if self._lap is None:
+            lap = cv2.Laplacian(self.gray, cv2.CV_64F)
+            self._lap = cv2.integral2(lap, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        return self._lap
+
+    @property
+    def edge_table(self) -> "np.ndarray":
+        if self._edges is None:
+            edges = cv2.Canny(self.gray, CANNY_LOW, CANNY_HIGH)
+            self._edges = cv2.integral((edges > 0).astype(np.uint8), sdepth=cv2.CV_64F)
+        return self._edges
+
+    def sharpness(self, x0: int, y0: int, x1: int, y1: int) -> float:
+        """Variance of the Laplacian inside the box."""
+        n = float(max(1, (x1 - x0) * (y1 - y0)))
+        sums, sqsums = self.laplacian_tables
+        mean = _box_sum(sums, x0, y0, x1, y1) / n
+        return float(max(0.0, _box_sum(sqsums, x0, y0, x1, y1) / n - mean * mean))
+
+    def edge_density(self, x0: int, y0: int, x1: int, y1: int) -> float:
+        """Fraction of Canny edge pixels inside the box."""
+        n = float(max(1, (x1 - x0) * (y1 - y0)))
+        return float(_box_sum(self.edge_table, x0, y0, x1, y1) / n)
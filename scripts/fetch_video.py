@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Resumable, parallel, checksummed video download.
+
+Fetches yt/<VIDEO_NAME>.webm from the public asset bucket (or any pluggable
+backend) in fixed-size ranged chunks on a thread pool. Chunks are written in
+place into <dest>.part and tracked in <dest>.part.json, so an interrupted
+download resumes with only the missing chunks. The finished file is verified
+and recorded in a sha256 checksum manifest next to the video.
+
+Backends:
+- https://... / http://...  ranged GETs (falls back to one stream if the server ignores Range)
+- file:///path or a plain directory  local mirror, e.g. for offline tests
+
+Usage:
+  python3 scripts/fetch_video.py --video-name CLEOPATRA
+  python3 scripts/fetch_video.py --video-name CLEOPATRA --source /mnt/mirror/yt --workers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_SOURCE = "https://bettr-casino-assets.s3.us-west-2.amazonaws.com/yt"
+DEFAULT_CHUNK_MB = 8
+DEFAULT_WORKERS = 4
+CHECKSUM_MANIFEST = "checksums.json"
+
+
+class HttpBackend:
+    def __init__(self, base_url: str, timeout: float = 60.0) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _url(self, name: str) -> str:
+        return f"{self.base_url}/{name}"
+
+    def stat(self, name: str) -> Tuple[int, str, bool]:
+        """Return (size, etag, supports_ranges) from a HEAD request."""
+        req = urllib.request.Request(self._url(name), method="HEAD")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            size = int(resp.headers.get("Content-Length", "0"))
+            etag = resp.headers.get("ETag", "").strip('"')
+            ranges = resp.headers.get("Accept-Ranges", "").lower() == "bytes"
+        return size, etag, ranges
+
+    def read_range(self, name: str, start: int, end: int) -> bytes:
+        """Read the inclusive byte range [start, end]."""
+        req = urllib.request.Request(self._url(name), headers={"Range": f"bytes={start}-{end}"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            if resp.status != 206:
+                raise IOError(f"Server ignored Range request (HTTP {resp.status})")
+            data = resp.read()
+        if len(data) != end - start + 1:
+            raise IOError(f"Short read for bytes {start}-{end}: got {len(data)}")
+        return data
+
+    def copy_to(self, name: str, dest: Path) -> None:
+        with urllib.request.urlopen(self._url(name), timeout=self.timeout) as resp, dest.open("wb") as fh:
+            shutil.copyfileobj(resp, fh, 1 << 20)
+
+
+class LocalDirBackend:
+    """Stand-in object store backed by a local directory (same API as HttpBackend)."""
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root).expanduser().resolve()
+
+    def stat(self, name: str) -> Tuple[int, str, bool]:
+        st = (self.root / name).stat()
+        return st.st_size, f"{st.st_size:x}-{st.st_mtime_ns:x}", True
+
+    def read_range(self, name: str, start: int, end: int) -> bytes:
+        with (self.root / name).open("rb") as fh:
+            fh.seek(start)
+            data = fh.read(end - start + 1)
+        if len(data) != end - start + 1:
+            raise IOError(f"Short read for bytes {start}-{end}: got {len(data)}")
+        return data
+
+    def copy_to(self, name: str, dest: Path) -> None:
+        shutil.copyfile(self.root / name, dest)
+
+
+def make_backend(source: str):
+    parsed = urlparse(source)
+    if parsed.scheme in ("http", "https"):
+        return HttpBackend(source)
+    if parsed.scheme == "file":
+        return LocalDirBackend(parsed.path)
+    return LocalDirBackend(source)
+
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path: Path) -> Dict[str, Dict[str, object]]:
+    if not path.exists():
+        return {}
+    try:
+        return dict(json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, ValueError):
+        print(f"[WARN] Ignoring unreadable checksum manifest: {path}")
+        return {}
+
+
+def save_json(path: Path, obj: object) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(obj, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class ChunkedDownload:
+    """One resumable download of `name` into `dest` using ranged chunks."""
+
+    def __init__(self, backend, name: str, dest: Path, chunk_size: int, workers: int, retries: int = 4) -> None:
+        self.backend = backend
+        self.name = name
+        self.dest = dest
+        self.part = dest.with_name(dest.name + ".part")
+        self.state_path = dest.with_name(dest.name + ".part.json")
+        self.chunk_size = chunk_size
+        self.workers = max(1, workers)
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._done: Set[int] = set()
+        self._state: Dict[str, object] = {}
+        self.bytes_fetched = 0
+
+    def _load_state(self, size: int, etag: str) -> None:
+        state = load_manifest(self.state_path)
+        if (
+            state.get("size") == size
+            and state.get("etag") == etag
+            and state.get("chunk_size") == self.chunk_size
+            and self.part.exists()
+            and self.part.stat().st_size == size
+        ):
+            self._done = {int(i) for i in state.get("done", [])}
+        else:
+            self._done = set()
+            with self.part.open("wb") as fh:
+                fh.truncate(size)
+        self._state = {"size": size, "etag": etag, "chunk_size": self.chunk_size}
+        self._save_state()
+
+    def _save_state(self) -> None:
+        save_json(self.state_path, {**self._state, "done": sorted(self._done)})
+
+    def _fetch_chunk(self, fd: int, idx: int, size: int) -> None:
+        start = idx * self.chunk_size
+        end = min(size, start + self.chunk_size) - 1
+        for attempt in range(1, self.retries + 1):
+            try:
+                data = self.backend.read_range(self.name, start, end)
+                os.pwrite(fd, data, start)
+                break
+            except (OSError, urllib.error.URLError, http.client.HTTPException) as exc:
+                if attempt == self.retries:
+                    raise
+                print(f"[WARN] chunk {idx} attempt {attempt} failed: {exc}; retrying")
+                time.sleep(min(30.0, 0.5 * 2**attempt))
+        with self._lock:
+            self._done.add(idx)
+            self.bytes_fetched += end - start + 1
+            self._save_state()
+
+    def run(self) -> None:
+        size, etag, ranges = self.backend.stat(self.name)
+        if not ranges or size == 0:
+            print("Source does not support ranged reads; downloading in one stream")
+            self.backend.copy_to(self.name, self.part)
+            self.bytes_fetched = self.part.stat().st_size
+            os.replace(self.part, self.dest)
+            self.state_path.unlink(missing_ok=True)
+            return
+
+        self._load_state(size, etag)
+        total_chunks = (size + self.chunk_size - 1) // self.chunk_size
+        pending: List[int] = [i for i in range(total_chunks) if i not in self._done]
+        if len(pending) < total_chunks:
+            print(f"Resuming: {total_chunks - len(pending)}/{total_chunks} chunks already on disk")
+
+        fd = os.open(self.part, os.O_WRONLY)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for fut in [pool.submit(self._fetch_chunk, fd, i, size) for i in pending]:
+                    fut.result()
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        os.replace(self.part, self.dest)
+        self.state_path.unlink(missing_ok=True)
+
+
+def fetch_video(
+    video_name: str,
+    dest: Path,
+    source: str = DEFAULT_SOURCE,
+    chunk_size: int = DEFAULT_CHUNK_MB << 20,
+    workers: int = DEFAULT_WORKERS,
+    expected_sha256: Optional[str] = None,
+    verify: bool = False,
+) -> str:
+    """Ensure `dest` holds a verified copy of <video_name>.webm; return its sha256."""
+    name = f"{video_name}.webm"
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path = dest.parent / CHECKSUM_MANIFEST
+    manifest = load_manifest(manifest_path)
+    record = manifest.get(dest.name, {})
+    expected = expected_sha256 or record.get("sha256")
+
+    if dest.exists():
+        if not verify and record and record.get("size") == dest.stat().st_size:
+            return str(record["sha256"])
+        digest = sha256_file(dest)
+        if expected and digest != expected:
+            print(f"[WARN] Checksum mismatch for existing {dest}; re-downloading")
+            dest.unlink()
+        else:
+            manifest[dest.name] = {"sha256": digest, "size": dest.stat().st_size, "source": source}
+            save_json(manifest_path, manifest)
+            return digest
+
+    backend = make_backend(source)
+    job = ChunkedDownload(backend, name, dest, chunk_size, workers)
+    started = time.perf_counter()
+    job.run()
+    elapsed = time.perf_counter() - started
+
+    digest = sha256_file(dest)
+    if expected and digest != expected:
+        dest.unlink()
+        raise SystemExit(f"Checksum mismatch for {name}: expected {expected}, got {digest}")
+    manifest[dest.name] = {"sha256": digest, "size": dest.stat().st_size, "source": source}
+    save_json(manifest_path, manifest)
+    mb = job.bytes_fetched / (1 << 20)
+    print(f"Fetched {mb:.1f} MB in {elapsed:.1f}s ({mb / max(elapsed, 1e-9):.1f} MB/s) -> {dest}")
+    return digest
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Download a source video with resume and checksums.")
+    parser.add_argument("--video-name", default="CLEOPATRA")
+    parser.add_argument(
+        "--yt-base-dir",
+        default=os.environ.get("YT_BASE_DIR", "/workspaces/clawd-slots-assets-pipeline/yt"),
+    )
+    parser.add_argument("--dest", default=None, help="Output path (default: yt/<VIDEO_NAME>/video/<VIDEO_NAME>.webm)")
+    parser.add_argument(
+        "--source",
+        default=os.environ.get("VIDEO_SOURCE", DEFAULT_SOURCE),
+        help="Object store base URL, file:// URL or local mirror directory.",
+    )
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_MB)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--sha256", default=None, help="Expected sha256 of the video.")
+    parser.add_argument("--verify", action="store_true", help="Re-hash an existing file instead of trusting the manifest.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    base = args.video_name[:-5] if args.video_name.endswith(".webm") else args.video_name
+    dest = (
+        Path(args.dest).expanduser().resolve()
+        if args.dest
+        else Path(args.yt_base_dir).expanduser().resolve() / base / "video" / f"{base}.webm"
+    )
+    digest = fetch_video(
+        base,
+        dest,
+        source=args.source,
+        chunk_size=args.chunk_mb << 20,
+        workers=args.workers,
+        expected_sha256=args.sha256,
+        verify=args.verify,
+    )
+    print(f"{dest} sha256={digest}")
+
+
+if __name__ == "__main__":
+    main()
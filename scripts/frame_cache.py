@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for extracted video frames.
+
+Entries are keyed by (video content hash, 60fps frame index, fps, decode params)
+and stored as PNG blobs under the cache root, with a JSON manifest holding the
+per-entry size and last access time. Total size is bounded by LRU eviction.
+
+Video hashes are memoized in the manifest by (path, size, mtime) so repeat
+lookups never re-read the .webm. Read-only users (the symbol extractors) persist
+just those hashes with save_video_hashes(), which leaves the entry table alone.
+
+Usage (inspect / trim):
+  python3 scripts/frame_cache.py --stats
+  python3 scripts/frame_cache.py --evict --max-mb 1024
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+FPS = 60
+DECODE_PARAMS = "ffmpeg;fps=60;codec=png"
+DEFAULT_CACHE_DIR = os.environ.get(
+    "FRAME_CACHE_DIR",
+    str(Path.home() / ".cache" / "clawd-slots" / "frames"),
+)
+DEFAULT_MAX_MB = 4096
+FRAME_NAME_RE = re.compile(r"^frame__(\d{2})_(\d{2})_(\d{2})\.(\d{2})\.png$")
+
+
+def frame_index_from_name(name: str) -> Optional[int]:
+    """Inverse of extract_frames.frame_name: frame__HH_MM_SS.FF.png -> 60fps index."""
+    m = FRAME_NAME_RE.match(name)
+    if not m:
+        return None
+    hh, mm, ss, ff = (int(v) for v in m.groups())
+    if ff < 1 or ff > FPS:
+        return None
+    return (hh * 3600 + mm * 60 + ss) * FPS + ff - 1
+
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FrameCache:
+    def __init__(self, root: Path | str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB << 20) -> None:
+        self.root = Path(root).expanduser().resolve()
+        self.max_bytes = max_bytes
+        self.manifest_path = self.root / "manifest.json"
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._videos_dirty = False
+        self._videos: Dict[str, Dict[str, Any]] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if self.manifest_path.exists():
+            try:
+                data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+                self._videos = dict(data.get("videos", {}))
+                self._entries = dict(data.get("entries", {}))
+            except (OSError, ValueError):
+                print(f"[WARN] Ignoring unreadable frame cache manifest: {self.manifest_path}")
+
+    # -- keys -----------------------------------------------------------------
+
+    def video_hash(self, video_path: Path) -> str:
+        video_path = Path(video_path).resolve()
+        st = video_path.stat()
+        rec = self._videos.get(str(video_path))
+        if rec and rec.get("size") == st.st_size and rec.get("mtime_ns") == st.st_mtime_ns:
+            return str(rec["sha256"])
+        digest = sha256_file(video_path)
+        self._videos[str(video_path)] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        self._dirty = True
+        self._videos_dirty = True
+        return digest
+
+    @staticmethod
+    def key(video_hash: str, index: int, fps: int = FPS, params: str = DECODE_PARAMS) -> str:
+        raw = f"{video_hash}|{index}|{fps}|{params}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _blob_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.png"
+
+    # -- lookups --------------------------------------------------------------
+
+    def get(self, key: str, touch: bool = True) -> Optional[Path]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        path = self._blob_path(key)
+        if not path.exists():
+            del self._entries[key]
+            self._dirty = True
+            self.misses += 1
+            return None
+        if touch:
+            entry["last_access"] = time.time()
+            self._dirty = True
+        self.hits += 1
+        return path
+
+    def frame_path(self, video_path: Path, frame_name: str) -> Optional[Path]:
+        """Cached PNG for a frame__HH_MM_SS.FF.png of `video_path`, if present.
+
+        Read-only (does not touch LRU state), so extractors can query the cache
+        while an extraction run owns the manifest.
+        """
+        index = frame_index_from_name(frame_name)
+        if index is None or not Path(video_path).exists():
+            return None
+        return self.get(self.key(self.video_hash(video_path), index), touch=False)
+
+    # -- writes ---------------------------------------------------------------
+
+    def put_file(self, key: str, src: Path, meta: Optional[Dict[str, Any]] = None) -> Path:
+        dest = self._blob_path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + ".tmp")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        entry = {"bytes": dest.stat().st_size, "last_access": time.time()}
+        if meta:
+            entry.update(meta)
+        self._entries[key] = entry
+        self._dirty = True
+        return dest
+
+    def total_bytes(self) -> int:
+        return sum(int(e.get("bytes", 0)) for e in self._entries.values())
+
+    def evict(self) -> int:
+        """Drop least-recently-used entries until the cache fits in max_bytes."""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        for key, entry in sorted(self._entries.items(), key=lambda kv: kv[1].get("last_access", 0.0)):
+            if total <= self.max_bytes:
+                break
+            self._blob_path(key).unlink(missing_ok=True)
+            total -= int(entry.get("bytes", 0))
+            del self._entries[key]
+            removed += 1
+        self._dirty = True
+        return removed
+
+    def _write_manifest(self, videos: Dict[str, Dict[str, Any]], entries: Dict[str, Dict[str, Any]]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_name(f"{self.manifest_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"version": 1, "videos": videos, "entries": entries}), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self._write_manifest(self._videos, self._entries)
+        self._dirty = False
+        self._videos_dirty = False
+
+    def save_video_hashes(self) -> None:
+        """Merge newly computed video hashes into the manifest on disk, keeping its entries.
+
+        For read-only users: an extraction run may have rewritten the manifest
+        since this instance loaded it, so its entry table is not written back.
+        """
+        if not self._videos_dirty:
+            return
+        videos: Dict[str, Dict[str, Any]] = {}
+        entries: Dict[str, Dict[str, Any]] = {}
+        if self.manifest_path.exists():
+            try:
+                data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+                videos = dict(data.get("videos", {}))
+                entries = dict(data.get("entries", {}))
+            except (OSError, ValueError):
+                return  # never clobber a manifest we cannot read
+        videos.update(self._videos)
+        self._write_manifest(videos, entries)
+        self._videos_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect or trim the extracted-frame cache.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--max-mb", type=int, default=DEFAULT_MAX_MB)
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--evict", action="store_true", help="Evict LRU entries down to --max-mb.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache = FrameCache(args.cache_dir, max_bytes=args.max_mb << 20)
+    if args.evict:
+        removed = cache.evict()
+        cache.save()
+        print(f"Evicted {removed} entries")
+    print(f"Cache: {cache.root}")
+    print(f"Entries: {len(cache)}  Size: {cache.total_bytes() / (1 << 20):.1f} MB / {args.max_mb} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+In-process frame source: decode frames from the video straight into NumPy.
+
+Given frame__HH_MM_SS.FF.png names (as listed in symbol-frames.txt), a single
+ffmpeg process decodes the video once in timestamp order and pipes raw BGR24
+pixels, which are read directly into uint8 arrays of shape (h, w, 3) -- the same
+layout cv2.imread returns. No PNG is written or re-read unless a PngSink is
+attached.
+
+Frames are yielded in the order they were requested; frames that were decoded
+ahead of their turn are held until needed.
+"""
+
+from __future__ import annotations
+
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from extract_frames import build_ffmpeg_cmd
+from frame_cache import frame_index_from_name
+
+cv2 = None
+np = None
+
+RAW_PIPE_ARGS = ["-pix_fmt", "bgr24", "-f", "rawvideo", "-"]
+
+
+def lazy_imports(need_cv2: bool = False) -> None:
+    global cv2, np
+    try:
+        import numpy as _np
+
+        np = _np
+        if need_cv2:
+            import cv2 as _cv2  # type: ignore
+
+            cv2 = _cv2
+    except ImportError as exc:  # pragma: no cover
+        raise SystemExit(
+            "Missing dependencies. Install with:\n"
+            "  pip install opencv-python numpy\n"
+        ) from exc
+
+
+def probe_size(video_path: Path) -> Tuple[int, int]:
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=width,height",
+        "-of",
+        "csv=p=0:s=x",
+        str(video_path),
+    ]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.strip()
+    width, height = out.splitlines()[0].split("x")[:2]
+    return int(width), int(height)
+
+
+class PngSink:
+    """Optional sink that also writes each decoded frame to frames_dir as PNG."""
+
+    def __init__(self, frames_dir: Path) -> None:
+        lazy_imports(need_cv2=True)
+        self.frames_dir = frames_dir
+        self.frames_dir.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, frame_name: str, image: "np.ndarray") -> None:
+        cv2.imwrite(str(self.frames_dir / frame_name), image)
+
+
+class VideoFrameSource:
+    """Iterate (frame_name, image) for frame names, decoding the video in one pass.
+
+    Names that do not parse as frame__HH_MM_SS.FF.png, or that lie past the end
+    of the video, are yielded with image=None so callers can fall back to disk.
+    """
+
+    def __init__(
+        self,
+        video_path: Path,
+        frame_names: List[str],
+        sink: Optional[Callable[[str, "np.ndarray"], None]] = None,
+    ) -> None:
+        lazy_imports()
+        if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+            raise SystemExit("Missing dependency: ffmpeg/ffprobe (apt install ffmpeg)")
+        if not video_path.exists():
+            raise SystemExit(f"Video not found: {video_path}")
+        self.video_path = video_path
+        self.frame_names = frame_names
+        self.sink = sink
+        self.width, self.height = probe_size(video_path)
+        self.decoded = 0
+
+    def _decode(self, indices: List[int]) -> Iterator[Tuple[int, "np.ndarray"]]:
+        cmd = build_ffmpeg_cmd(self.video_path, indices, output_args=RAW_PIPE_ARGS)
+        frame_bytes = self.width * self.height * 3
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=frame_bytes)
+        try:
+            for idx in indices:
+                image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+                view = memoryview(image).cast("B")
+                got = 0
+                while got < frame_bytes:
+                    n = proc.stdout.readinto(view[got:])
+                    if not n:
+                        break
+                    got += n
+                if got < frame_bytes:
+                    return
+                yield idx, image
+        finally:
+            proc.stdout.close()
+            proc.wait()
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional["np.ndarray"]]]:
+        wanted: Dict[int, List[str]] = {}
+        remaining: Dict[str, int] = {}
+        for name in self.frame_names:
+            idx = frame_index_from_name(name)
+            if idx is None:
+                continue
+            if name not in remaining:
+                wanted.setdefault(idx, []).append(name)
+            remaining[name] = remaining.get(name, 0) + 1
+        decoder = self._decode(sorted(wanted)) if wanted else iter(())
+        pending: Dict[str, "np.ndarray"] = {}
+        exhausted = False
+
+        for name in self.frame_names:
+            if frame_index_from_name(name) is None:
+                yield name, None
+                continue
+            while name not in pending and not exhausted:
+                try:
+                    idx, image = next(decoder)
+                except StopIteration:
+                    exhausted = True
+                    break
+                self.decoded += 1
+                for n in wanted[idx]:
+                    if self.sink is not None:
+                        self.sink(n, image)
+                    pending[n] = image
+            remaining[name] -= 1
+            yield name, pending.get(name) if remaining[name] else pending.pop(name, None)
+
+
+def iter_source_frames(
+    frame_names: List[str],
+    video_path: Path,
+    frames_dir: Path,
+    from_video: bool,
+    write_frames: bool = False,
+    frame_store: Optional[Path] = None,
+) -> Iterator[Tuple[str, Optional["np.ndarray"]]]:
+    """(frame_name, image) pairs for the extractors.
+
+    With from_video, images are decoded in-process (optionally also written to
+    frames_dir). With frame_store, images are zero-copy views from the
+    memory-mapped store. Otherwise, or for frames neither source has, image is
+    None and the caller reads PNGs from disk.
+    """
+    if not from_video and frame_store is not None:
+        from frame_store import FrameStore
+
+        store = FrameStore(frame_store)
+        return ((name, store.get(name)) for name in frame_names)
+    if not from_video:
+        return ((name, None) for name in frame_names)
+    sink = PngSink(frames_dir) if write_frames else None
+    return iter(VideoFrameSource(video_path, frame_names, sink=sink))
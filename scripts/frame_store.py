@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped raw frame store for 60fps sequences.
+
+Each contiguous tags.txt range is packed into one uint8 .npy array of shape
+(N, h, w, 3) (BGR, same layout as cv2.imread); single frames share singles.npy.
+A small index.json maps frame__HH_MM_SS.FF.png names to (file, offset). Readers
+open the arrays with mmap, so a frame lookup is a zero-copy view with no PNG
+or zlib decode.
+
+Build from the video (no PNGs involved) or from an existing frames/ dir:
+  python3 scripts/frame_store.py --video-name CLEOPATRA
+  python3 scripts/frame_store.py --video-name CLEOPATRA --from-pngs
+
+The extractors read it with --frame-store yt/CLEOPATRA/frame-store.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from extract_frames import frame_indices, frame_name, load_tags, to_runs
+from frame_source import VideoFrameSource
+
+cv2 = None
+np = None
+
+INDEX_NAME = "index.json"
+
+
+def lazy_imports(need_cv2: bool = False) -> None:
+    global cv2, np
+    try:
+        import numpy as _np
+
+        np = _np
+        if need_cv2:
+            import cv2 as _cv2  # type: ignore
+
+            cv2 = _cv2
+    except ImportError as exc:  # pragma: no cover
+        raise SystemExit(
+            "Missing dependencies. Install with:\n"
+            "  pip install opencv-python numpy\n"
+        ) from exc
+
+
+class FrameStore:
+    """Read-only view over a frame store directory."""
+
+    def __init__(self, root: Path | str) -> None:
+        lazy_imports()
+        self.root = Path(root).expanduser().resolve()
+        index_path = self.root / INDEX_NAME
+        if not index_path.exists():
+            raise SystemExit(f"Frame store index not found: {index_path}")
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+        self._frames: Dict[str, Tuple[str, int]] = {
+            name: (str(entry[0]), int(entry[1])) for name, entry in index.get("frames", {}).items()
+        }
+        self._arrays: Dict[str, "np.ndarray"] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._frames
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def names(self) -> List[str]:
+        return sorted(self._frames)
+
+    def _array(self, file_name: str) -> "np.ndarray":
+        arr = self._arrays.get(file_name)
+        if arr is None:
+            arr = np.load(self.root / file_name, mmap_mode="r")
+            self._arrays[file_name] = arr
+        return arr
+
+    def get(self, name: str) -> Optional["np.ndarray"]:
+        """Zero-copy (h, w, 3) view of a frame, or None if it is not stored."""
+        entry = self._frames.get(name)
+        if entry is None:
+            return None
+        file_name, offset = entry
+        return self._array(file_name)[offset]
+
+
+class FrameStoreWriter:
+    def __init__(self, root: Path) -> None:
+        lazy_imports()
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.frames: Dict[str, List[object]] = {}
+        self.shape: Optional[List[int]] = None
+
+    def write_group(self, file_name: str, names: List[str], images: Iterator[Optional["np.ndarray"]]) -> int:
+        """Write `names` (in order) into one (N, h, w, 3) .npy; return frames stored."""
+        path = self.root / file_name
+        tmp = path.with_name(path.name + ".tmp")
+        arr = None
+        stored = 0
+        for offset, (name, image) in enumerate(zip(names, images)):
+            if image is None:
+                continue
+            if arr is None:
+                h, w = image.shape[:2]
+                self.shape = [h, w, 3]
+                arr = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint8, shape=(len(names), h, w, 3))
+            arr[offset] = image
+            self.frames[name] = [file_name, offset]
+            stored += 1
+        if arr is not None:
+            arr.flush()
+            del arr
+            os.replace(tmp, path)
+        return stored
+
+    def save(self) -> Path:
+        index_path = self.root / INDEX_NAME
+        tmp = index_path.with_name(INDEX_NAME + ".tmp")
+        tmp.write_text(
+            json.dumps({"version": 1, "dtype": "uint8", "shape": self.shape, "frames": self.frames}, indent=1),
+            encoding="utf-8",
+        )
+        os.replace(tmp, index_path)
+        return index_path
+
+
+def plan_groups(indices: List[int]) -> List[Tuple[str, List[str]]]:
+    """One group per contiguous run; isolated single frames share singles.npy."""
+    groups: List[Tuple[str, List[str]]] = []
+    singles: List[str] = []
+    for a, b in to_runs(indices):
+        if a == b:
+            singles.append(frame_name(a))
+            continue
+        names = [frame_name(i) for i in range(a, b + 1)]
+        groups.append((f"{Path(names[0]).stem}.npy", names))
+    if singles:
+        groups.append(("singles.npy", singles))
+    return groups
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Pack tags.txt frames into a memory-mapped frame store.")
+    parser.add_argument("--video-name", default="CLEOPATRA")
+    parser.add_argument(
+        "--yt-base-dir",
+        default=os.environ.get("YT_BASE_DIR", "/workspaces/clawd-slots-assets-pipeline/yt"),
+    )
+    parser.add_argument("--tags", default=None)
+    parser.add_argument("--video", default=None)
+    parser.add_argument("--frames-dir", default=None)
+    parser.add_argument("--store-dir", default=None, help="Output dir (default: yt/<VIDEO_NAME>/frame-store)")
+    parser.add_argument("--from-pngs", action="store_true", help="Pack existing frames/ PNGs instead of decoding.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    root = Path(args.yt_base_dir).expanduser().resolve() / args.video_name
+    tags_path = Path(args.tags).expanduser().resolve() if args.tags else root / "tags.txt"
+    video_path = Path(args.video).expanduser().resolve() if args.video else root / "video" / f"{args.video_name}.webm"
+    frames_dir = Path(args.frames_dir).expanduser().resolve() if args.frames_dir else root / "frames"
+    store_dir = Path(args.store_dir).expanduser().resolve() if args.store_dir else root / "frame-store"
+
+    groups = plan_groups(frame_indices(load_tags(tags_path)))
+    writer = FrameStoreWriter(store_dir)
+    total = 0
+    for file_name, names in groups:
+        if args.from_pngs:
+            lazy_imports(need_cv2=True)
+            images = (cv2.imread(str(frames_dir / n), cv2.IMREAD_COLOR) for n in names)
+        else:
+            images = (image for _, image in VideoFrameSource(video_path, names))
+        stored = writer.write_group(file_name, names, images)
+        print(f"{file_name}: {stored}/{len(names)} frames")
+        total += stored
+    index_path = writer.save()
+    print(f"Stored {total} frames in {store_dir} (index: {index_path})")
+
+
+if __name__ == "__main__":
+    main()
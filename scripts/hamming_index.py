@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Multi-index hashing for 64-bit Hamming search (perceptual-hash dedup).
+
+Each hash is split into m = t // 2 + 1 chunks (t = threshold), each indexed in
+its own table. By the pigeonhole principle, two hashes within distance t differ
+by at most t // m <= 1 bit on at least one chunk, so a query only probes each
+chunk value and its single-bit flips and verifies the few candidates it finds,
+instead of scanning every stored hash.
+
+cluster_by_hamming() reproduces the greedy dedup of
+extract_symbols_from_annotations.py exactly: each hash joins the earliest
+cluster whose representative is within the threshold, else starts a new one.
+
+Benchmark against the nested-loop version:
+  python3 scripts/hamming_index.py --bench 1000 10000 100000
+Above --naive-max hashes the full nested loop is too slow, so the reference
+instead scans the final representatives for a random sample of the hashes and
+is compared per query.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from itertools import combinations
+from typing import List, Optional, Sequence
+
+HASH_BITS = 64
+# Chunks narrower than this have so few values that buckets degrade to a scan.
+MIN_CHUNK_BITS = 6
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _flip_masks(bits: int, radius: int) -> List[int]:
+    masks = [0]
+    for r in range(1, radius + 1):
+        for positions in combinations(range(bits), r):
+            m = 0
+            for p in positions:
+                m |= 1 << p
+            masks.append(m)
+    return masks
+
+
+class HammingIndex:
+    def __init__(self, threshold: int) -> None:
+        self.threshold = max(0, threshold)
+        chunks = self.threshold // 2 + 1
+        self.linear = HASH_BITS // chunks < MIN_CHUNK_BITS
+        self.hashes: List[int] = []
+        self._chunks: List[tuple] = []
+        if not self.linear:
+            radius = self.threshold // chunks
+            base, extra = divmod(HASH_BITS, chunks)
+            shift = 0
+            for c in range(chunks):
+                width = base + (1 if c < extra else 0)
+                self._chunks.append((shift, (1 << width) - 1, _flip_masks(width, radius), {}))
+                shift += width
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add(self, value: int) -> int:
+        """Store a hash; returns its id (insertion order)."""
+        idx = len(self.hashes)
+        self.hashes.append(value)
+        for shift, mask, _, table in self._chunks:
+            table.setdefault((value >> shift) & mask, []).append(idx)
+        return idx
+
+    def _candidates(self, value: int) -> set:
+        found = set()
+        for shift, mask, flips, table in self._chunks:
+            chunk = (value >> shift) & mask
+            for m in flips:
+                ids = table.get(chunk ^ m)
+                if ids:
+                    found.update(ids)
+        return found
+
+    def first_within(self, value: int) -> Optional[int]:
+        """Smallest id within the threshold, or None."""
+        if self.linear:
+            for i, h in enumerate(self.hashes):
+                if (value ^ h).bit_count() <= self.threshold:
+                    return i
+            return None
+        best: Optional[int] = None
+        for i in self._candidates(value):
+            if (best is None or i < best) and (value ^ self.hashes[i]).bit_count() <= self.threshold:
+                best = i
+        return best
+
+
+def cluster_by_hamming(hashes: Sequence[int], threshold: int, seeds: Sequence[int] = ()) -> List[List[int]]:
+    """Greedy clustering of hashes (already in priority order) by representative distance.
+
+    `seeds` are representatives known ahead of time (e.g. from a persistent
+    index); the first len(seeds) clusters belong to them and may be empty.
+    """
+    index = HammingIndex(threshold)
+    clusters: List[List[int]] = []
+    for value in seeds:
+        index.add(value)
+        clusters.append([])
+    for i, value in enumerate(hashes):
+        hit = index.first_within(value)
+        if hit is None:
+            index.add(value)
+            clusters.append([i])
+        else:
+            clusters[hit].append(i)
+    return clusters
+
+
+def cluster_naive(hashes: Sequence[int], threshold: int) -> List[List[int]]:
+    """Reference O(N*K) nested loop (the original dedup)."""
+    clusters: List[List[int]] = []
+    reps: List[int] = []
+    for i, value in enumerate(hashes):
+        for k, rep in enumerate(reps):
+            if hamming(value, rep) <= threshold:
+                clusters[k].append(i)
+                break
+        else:
+            reps.append(value)
+            clusters.append([i])
+    return clusters
+
+
+def synthetic_hashes(n: int, threshold: int, seed: int = 7) -> List[int]:
+    """Crops drawn from n/10 symbols, each a few bit flips from its symbol hash."""
+    rng = random.Random(seed)
+    centers = [rng.getrandbits(64) for _ in range(max(1, n // 10))]
+    out = []
+    for _ in range(n):
+        value = rng.choice(centers)
+        for _ in range(rng.randint(0, max(0, threshold // 2))):
+            value ^= 1 << rng.randrange(64)
+        out.append(value)
+    return out
+
+
+def sampled_comparison(hashes: Sequence[int], clusters: List[List[int]], threshold: int, sample: int) -> str:
+    """Time first-match lookups against the final representatives: nested-loop scan vs index."""
+    reps = [hashes[cluster[0]] for cluster in clusters]
+    index = HammingIndex(threshold)
+    for value in reps:
+        index.add(value)
+    queries = random.Random(11).sample(list(hashes), min(sample, len(hashes)))
+
+    started = time.perf_counter()
+    slow = [next((k for k, rep in enumerate(reps) if hamming(value, rep) <= threshold), None) for value in queries]
+    slow_s = time.perf_counter() - started
+    started = time.perf_counter()
+    fast = [index.first_within(value) for value in queries]
+    fast_s = time.perf_counter() - started
+
+    status = "same" if slow == fast else "MISMATCH"
+    per_query = 1e6 / max(1, len(queries))
+    return (
+        f"sampled {len(queries)} queries: naive={slow_s * per_query:.1f}us/q index={fast_s * per_query:.1f}us/q  "
+        f"speedup={slow_s / max(fast_s, 1e-9):6.1f}x  {status}"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark Hamming-index dedup against the nested loop.")
+    parser.add_argument("--bench", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--threshold", type=int, default=8)
+    parser.add_argument(
+        "--naive-max",
+        type=int,
+        default=10000,
+        help="Above this many hashes, compare against the reference on a sample of queries only.",
+    )
+    parser.add_argument("--naive-sample", type=int, default=2000, help="Queries in the sampled comparison.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    probe = HammingIndex(args.threshold)
+    layout = "linear scan" if probe.linear else f"{len(probe._chunks)} chunks, radius {args.threshold // len(probe._chunks)}"
+    print(f"threshold={args.threshold}  ({layout})")
+    for n in args.bench:
+        hashes = synthetic_hashes(n, args.threshold)
+        started = time.perf_counter()
+        fast = cluster_by_hamming(hashes, args.threshold)
+        fast_s = time.perf_counter() - started
+        line = f"n={n:<7} clusters={len(fast):<6} index={fast_s:8.3f}s"
+        if n <= args.naive_max:
+            started = time.perf_counter()
+            slow = cluster_naive(hashes, args.threshold)
+            slow_s = time.perf_counter() - started
+            status = "same" if slow == fast else "MISMATCH"
+            line += f"  naive={slow_s:8.3f}s  speedup={slow_s / max(fast_s, 1e-9):6.1f}x  {status}"
+        else:
+            line += "  " + sampled_comparison(hashes, fast, args.threshold, args.naive_sample)
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
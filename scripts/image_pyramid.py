@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+On-demand thumbnails and tile pyramids for the annotation tool.
+
+For each version of a source image, <cache>/<path hash>/<size-mtime stamp>/ holds:
+  thumb_<edge>.jpg         thumbnails (longest edge <= edge)
+  meta.json                pyramid description, written last
+  tiles/<level>/<x>_<y>.*  TILE_SIZE tiles; level 0 is full resolution (PNG,
+                           lossless for annotation), each further level halves
+                           the size (JPEG) until the image fits in one tile
+
+A changed mtime or size starts a new entry directory, so a build for the old
+version never writes into the new one; old entries are deleted once no job is
+building into them. Decoding and encoding run in a process pool, and concurrent
+requests for the same work share one job, so HTTP request threads only wait on
+their own result.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+cv2 = None
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "ANNOTATE_TILE_CACHE_DIR",
+    str(Path.home() / ".cache" / "clawd-slots" / "annotate-tiles"),
+)
+TILE_SIZE = 512
+THUMB_EDGES = (64, 128, 160, 256, 512)
+JPEG_QUALITY = 88
+
+
+def lazy_imports() -> None:
+    global cv2
+    try:
+        import cv2 as _cv2  # type: ignore
+    except ImportError as exc:  # pragma: no cover
+        raise SystemExit(
+            "Missing dependency: opencv-python (cv2) is required for thumbnails and tiles.\n"
+            "Install with: pip install opencv-python"
+        ) from exc
+    cv2 = _cv2
+
+
+def available() -> bool:
+    try:
+        lazy_imports()
+    except SystemExit:
+        return False
+    return True
+
+
+def _write_image(dest: Path, image: "Any") -> None:
+    params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY] if dest.suffix == ".jpg" else [cv2.IMWRITE_PNG_COMPRESSION, 1]
+    ok, buf = cv2.imencode(dest.suffix, image, params)
+    if not ok:
+        raise OSError(f"Failed to encode {dest.name}")
+    tmp = dest.with_name(f"{dest.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(buf.tobytes())
+    os.replace(tmp, dest)
+
+
+def _read(src: str) -> "Any":
+    if cv2 is None:
+        lazy_imports()
+    image = cv2.imread(src, cv2.IMREAD_COLOR)
+    if image is None:
+        raise OSError(f"Unable to read image: {src}")
+    return image
+
+
+def build_thumbnail(src: str, dest: str, edge: int) -> str:
+    """Worker: write a JPEG thumbnail whose longest edge is at most `edge`."""
+    image = _read(src)
+    h, w = image.shape[:2]
+    scale = min(1.0, edge / float(max(h, w)))
+    if scale < 1.0:
+        image = cv2.resize(image, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    Path(dest).parent.mkdir(parents=True, exist_ok=True)  # an idle old entry may have just been dropped
+    _write_image(Path(dest), image)
+    return dest
+
+
+def build_pyramid(src: str, entry_dir: str, tile_size: int = TILE_SIZE) -> Dict[str, Any]:
+    """Worker: cut every pyramid level into tiles and write meta.json."""
+    image = _read(src)
+    root = Path(entry_dir)
+    height, width = image.shape[:2]
+    levels: List[Dict[str, Any]] = []
+    level = 0
+    while True:
+        h, w = image.shape[:2]
+        ext = "png" if level == 0 else "jpg"
+        cols = (w + tile_size - 1) // tile_size
+        rows = (h + tile_size - 1) // tile_size
+        level_dir = root / "tiles" / str(level)
+        level_dir.mkdir(parents=True, exist_ok=True)
+        for y in range(rows):
+            for x in range(cols):
+                tile = image[y * tile_size : (y + 1) * tile_size, x * tile_size : (x + 1) * tile_size]
+                _write_image(level_dir / f"{x}_{y}.{ext}", tile)
+        levels.append(
+            {
+                "level": level,
+                "scale": 1.0 / (1 << level),
+                "width": w,
+                "height": h,
+                "cols": cols,
+                "rows": rows,
+                "format": ext,
+            }
+        )
+        if max(w, h) <= tile_size:
+            break
+        image = cv2.resize(image, (max(1, w // 2), max(1, h // 2)), interpolation=cv2.INTER_AREA)
+        level += 1
+    meta = {"width": width, "height": height, "tile_size": tile_size, "levels": levels}
+    tmp = root / "meta.json.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, root / "meta.json")
+    return meta
+
+
+class ImagePyramid:
+    def __init__(self, cache_dir: Path | str = DEFAULT_CACHE_DIR, workers: int = 2) -> None:
+        self.cache_dir = Path(cache_dir).expanduser().resolve()
+        # Workers start lazily, once the server's threads are running; forking then could copy held locks.
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.pool = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context(method))
+        self._lock = threading.Lock()
+        # Job keys are (kind, entry dir, ...), so _entry can tell which entries are being built.
+        self._inflight: Dict[Tuple[str, ...], Future] = {}
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _entry(self, src: Path) -> Path:
+        """Cache dir for the current version of `src`; older versions are dropped when idle."""
+        st = src.stat()
+        base = self.cache_dir / hashlib.sha256(str(src).encode("utf-8")).hexdigest()[:20]
+        entry = base / f"{st.st_size:x}-{st.st_mtime_ns:x}"
+        if entry.is_dir():
+            return entry
+        with self._lock:
+            entry.mkdir(parents=True, exist_ok=True)
+            busy = {job[1] for job in self._inflight}
+            for old in base.iterdir():
+                if old == entry or str(old) in busy:
+                    continue
+                if old.is_dir():
+                    shutil.rmtree(old, ignore_errors=True)
+                else:
+                    old.unlink(missing_ok=True)  # files of the pre-versioned layout
+        return entry
+
+    def _run(self, job: Tuple[str, ...], fn, *args: Any) -> Any:
+        """Submit fn(*args) to the pool unless an identical job is already running; wait for it."""
+        with self._lock:
+            fut = self._inflight.get(job)
+            if fut is None:
+                fut = self.pool.submit(fn, *args)
+                self._inflight[job] = fut
+                fut.add_done_callback(lambda _f, job=job: self._forget(job))
+        return fut.result()
+
+    def _forget(self, job: Tuple[str, ...]) -> None:
+        with self._lock:
+            self._inflight.pop(job, None)
+
+    def thumbnail(self, src: Path, edge: int) -> Path:
+        edge = min(THUMB_EDGES, key=lambda e: (e < edge, abs(e - edge)))
+        entry = self._entry(src)
+        dest = entry / f"thumb_{edge}.jpg"
+        if not dest.exists():
+            self._run(("thumb", str(entry), str(edge)), build_thumbnail, str(src), str(dest), edge)
+        return dest
+
+    def meta(self, src: Path) -> Dict[str, Any]:
+        entry = self._entry(src)
+        meta_path = entry / "meta.json"
+        if meta_path.exists():
+            return json.loads(meta_path.read_text(encoding="utf-8"))
+        return self._run(("pyramid", str(entry)), build_pyramid, str(src), str(entry))
+
+    def tile(self, src: Path, level: int, x: int, y: int) -> Optional[Path]:
+        meta = self.meta(src)
+        levels = meta["levels"]
+        if not 0 <= level < len(levels):
+            return None
+        info = levels[level]
+        if not (0 <= x < info["cols"] and 0 <= y < info["rows"]):
+            return None
+        path = self._entry(src) / "tiles" / str(level) / f"{x}_{y}.{info['format']}"
+        return path if path.exists() else None
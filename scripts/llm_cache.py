@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of LLM chat replies.
+
+Entries are keyed by (model, temperature, prompt text, sha256 of each attached
+image) and stored as small JSON blobs under the cache root, with a JSON
+manifest holding per-entry size, creation and last access time. Entries older
+than the TTL are treated as misses; total size is bounded by LRU eviction.
+Safe to share between the worker threads of one LLMClient.
+
+Usage (inspect / trim):
+  python3 scripts/llm_cache.py --stats
+  python3 scripts/llm_cache.py --evict --max-mb 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "LLM_CACHE_DIR",
+    str(Path.home() / ".cache" / "clawd-slots" / "llm"),
+)
+DEFAULT_MAX_MB = 256
+DEFAULT_TTL_DAYS = 30.0
+
+
+def content_fingerprint(content: List[Dict[str, Any]]) -> List[str]:
+    """Prompt parts with images replaced by the sha256 of their (data) URL."""
+    parts: List[str] = []
+    for part in content:
+        if part.get("type") == "image_url":
+            url = str(part.get("image_url", {}).get("url", ""))
+            parts.append("image:" + hashlib.sha256(url.encode("utf-8")).hexdigest())
+        else:
+            parts.append("text:" + str(part.get("text", "")))
+    return parts
+
+
+class LLMCache:
+    def __init__(
+        self,
+        root: Path | str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_MB << 20,
+        ttl_seconds: float = DEFAULT_TTL_DAYS * 86400,
+    ) -> None:
+        self.root = Path(root).expanduser().resolve()
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.manifest_path = self.root / "manifest.json"
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if self.manifest_path.exists():
+            try:
+                data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+                self._entries = dict(data.get("entries", {}))
+            except (OSError, ValueError):
+                print(f"[WARN] Ignoring unreadable LLM cache manifest: {self.manifest_path}")
+
+    @staticmethod
+    def key(model: str, temperature: float, content: List[Dict[str, Any]]) -> str:
+        raw = json.dumps(
+            {"model": model, "temperature": temperature, "content": content_fingerprint(content)},
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _blob_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _drop(self, key: str) -> None:
+        self._blob_path(key).unlink(missing_ok=True)
+        self._entries.pop(key, None)
+        self._dirty = True
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached reply text, or None (missing, expired or unreadable)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - float(entry.get("created", 0.0)) > self.ttl_seconds:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            try:
+                reply = json.loads(self._blob_path(key).read_text(encoding="utf-8"))["reply"]
+            except (OSError, ValueError, KeyError):
+                self._drop(key)
+                self.misses += 1
+                return None
+            entry["last_access"] = time.time()
+            self._dirty = True
+            self.hits += 1
+            return str(reply)
+
+    def put(self, key: str, reply: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        dest = self._blob_path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f"{dest.name}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"reply": reply}), encoding="utf-8")
+        os.replace(tmp, dest)
+        now = time.time()
+        entry = {"bytes": dest.stat().st_size, "created": now, "last_access": now}
+        if meta:
+            entry.update(meta)
+        with self._lock:
+            self._entries[key] = entry
+            self._dirty = True
+
+    def total_bytes(self) -> int:
+        return sum(int(e.get("bytes", 0)) for e in self._entries.values())
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones until under max_bytes."""
+        with self._lock:
+            now = time.time()
+            removed = 0
+            for key in [k for k, e in self._entries.items() if now - float(e.get("created", 0.0)) > self.ttl_seconds]:
+                self._drop(key)
+                removed += 1
+            total = self.total_bytes()
+            for key, entry in sorted(self._entries.items(), key=lambda kv: kv[1].get("last_access", 0.0)):
+                if total <= self.max_bytes:
+                    break
+                total -= int(entry.get("bytes", 0))
+                self._drop(key)
+                removed += 1
+            return removed
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+            tmp.write_text(json.dumps({"version": 1, "entries": self._entries}), encoding="utf-8")
+            os.replace(tmp, self.manifest_path)
+            self._dirty = False
+
+    def summary(self) -> str:
+        return f"LLM cache: {self.hits} hits, {self.misses} misses"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect or trim the LLM response cache.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--max-mb", type=int, default=DEFAULT_MAX_MB)
+    parser.add_argument("--ttl-days", type=float, default=DEFAULT_TTL_DAYS)
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--evict", action="store_true", help="Drop expired entries and LRU entries down to --max-mb.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache = LLMCache(args.cache_dir, max_bytes=args.max_mb << 20, ttl_seconds=args.ttl_days * 86400)
+    if args.evict:
+        removed = cache.evict()
+        cache.save()
+        print(f"Evicted {removed} entries")
+    print(f"Cache: {cache.root}")
+    print(f"Entries: {len(cache)}  Size: {cache.total_bytes() / (1 << 20):.2f} MB / {args.max_mb} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Bounded concurrent client for the Moonshot (OpenAI-compatible) chat API.
+
+- A thread pool of --llm-concurrency workers issues requests in parallel
+  (map() keeps input order).
+- A token bucket caps the request rate across all workers.
+- 429/5xx responses and connection errors are retried with full-jitter
+  exponential backoff, honouring Retry-After.
+- Each worker thread keeps one persistent HTTP/1.1 connection, so TLS setup is
+  paid once per worker instead of once per request.
+- With an LLMCache attached, replies are reused across runs for the same
+  (model, temperature, prompt, images).
+- Images are attached through a PayloadEncoder (downscaled, re-encoded).
+
+A local stub of /chat/completions is included for offline testing:
+  python3 scripts/llm_client.py --stub-port 8765            # serve the stub
+  python3 scripts/llm_client.py --selftest 40 --concurrency 8 --fail-rate 0.2
+  MOONSHOT_API_KEY=x python3 scripts/extract_symbols_from_annotations.py \\
+      --llm-label --moonshot-base-url http://127.0.0.1:8765/v1
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+from urllib.parse import urlparse
+
+from llm_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_MB, DEFAULT_TTL_DAYS, LLMCache
+from llm_payload import PayloadEncoder, add_payload_args, encoder_from_args
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RPS = 2.0
+DEFAULT_RETRIES = 4
+DEFAULT_TIMEOUT = 45.0
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` banked."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, burst if burst is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def message_text(data: Dict[str, Any]) -> str:
+    """Assistant text from a chat completion (content may be a list of parts)."""
+    text = data["choices"][0]["message"]["content"]
+    if isinstance(text, list):
+        text = "".join([x.get("text", "") for x in text if isinstance(x, dict)])
+    return str(text).strip()
+
+
+def parse_json_reply(text: str) -> Any:
+    """json.loads a reply, tolerating a ```json fenced block."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.lower().startswith("json"):
+            text = text[4:].strip()
+    return json.loads(text)
+
+
+class LLMClient:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rps: float = DEFAULT_RPS,
+        retries: int = DEFAULT_RETRIES,
+        timeout: float = DEFAULT_TIMEOUT,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        cache: Optional[LLMCache] = None,
+        payload: Optional[PayloadEncoder] = None,
+    ) -> None:
+        parsed = urlparse(base_url.rstrip("/"))
+        if parsed.scheme not in ("http", "https"):
+            raise SystemExit(f"Unsupported LLM base URL: {base_url}")
+        self.scheme = parsed.scheme
+        self.netloc = parsed.netloc
+        self.path = f"{parsed.path}/chat/completions"
+        self.api_key = api_key
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.retries = max(1, retries)
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rps, burst=max(1.0, rps))
+        self.cache = cache
+        self.payload = payload or PayloadEncoder(send_originals=True)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+
+    def _connection(self, fresh: bool = False) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and not fresh:
+            return conn
+        if conn is not None:
+            conn.close()
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = cls(self.netloc, timeout=self.timeout)
+        self._local.conn = conn
+        return conn
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0.0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def complete(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST one chat completion (model filled in); returns the decoded response."""
+        body = json.dumps({"model": self.model, **payload}).encode("utf-8")
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+        }
+        error: Optional[str] = None
+        for attempt in range(self.retries):
+            if attempt:
+                self._count("retried")
+            self.bucket.acquire()
+            self._count("requests")
+            retry_after = None
+            try:
+                conn = self._connection()
+                conn.request("POST", self.path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                if resp.status == 200:
+                    return json.loads(data)
+                error = f"HTTP {resp.status}: {data[:200]!r}"
+                if resp.status not in RETRY_STATUS:
+                    break
+                retry_after = resp.getheader("Retry-After")
+                if resp.getheader("Connection", "").lower() == "close":
+                    self._connection(fresh=True)
+            except (OSError, http.client.HTTPException, ValueError) as exc:
+                error = f"{type(exc).__name__}: {exc}"
+                self._connection(fresh=True)
+            if attempt + 1 < self.retries:
+                time.sleep(self._backoff(attempt, retry_after))
+        self._count("failed")
+        raise LLMError(error or "request failed")
+
+    def chat(
+        self,
+        content: List[Dict[str, Any]],
+        temperature: float = 0,
+        parse: Optional[Callable[[str], Any]] = None,
+    ) -> Any:
+        """Send one user message (list of content parts); return the reply text.
+
+        With `parse`, returns parse(text); a reply is only cached once it parses,
+        so malformed answers are asked again on the next run.
+        """
+        key = LLMCache.key(self.model, temperature, content) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                try:
+                    return parse(cached) if parse else cached
+                except (ValueError, TypeError, AttributeError):
+                    pass
+        data = self.complete({"temperature": temperature, "messages": [{"role": "user", "content": content}]})
+        text = message_text(data)
+        result = parse(text) if parse else text
+        if key is not None:
+            self.cache.put(key, text, {"model": self.model})
+        return result
+
+    def image_part(self, path: Path) -> Dict[str, Any]:
+        """image_url content part for a local image, prepared by the payload encoder."""
+        return self.payload.image_part(path)
+
+    def map(self, fn: Callable[[T], R], items: Sequence[T]) -> List[R]:
+        """fn(item) for every item on the worker pool, results in input order."""
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(items))) as pool:
+            return list(pool.map(fn, items))
+
+    def summary(self) -> str:
+        line = f"LLM: {self.requests} requests, {self.retried} retries, {self.failed} failed"
+        if self.cache is not None:
+            line += f"; {self.cache.summary()}"
+        if self.payload.images:
+            line += f"; {self.payload.summary()}"
+        return line
+
+    def close(self) -> None:
+        """Persist and trim the response cache."""
+        if self.cache is not None:
+            self.cache.evict()
+            self.cache.save()
+
+
+def client_from_args(args: argparse.Namespace) -> Optional[LLMClient]:
+    """LLMClient for an extractor's --llm-* options, or None when MOONSHOT_API_KEY is unset."""
+    api_key = os.environ.get("MOONSHOT_API_KEY")
+    if not api_key:
+        return None
+    cache = None
+    if not args.no_llm_cache:
+        cache = LLMCache(
+            args.llm_cache_dir,
+            max_bytes=args.llm_cache_max_mb << 20,
+            ttl_seconds=args.llm_cache_ttl_days * 86400,
+        )
+    return LLMClient(
+        args.moonshot_base_url,
+        api_key,
+        args.llm_model,
+        concurrency=args.llm_concurrency,
+        rps=args.llm_rps,
+        retries=args.llm_retries,
+        cache=cache,
+        payload=encoder_from_args(args),
+    )
+
+
+def add_llm_client_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--llm-concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Parallel LLM requests.")
+    parser.add_argument(
+        "--llm-rps", type=float, default=DEFAULT_RPS, help="Max LLM requests per second (0 = unlimited)."
+    )
+    parser.add_argument("--llm-retries", type=int, default=DEFAULT_RETRIES, help="Attempts per LLM request.")
+    parser.add_argument("--llm-cache-dir", default=DEFAULT_CACHE_DIR, help="LLM response cache directory.")
+    parser.add_argument("--llm-cache-max-mb", type=int, default=DEFAULT_MAX_MB)
+    parser.add_argument("--llm-cache-ttl-days", type=float, default=DEFAULT_TTL_DAYS)
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the LLM, even for cached prompts.")
+    add_payload_args(parser)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal /chat/completions emulation.
+
+    One image gets a JSON object label; several images get a JSON array with one
+    {"index", "label", "reason"} per image, or a truncated (unparseable) array
+    when there are more than `max_images`.
+    """
+
+    protocol_version = "HTTP/1.1"
+    fail_rate = 0.0
+    latency = 0.0
+    max_images = 0
+    counter = 0
+    lock = threading.Lock()
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        return
+
+    def _send(self, status: int, obj: Dict[str, Any], extra: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (extra or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self._send(401, {"error": {"message": "missing api key"}})
+            return
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            self._send(429, {"error": {"message": "rate limited"}}, {"Retry-After": "0"})
+            return
+        with self.lock:
+            StubHandler.counter += 1
+            n = StubHandler.counter
+        parts = payload.get("messages", [{}])[-1].get("content", [])
+        images = sum(1 for p in parts if isinstance(p, dict) and p.get("type") == "image_url")
+        if images > 1:
+            reply = json.dumps(
+                [{"index": i, "label": f"stub_{n}_{i}", "reason": "stub"} for i in range(1, images + 1)]
+            )
+            if self.max_images and images > self.max_images:
+                reply = reply[: len(reply) // 2]
+        else:
+            reply = json.dumps({"label": f"stub_{n}", "reason": "stub", "pick": 1})
+        self._send(
+            200,
+            {
+                "id": f"stub-{n}",
+                "object": "chat.completion",
+                "model": payload.get("model", ""),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            },
+        )
+
+
+def start_stub_server(
+    port: int = 0, fail_rate: float = 0.0, latency: float = 0.0, max_images: int = 0
+) -> ThreadingHTTPServer:
+    StubHandler.fail_rate = fail_rate
+    StubHandler.latency = latency
+    StubHandler.max_images = max_images
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Moonshot chat client stub server and self-test.")
+    parser.add_argument("--stub-port", type=int, default=None, help="Serve the stub API on this port until Ctrl-C.")
+    parser.add_argument("--selftest", type=int, default=0, help="Send N requests to an in-process stub and report.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rps", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of stub replies that are HTTP 429.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub response latency in seconds.")
+    parser.add_argument(
+        "--max-images", type=int, default=0, help="Stub garbles replies to messages with more images (0 = never)."
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.stub_port is not None:
+        server = start_stub_server(args.stub_port, args.fail_rate, args.latency, args.max_images)
+        print(f"Stub /chat/completions on http://127.0.0.1:{server.server_address[1]}/v1 (Ctrl-C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+    if args.selftest <= 0:
+        raise SystemExit("Nothing to do: pass --stub-port or --selftest N")
+
+    server = start_stub_server(0, args.fail_rate, args.latency, args.max_images)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    for concurrency in sorted({1, args.concurrency}):
+        client = LLMClient(
+            base_url, "stub", "stub-model", concurrency=concurrency, rps=args.rps, backoff_base=0.05, retries=8
+        )
+        started = time.perf_counter()
+        replies = client.map(
+            lambda i: parse_json_reply(client.chat([{"type": "text", "text": f"item {i}"}])), range(args.selftest)
+        )
+        elapsed = time.perf_counter() - started
+        ok = sum(1 for r in replies if isinstance(r, dict) and r.get("label"))
+        print(
+            f"concurrency={concurrency:<3} {ok}/{args.selftest} ok in {elapsed:.2f}s "
+            f"({args.selftest / max(elapsed, 1e-9):.1f} req/s)  {client.summary()}"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Image payload preparation for LLM requests.
+
+Images are downscaled so their longest edge is at most --llm-max-edge and
+re-encoded as JPEG/WebP at --llm-image-quality before being base64-embedded
+as data URIs. The encoded bytes are cached on disk, keyed by the source file
+content and the encode settings, so reruns skip the resize/encode. If the
+re-encoded image would be larger than the original (tiny PNG crops), the
+original is sent instead. --llm-send-originals bypasses all of this when
+fidelity matters; without opencv-python/numpy installed the originals are sent
+too (with one warning).
+
+The cache is capped at --llm-payload-cache-max-mb: cache hits refresh a file's mtime,
+and once the cap is exceeded the least recently used files are deleted.
+
+Per-run byte savings are reported through PayloadEncoder.summary().
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+cv2 = None
+np = None
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "LLM_PAYLOAD_CACHE_DIR",
+    str(Path.home() / ".cache" / "clawd-slots" / "llm-payloads"),
+)
+DEFAULT_MAX_EDGE = 1024
+DEFAULT_FORMAT = "jpeg"
+DEFAULT_QUALITY = 85
+DEFAULT_CACHE_MAX_MB = int(os.environ.get("LLM_PAYLOAD_CACHE_MAX_MB", "512"))
+# After an eviction the cache is trimmed to this fraction of the cap, so the next
+# few writes do not trigger another directory scan.
+CACHE_LOW_WATER = 0.9
+
+MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+}
+FORMATS = {"jpeg": ".jpg", "webp": ".webp", "png": ".png"}
+
+
+def lazy_imports() -> None:
+    global cv2, np
+    try:
+        import cv2 as _cv2  # type: ignore
+        import numpy as _np
+    except ImportError as exc:  # pragma: no cover
+        raise ImportError(
+            "Missing dependency: opencv-python (cv2) and numpy are required to re-encode LLM images.\n"
+            "Install with: pip install opencv-python numpy (or pass --llm-send-originals)"
+        ) from exc
+    cv2 = _cv2
+    np = _np
+
+
+class PayloadEncoder:
+    def __init__(
+        self,
+        max_edge: int = DEFAULT_MAX_EDGE,
+        fmt: str = DEFAULT_FORMAT,
+        quality: int = DEFAULT_QUALITY,
+        send_originals: bool = False,
+        cache_dir: Path | str = DEFAULT_CACHE_DIR,
+        cache_max_mb: int = DEFAULT_CACHE_MAX_MB,
+    ) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown image format: {fmt} (choose from {', '.join(FORMATS)})")
+        self.max_edge = max_edge
+        self.fmt = fmt
+        self.quality = quality
+        self.send_originals = send_originals
+        self.cache_dir = Path(cache_dir).expanduser().resolve()
+        self.cache_max_bytes = max(0, cache_max_mb) << 20
+        self._lock = threading.Lock()
+        self._codec_ok: Optional[bool] = None
+        self._cache_bytes: Optional[int] = None
+        self.evicted = 0
+        self.images = 0
+        self.cached = 0
+        self.original_bytes = 0
+        self.sent_bytes = 0
+
+    def _count(self, original: int, sent: int, cached: bool) -> None:
+        with self._lock:
+            self.images += 1
+            self.cached += int(cached)
+            self.original_bytes += original
+            self.sent_bytes += sent
+
+    def _codec_available(self) -> bool:
+        """Whether cv2/numpy can be imported; checked once, with one warning if not."""
+        with self._lock:
+            if self._codec_ok is None:
+                try:
+                    lazy_imports()
+                    self._codec_ok = True
+                except ImportError:
+                    print("[WARN] opencv-python/numpy not installed; sending original images to the LLM")
+                    self._codec_ok = False
+            return self._codec_ok
+
+    def _encode(self, raw: bytes) -> bytes:
+        image = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return raw
+        h, w = image.shape[:2]
+        if self.max_edge > 0 and max(h, w) > self.max_edge:
+            scale = self.max_edge / float(max(h, w))
+            size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        if self.fmt == "jpeg":
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        elif self.fmt == "webp":
+            params = [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        else:
+            params = [cv2.IMWRITE_PNG_COMPRESSION, 9]
+        ok, buf = cv2.imencode(FORMATS[self.fmt], image, params)
+        return buf.tobytes() if ok else raw
+
+    def encode(self, path: Path) -> Tuple[bytes, str]:
+        """(bytes, mime type) to send for the image at `path`."""
+        raw = Path(path).read_bytes()
+        original_mime = MIME_TYPES.get(Path(path).suffix.lower(), "image/png")
+        if self.send_originals or not self._codec_available():
+            self._count(len(raw), len(raw), False)
+            return raw, original_mime
+
+        key_src = f"{hashlib.sha256(raw).hexdigest()}|{self.max_edge}|{self.fmt}|{self.quality}"
+        key = hashlib.sha256(key_src.encode("utf-8")).hexdigest()
+        blob = self.cache_dir / key[:2] / f"{key}{FORMATS[self.fmt]}"
+        try:
+            data = blob.read_bytes()
+            cached = True
+        except FileNotFoundError:
+            data = self._encode(raw)
+            cached = False
+            self._store(blob, data)
+        else:
+            try:
+                os.utime(blob)  # mtime is the LRU clock
+            except OSError:
+                pass
+        if len(data) >= len(raw):
+            self._count(len(raw), len(raw), cached)
+            return raw, original_mime
+        self._count(len(raw), len(data), cached)
+        return data, MIME_TYPES[FORMATS[self.fmt]]
+
+    def _cache_files(self) -> Iterator[Tuple[int, int, Path]]:
+        for blob in self.cache_dir.glob("*/*"):
+            if blob.name.endswith(".tmp"):
+                continue
+            try:
+                st = blob.stat()
+            except OSError:
+                continue
+            yield st.st_mtime_ns, st.st_size, blob
+
+    def _store(self, blob: Path, data: bytes) -> None:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(f"{blob.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, blob)
+        if self.cache_max_bytes <= 0:
+            return
+        with self._lock:
+            if self._cache_bytes is None:
+                self._cache_bytes = sum(size for _, size, _ in self._cache_files())
+            else:
+                self._cache_bytes += len(data)
+            if self._cache_bytes > self.cache_max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used cache files down to the low-water mark; caller holds the lock."""
+        files = sorted(self._cache_files())
+        total = sum(size for _, size, _ in files)
+        target = int(self.cache_max_bytes * CACHE_LOW_WATER)
+        for _, size, blob in files:
+            if total <= target:
+                break
+            try:
+                blob.unlink()
+            except OSError:
+                continue
+            total -= size
+            self.evicted += 1
+        self._cache_bytes = total
+
+    def data_uri(self, path: Path) -> str:
+        data, mime = self.encode(path)
+        return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+
+    def image_part(self, path: Path) -> Dict[str, Any]:
+        """OpenAI-style image_url content part for `path`."""
+        return {"type": "image_url", "image_url": {"url": self.data_uri(path)}}
+
+    def summary(self) -> str:
+        saved = self.original_bytes - self.sent_bytes
+        pct = 100.0 * saved / self.original_bytes if self.original_bytes else 0.0
+        return (
+            f"Payload: {self.images} images, {self.original_bytes / 1024:.0f} KB -> {self.sent_bytes / 1024:.0f} KB "
+            f"({pct:.0f}% saved, {self.cached} from cache)"
+        )
+
+
+def add_payload_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--llm-max-edge",
+        type=int,
+        default=DEFAULT_MAX_EDGE,
+        help="Downscale LLM images to this longest edge (0 = keep).",
+    )
+    parser.add_argument("--llm-image-format", choices=sorted(FORMATS), default=DEFAULT_FORMAT)
+    parser.add_argument("--llm-image-quality", type=int, default=DEFAULT_QUALITY, help="JPEG/WebP quality (1-100).")
+    parser.add_argument(
+        "--llm-send-originals", action="store_true", help="Send the original image files without re-encoding."
+    )
+    parser.add_argument(
+        "--llm-payload-cache-max-mb",
+        type=int,
+        default=DEFAULT_CACHE_MAX_MB,
+        help="Size cap of the re-encoded image cache; least recently used files are evicted (0 = no cap).",
+    )
+
+
+def encoder_from_args(args: argparse.Namespace) -> PayloadEncoder:
+    return PayloadEncoder(
+        max_edge=args.llm_max_edge,
+        fmt=args.llm_image_format,
+        quality=args.llm_image_quality,
+        send_originals=args.llm_send_originals,
+        cache_max_mb=args.llm_payload_cache_max_mb,
+    )
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Batched 64-bit perceptual hashes for symbol crops.
+
+Each crop is converted to grayscale and resized once; the comparison bits for
+the whole batch are then computed as one boolean array and packed with
+np.packbits into a uint64 array (bit i = i-th comparison in row-major order,
+the same layout dhash64 has always produced).
+
+Methods:
+- dhash  horizontal gradient sign on a 9x8 thumbnail (the default dedup hash)
+- ahash  pixel above the mean of an 8x8 thumbnail
+- phash  low-frequency 8x8 DCT block of a 32x32 thumbnail above its median;
+         the sturdiest of the three against rescaling and compression noise
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Sequence
+
+cv2 = None
+np = None
+
+HASH_SIZE = 8
+PHASH_SIZE = 32
+
+_DCT_ROWS = None
+
+
+def lazy_imports() -> None:
+    global cv2, np
+    try:
+        import cv2 as _cv2  # type: ignore
+        import numpy as _np
+    except ImportError as exc:  # pragma: no cover
+        raise SystemExit(
+            "Missing dependency: opencv-python (cv2) and numpy are required.\n"
+            "Install with: pip install opencv-python numpy"
+        ) from exc
+    cv2 = _cv2
+    np = _np
+
+
+def _thumbnails(crops: Sequence["np.ndarray"], width: int, height: int) -> "np.ndarray":
+    """(N, height, width) uint8 grayscale thumbnails."""
+    if cv2 is None:
+        lazy_imports()
+    out = np.empty((len(crops), height, width), dtype=np.uint8)
+    for i, crop in enumerate(crops):
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        out[i] = cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+    return out
+
+
+def pack_bits(bits: "np.ndarray") -> "np.ndarray":
+    """Pack an (N, 64) boolean array into N uint64 values, bit i from column i."""
+    packed = np.packbits(bits.reshape(len(bits), 64), axis=1, bitorder="little")
+    return packed.view("<u8").reshape(-1).astype(np.uint64)
+
+
+def dhash_batch(crops: Sequence["np.ndarray"]) -> "np.ndarray":
+    thumbs = _thumbnails(crops, HASH_SIZE + 1, HASH_SIZE)
+    return pack_bits(thumbs[:, :, 1:] > thumbs[:, :, :-1])
+
+
+def ahash_batch(crops: Sequence["np.ndarray"]) -> "np.ndarray":
+    thumbs = _thumbnails(crops, HASH_SIZE, HASH_SIZE).reshape(len(crops), -1).astype(np.float32)
+    return pack_bits(thumbs > thumbs.mean(axis=1, keepdims=True))
+
+
+def _dct_rows() -> "np.ndarray":
+    """First HASH_SIZE rows of the orthonormal DCT-II matrix of size PHASH_SIZE."""
+    global _DCT_ROWS
+    if _DCT_ROWS is None:
+        k = np.arange(HASH_SIZE, dtype=np.float64)[:, None]
+        n = np.arange(PHASH_SIZE, dtype=np.float64)[None, :]
+        rows = np.cos(np.pi * (2 * n + 1) * k / (2 * PHASH_SIZE)) * np.sqrt(2.0 / PHASH_SIZE)
+        rows[0] /= np.sqrt(2.0)
+        _DCT_ROWS = rows
+    return _DCT_ROWS
+
+
+def phash_batch(crops: Sequence["np.ndarray"]) -> "np.ndarray":
+    thumbs = _thumbnails(crops, PHASH_SIZE, PHASH_SIZE).astype(np.float64)
+    d = _dct_rows()
+    low = np.einsum("ki,nij,lj->nkl", d, thumbs, d).reshape(len(crops), -1)
+    # The DC term only tracks brightness; leave it out of the median.
+    median = np.median(low[:, 1:], axis=1, keepdims=True)
+    return pack_bits(low > median)
+
+
+HASHERS: Dict[str, Callable[[Sequence["np.ndarray"]], "np.ndarray"]] = {
+    "dhash": dhash_batch,
+    "ahash": ahash_batch,
+    "phash": phash_batch,
+}
+
+
+def hash_batch(crops: Sequence["np.ndarray"], method: str = "dhash") -> "np.ndarray":
+    """uint64 hashes for a list of BGR (or grayscale) crops."""
+    if method not in HASHERS:
+        raise SystemExit(f"Unknown hash method: {method} (choose from {', '.join(HASHERS)})")
+    if np is None:
+        lazy_imports()
+    if not crops:
+        return np.empty(0, dtype=np.uint64)
+    return HASHERS[method](crops)
+
+
+def to_ints(hashes: "np.ndarray") -> List[int]:
+    return hashes.tolist()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Persistent perceptual-hash index of extracted symbol crops (SQLite).
+
+Every crop kept by extract_symbols_from_annotations.py is recorded with its
+video, source frame, rect, hash method, 64-bit hash and the label of the symbol
+it was deduplicated into. The best crop of each symbol is flagged as that
+symbol's representative; later runs (on the same or another video) seed the
+dedup with those representatives, so crops of already-labeled symbols join the
+known symbol directly and are not re-clustered or sent to the LLM again.
+
+The index is opt-in (extract_symbols_from_annotations.py --symbol-index) and
+lives at yt/symbol-index.sqlite by default (shared by all videos). Labels are
+unique across the index; unnamed symbols get a label derived from their hash.
+
+Usage (inspect):
+  python3 scripts/symbol_index.py --stats
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+INDEX_NAME = "symbol-index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crops (
+    id INTEGER PRIMARY KEY,
+    video TEXT NOT NULL,
+    frame_name TEXT NOT NULL,
+    rect_idx INTEGER NOT NULL,
+    x1 INTEGER NOT NULL,
+    y1 INTEGER NOT NULL,
+    x2 INTEGER NOT NULL,
+    y2 INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    hash INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    llm_labeled INTEGER NOT NULL DEFAULT 0,
+    is_rep INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    UNIQUE (video, frame_name, rect_idx, x1, y1, x2, y2, method)
+);
+CREATE INDEX IF NOT EXISTS crops_reps ON crops (method, is_rep);
+"""
+
+
+def _to_sql(value: int) -> int:
+    """SQLite integers are signed 64-bit; store uint64 hashes in two's complement."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _from_sql(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+@dataclass
+class KnownSymbol:
+    hash64: int
+    label: str
+    video: str
+    frame_name: str
+    llm_labeled: bool
+
+
+@dataclass
+class IndexedCrop:
+    video: str
+    frame_name: str
+    rect_idx: int
+    x1: int
+    y1: int
+    x2: int
+    y2: int
+    hash64: int
+    label: str
+    llm_labeled: bool
+    is_rep: Optional[bool]  # None: keep the stored flag (crop joined an already-known symbol)
+
+
+class SymbolIndex:
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path).expanduser().resolve()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def known_symbols(self, method: str, llm_only: bool = False) -> List[KnownSymbol]:
+        """Representatives recorded for `method`, oldest first."""
+        sql = "SELECT hash, label, video, frame_name, llm_labeled FROM crops WHERE method = ? AND is_rep = 1"
+        if llm_only:
+            sql += " AND llm_labeled = 1"
+        rows = self.conn.execute(sql + " ORDER BY id", (method,)).fetchall()
+        return [KnownSymbol(_from_sql(h), label, video, frame, bool(llm)) for h, label, video, frame, llm in rows]
+
+    def labels(self, method: str) -> Set[str]:
+        return {label for (label,) in self.conn.execute("SELECT DISTINCT label FROM crops WHERE method = ?", (method,))}
+
+    def record(self, method: str, crops: Iterable[IndexedCrop]) -> int:
+        """Insert or update crops; returns the number written.
+
+        A crop's is_rep is overwritten unless it is None, so a crop that stops
+        being its symbol's best crop loses the flag.
+        """
+        now = time.time()
+        crops = list(crops)
+        rows = [
+            (
+                c.video,
+                c.frame_name,
+                c.rect_idx,
+                c.x1,
+                c.y1,
+                c.x2,
+                c.y2,
+                method,
+                _to_sql(c.hash64),
+                c.label,
+                int(c.llm_labeled),
+                int(bool(c.is_rep)),
+                now,
+            )
+            for c in crops
+        ]
+        insert = (
+            "INSERT INTO crops (video, frame_name, rect_idx, x1, y1, x2, y2, method, hash, label,"
+            " llm_labeled, is_rep, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (video, frame_name, rect_idx, x1, y1, x2, y2, method) DO UPDATE SET"
+            " hash = excluded.hash, label = excluded.label, llm_labeled = excluded.llm_labeled,"
+            " updated = excluded.updated"
+        )
+        with self.conn:
+            self.conn.executemany(
+                insert + ", is_rep = excluded.is_rep", [r for r, c in zip(rows, crops) if c.is_rep is not None]
+            )
+            self.conn.executemany(insert, [r for r, c in zip(rows, crops) if c.is_rep is None])
+        return len(rows)
+
+    def stats(self) -> List[Tuple[str, str, int, int]]:
+        """(video, method, crops, representatives) per video and hash method."""
+        return self.conn.execute(
+            "SELECT video, method, COUNT(*), SUM(is_rep) FROM crops GROUP BY video, method ORDER BY video, method"
+        ).fetchall()
+
+
+def default_index_path(yt_base_dir: str) -> Path:
+    return Path(yt_base_dir).expanduser().resolve() / INDEX_NAME
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Inspect the persistent symbol hash index.")
+    parser.add_argument(
+        "--yt-base-dir",
+        default=os.environ.get("YT_BASE_DIR", "/workspaces/clawd-slots-assets-pipeline/yt"),
+    )
+    parser.add_argument("--index", default=None, help=f"Index path (default: <yt-base-dir>/{INDEX_NAME})")
+    parser.add_argument("--stats", action="store_true", help="Print per-video counts (default action).")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    path = Path(args.index).expanduser().resolve() if args.index else default_index_path(args.yt_base_dir)
+    if not path.exists():
+        raise SystemExit(f"Symbol index not found: {path}")
+    index = SymbolIndex(path)
+    print(f"Index: {index.path}")
+    for video, method, crops, reps in index.stats():
+        print(f"{video:<24} {method:<6} crops={crops:<6} symbols={reps}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
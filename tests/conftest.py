@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The scripts are standalone CLIs, not a package; import them by module name.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
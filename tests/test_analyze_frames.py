@@ -0,0 +1,120 @@
+import base64
+import json
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import analyze_frames
+from llm_client import StubHandler
+
+
+class RecordingHandler(StubHandler):
+    """Stub that records which frame each request carried and fails frames listed in `fail`."""
+
+    sent = []
+    fail = set()
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        parts = json.loads(raw)["messages"][-1]["content"]
+        url = next(p["image_url"]["url"] for p in parts if p.get("type") == "image_url")
+        frame = base64.b64decode(url.split(",", 1)[1]).decode("utf-8")
+        with self.lock:
+            RecordingHandler.sent.append(frame)
+        if frame in self.fail:
+            self._send(400, {"error": {"message": "bad frame"}})
+            return
+        self._send(
+            200,
+            {"choices": [{"index": 0, "message": {"role": "assistant", "content": f"analysis of {frame}"}}]},
+        )
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    RecordingHandler.sent = []
+    RecordingHandler.fail = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("MOONSHOT_API_KEY", "x")
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def frames(tmp_path):
+    frames_dir = tmp_path / "frames"
+    frames_dir.mkdir()
+    for i in range(1, 5):
+        (frames_dir / f"f{i}.png").write_bytes(f"f{i}".encode("utf-8"))
+    return frames_dir
+
+
+def run(monkeypatch, url, frames_dir, *extra):
+    argv = ["analyze_frames.py", str(frames_dir), "--moonshot-base-url", url, "--llm-rps", "0"]
+    argv += ["--llm-send-originals", "--no-llm-cache", "--llm-concurrency", "2", *extra]
+    monkeypatch.setattr(sys, "argv", argv)
+    RecordingHandler.sent = []
+    analyze_frames.analyze_frames()
+    return sorted(RecordingHandler.sent)
+
+
+def sections(output):
+    return [line[4:] for line in output.read_text(encoding="utf-8").splitlines() if line.startswith("### f")]
+
+
+def checkpointed(output):
+    checkpoint = output.with_name(output.name + ".progress.jsonl")
+    return sorted(json.loads(line)["frame"] for line in checkpoint.read_text(encoding="utf-8").splitlines())
+
+
+def test_interrupted_run_resumes_without_resending(monkeypatch, stub, frames):
+    output = frames.parent / "analysis.md"
+    assert run(monkeypatch, stub, frames, "--limit", "2") == ["f1", "f2"]
+    # A crash mid-write leaves a torn checkpoint line; it must not hide or duplicate anything.
+    with output.with_name("analysis.md.progress.jsonl").open("a", encoding="utf-8") as fh:
+        fh.write('{"frame": "f3.pn')
+
+    assert run(monkeypatch, stub, frames) == ["f3", "f4"]
+    assert sorted(sections(output)) == ["f1.png", "f2.png", "f3.png", "f4.png"]
+    assert output.read_text(encoding="utf-8").count("# Slot Machine Frame Analysis") == 1
+
+    monkeypatch.delenv("MOONSHOT_API_KEY")  # nothing pending: no key needed, nothing sent
+    assert run(monkeypatch, stub, frames) == []
+
+
+def test_changed_frame_section_is_replaced_once(monkeypatch, stub, frames):
+    output = frames.parent / "analysis.md"
+    run(monkeypatch, stub, frames)
+    (frames / "f2.png").write_bytes(b"f2-new")
+
+    assert run(monkeypatch, stub, frames) == ["f2-new"]
+    assert sorted(sections(output)) == ["f1.png", "f2.png", "f3.png", "f4.png"]
+    text = output.read_text(encoding="utf-8")
+    assert "analysis of f2-new" in text and "analysis of f2\n" not in text
+    assert checkpointed(output) == ["f1.png", "f2.png", "f3.png", "f4.png"]
+    assert run(monkeypatch, stub, frames) == []
+
+
+def test_failed_request_is_not_checkpointed(monkeypatch, stub, frames):
+    output = frames.parent / "analysis.md"
+    RecordingHandler.fail = {"f3"}
+    assert run(monkeypatch, stub, frames) == ["f1", "f2", "f3", "f4"]
+    assert checkpointed(output) == ["f1.png", "f2.png", "f4.png"]
+    assert "f3.png" not in sections(output)
+
+    RecordingHandler.fail = set()
+    assert run(monkeypatch, stub, frames) == ["f3"]
+    assert sorted(sections(output)) == ["f1.png", "f2.png", "f3.png", "f4.png"]
+
+
+def test_header_added_to_hand_written_file(monkeypatch, stub, frames):
+    output = frames.parent / "analysis.md"
+    output.write_text("my notes\n", encoding="utf-8")
+    run(monkeypatch, stub, frames, "--limit", "1")
+    text = output.read_text(encoding="utf-8")
+    assert text.startswith("my notes\n") and text.count("# Slot Machine Frame Analysis") == 1
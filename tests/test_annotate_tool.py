@@ -0,0 +1,127 @@
+import os
+from email.utils import formatdate
+from http import HTTPStatus
+
+import pytest
+
+from annotate_tool import AnnotateApp, HotFileCache, Request, file_etag, parse_range
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, SIZE - 1)),
+        ("bytes=900-5000", (900, SIZE - 1)),  # end clamped to the file
+        ("bytes=-100", (900, SIZE - 1)),  # suffix range
+        ("bytes=-5000", (0, SIZE - 1)),  # suffix longer than the file
+        ("BYTES = 5-5", (5, 5)),
+        ("bytes=0-1,5-9", None),  # multi-range: whole file
+        ("bytes=5-2", None),  # inverted: ignored
+        ("bytes=a-b", None),
+        ("bytes=-", None),
+        ("items=0-1", None),
+        ("bytes=0", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize("header, size", [("bytes=1000-", SIZE), ("bytes=-0", SIZE), ("bytes=-10", 0)])
+def test_parse_range_unsatisfiable(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+
+def test_hot_file_cache_lru_byte_cap():
+    cache = HotFileCache(800)  # max_file_bytes = 100
+    assert cache.max_file_bytes == 100
+    cache.put(("big", 1, 1), b"x" * 101)
+    assert cache.get(("big", 1, 1)) is None and cache.total == 0
+
+    for i in range(8):
+        cache.put((f"f{i}", 100, 0), bytes([i]) * 100)
+    assert cache.total == 800
+    assert cache.get(("f0", 100, 0)) == bytes([0]) * 100  # f0 becomes most recent
+    cache.put(("f8", 100, 0), b"8" * 100)
+    assert cache.get(("f1", 100, 0)) is None  # least recently used went first
+    assert cache.get(("f0", 100, 0)) is not None
+    assert cache.total == 800
+
+    cache.put(("f0", 100, 0), b"0" * 50)  # replacing an entry re-counts its size
+    assert cache.total == 750
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+@pytest.fixture
+def app(tmp_path):
+    (tmp_path / "frame.png").write_bytes(bytes(range(256)) * 4)
+    return AnnotateApp(tmp_path)
+
+
+def get(app, **headers):
+    return app.handle(Request("GET", "/api/image?path=frame.png", {k.replace("_", "-"): v for k, v in headers.items()}))
+
+
+def validators(app):
+    st = (app.root / "frame.png").stat()
+    return file_etag(st), formatdate(st.st_mtime, usegmt=True)
+
+
+def test_conditional_get(app):
+    etag, last_modified = validators(app)
+    first = get(app)
+    assert first.status == HTTPStatus.OK and dict(first.headers)["ETag"] == etag
+
+    assert get(app, if_none_match=etag).status == HTTPStatus.NOT_MODIFIED
+    assert get(app, if_none_match=f'"nope", {etag}').status == HTTPStatus.NOT_MODIFIED  # ETag list
+    assert get(app, if_none_match=f"W/{etag}").status == HTTPStatus.NOT_MODIFIED
+    assert get(app, if_none_match="*").status == HTTPStatus.NOT_MODIFIED
+    assert get(app, if_none_match='"nope"').status == HTTPStatus.OK
+    # If-None-Match wins over If-Modified-Since.
+    assert get(app, if_none_match='"nope"', if_modified_since=last_modified).status == HTTPStatus.OK
+    assert get(app, if_modified_since=last_modified).status == HTTPStatus.NOT_MODIFIED
+    assert get(app, if_modified_since=formatdate(0, usegmt=True)).status == HTTPStatus.OK
+    assert get(app, if_modified_since="not a date").status == HTTPStatus.OK
+
+
+def test_ranges(app):
+    etag, last_modified = validators(app)
+    part = get(app, range="bytes=-24")
+    assert part.status == HTTPStatus.PARTIAL_CONTENT
+    assert dict(part.headers)["Content-Range"] == "bytes 1000-1023/1024"
+    assert part.body == bytes(range(232, 256))
+
+    missed = get(app, range="bytes=4096-")
+    assert missed.status == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+    assert dict(missed.headers)["Content-Range"] == "bytes */1024"
+
+    assert get(app, range="bytes=0-9", if_range=etag).status == HTTPStatus.PARTIAL_CONTENT
+    assert get(app, range="bytes=0-9", if_range=last_modified).status == HTTPStatus.PARTIAL_CONTENT
+    stale = get(app, range="bytes=0-9", if_range='"old"')  # If-Range mismatch: full body
+    assert stale.status == HTTPStatus.OK and len(stale.body) == 1024
+
+
+def test_changed_file_is_not_served_from_cache(app):
+    path = app.root / "frame.png"
+    assert get(app).body == path.read_bytes()
+    st = path.stat()
+    path.write_bytes(b"new" * 100)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert get(app).body == b"new" * 100
+
+
+def test_tile_removed_before_serving_is_404(app, tmp_path):
+    class GonePyramid:
+        def tile(self, src, level, x, y):
+            return tmp_path / "dropped" / "0_0.png"
+
+        def close(self):
+            pass
+
+    app.pyramid = GonePyramid()
+    resp = app.handle(Request("GET", "/api/tile?path=frame.png&level=0&x=0&y=0", {}))
+    assert resp.status == HTTPStatus.NOT_FOUND
@@ -0,0 +1,47 @@
+import os
+
+from dir_index import DirIndex
+
+
+def touch(path, data=b"x"):
+    path.write_bytes(data)
+
+
+def test_previews_are_not_listed_as_frames(tmp_path):
+    for name in ("frame_0001.png", "frame_0001_annotated.png", "frame_0001_annotated.json", "frame_0002.jpg"):
+        touch(tmp_path / name)
+    index = DirIndex(use_inotify=False)
+
+    assert index.page(tmp_path) == ([("frame_0001.png", True), ("frame_0002.jpg", False)], 2)
+    assert index.page(tmp_path, status="unannotated") == ([("frame_0002.jpg", False)], 1)
+    assert index.page(tmp_path, status="annotated") == ([("frame_0001.png", True)], 1)
+
+
+def test_incremental_updates_skip_previews(tmp_path):
+    touch(tmp_path / "frame_0001.png")
+    index = DirIndex(use_inotify=False)
+    listing = index._get(tmp_path)
+
+    listing.added("frame_0001_annotated.png")
+    listing.added("frame_0001_annotated.json")
+    listing.added("frame_0003.png")
+    assert listing.page("", "unannotated", 0, 10) == ([("frame_0003.png", False)], 1)
+
+    listing.removed("frame_0001_annotated.png")
+    listing.removed("frame_0001_annotated.json")
+    assert listing.page("", "all", 0, 10) == ([("frame_0001.png", False), ("frame_0003.png", False)], 2)
+
+
+def test_mtime_poll_rescans_and_pages(tmp_path):
+    for i in range(5):
+        touch(tmp_path / f"frame_{i:04d}.png")
+    index = DirIndex(use_inotify=False)
+    assert index.page(tmp_path, limit=2, offset=1) == ([("frame_0001.png", False), ("frame_0002.png", False)], 5)
+    assert index.page(tmp_path, prefix="frame_0004") == ([("frame_0004.png", False)], 1)
+
+    touch(tmp_path / "frame_0004_annotated.json")
+    touch(tmp_path / "frame_0004_annotated.png")
+    st = os.stat(tmp_path)
+    os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert index.page(tmp_path, status="annotated") == ([("frame_0004.png", True)], 1)
+    assert index.scans == 2
@@ -0,0 +1,74 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+import extract_symbol_boundaries as esb  # noqa: E402
+
+esb.lazy_imports()
+
+AREA = (0.0005, 0.9)
+ASPECT = (0.1, 10.0)
+
+
+def synthetic_mask() -> np.ndarray:
+    mask = np.zeros((120, 160), dtype=np.uint8)
+    mask[0:15, 0:20] = 255  # touches the top-left corner
+    mask[100:120, 140:160] = 255  # touches the bottom-right corner
+    mask[50:70, 0:12] = 255  # touches the left edge
+    cv2.rectangle(mask, (40, 20), (90, 70), 255, 2)  # ring: its hole holds a nested blob
+    mask[35:50, 55:75] = 255
+    mask[30:60, 110:140] = 255  # solid blob with a hole
+    mask[40:50, 120:130] = 0
+    mask[80, 60] = mask[81, 61] = mask[82, 62] = 255  # 8-connected diagonal
+    mask[85:95, 20:30] = 255  # two blobs whose first pixels share a row
+    mask[85:90, 40:48] = 255
+    mask[0:6, 70:150] = 255  # touches the top edge
+    return mask
+
+
+def contour_boxes(mask: np.ndarray) -> list:
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return [tuple(int(v) for v in cv2.boundingRect(c)) for c in contours]
+
+
+def contour_scores(mask: np.ndarray) -> list:
+    """The per-contour loop detect_candidates used before it was vectorized."""
+    h, w = mask.shape[:2]
+    frame_area = float(h * w)
+    raw_boxes = []
+    for x, y, cw, ch in contour_boxes(mask):
+        area = float(cw * ch)
+        area_ratio = area / frame_area
+        if area_ratio < AREA[0] or area_ratio > AREA[1]:
+            continue
+        aspect = cw / max(1.0, float(ch))
+        if aspect < ASPECT[0] or aspect > ASPECT[1]:
+            continue
+        patch = mask[y : y + ch, x : x + cw]
+        edge_density = float(np.count_nonzero(patch)) / max(1.0, area)
+        cx = x + cw / 2.0
+        cy = y + ch / 2.0
+        center_bias = 1.0 - (abs(cx - w / 2.0) / (w / 2.0) * 0.35 + abs(cy - h / 2.0) / (h / 2.0) * 0.65)
+        area_bonus = min(1.0, area_ratio / 0.12)
+        score = max(0.0, center_bias) * 0.45 + min(1.0, edge_density * 2.0) * 0.25 + area_bonus * 0.30
+        raw_boxes.append((x, y, cw, ch, score))
+    return raw_boxes
+
+
+def test_external_boxes_match_find_contours():
+    mask = synthetic_mask()
+    assert [tuple(int(v) for v in b) for b in esb.external_boxes(mask)] == contour_boxes(mask)
+
+
+def test_external_boxes_empty_mask():
+    assert esb.external_boxes(np.zeros((10, 10), dtype=np.uint8)).shape == (0, 4)
+
+
+def test_scores_and_nms_match_contour_loop():
+    mask = synthetic_mask()
+    got = esb.score_boxes(mask, esb.external_boxes(mask), *AREA, *ASPECT)
+    want = contour_scores(mask)
+    assert [b[:4] for b in got] == [b[:4] for b in want]
+    assert [b[4] for b in got] == pytest.approx([b[4] for b in want])
+    assert [b[:4] for b in esb.nms_boxes(got)] == [b[:4] for b in esb.nms_boxes(want)]
@@ -0,0 +1,90 @@
+import http.client
+import json
+import os
+
+import pytest
+
+import fetch_video
+from fetch_video import ChunkedDownload, LocalDirBackend, fetch_video as fetch
+
+CHUNK = 1000
+
+
+class RecordingBackend(LocalDirBackend):
+    """LocalDirBackend that records ranges and can fail chunks on demand."""
+
+    def __init__(self, root, fail=None):
+        super().__init__(root)
+        self.starts = []
+        self.fail = fail or (lambda start: None)
+
+    def read_range(self, name, start, end):
+        self.starts.append(start)
+        exc = self.fail(start)
+        if exc is not None:
+            raise exc
+        return super().read_range(name, start, end)
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    root = tmp_path / "mirror"
+    root.mkdir()
+    (root / "CLIP.webm").write_bytes(os.urandom(3 * CHUNK + 500))
+    return root
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(fetch_video.time, "sleep", lambda _s: None)
+
+
+def test_interrupted_download_resumes_missing_chunks(tmp_path, mirror, monkeypatch):
+    dest = tmp_path / "out" / "CLIP.webm"
+    dest.parent.mkdir()
+    interrupted = RecordingBackend(mirror, fail=lambda start: RuntimeError("cut") if start else None)
+    with pytest.raises(RuntimeError):
+        ChunkedDownload(interrupted, "CLIP.webm", dest, CHUNK, workers=1).run()
+    assert not dest.exists()
+    state = json.loads(dest.with_name("CLIP.webm.part.json").read_text())
+    assert state["done"] == [0]
+
+    resumed = RecordingBackend(mirror)
+    monkeypatch.setattr(fetch_video, "make_backend", lambda source: resumed)
+    digest = fetch("CLIP", dest, source=str(mirror), chunk_size=CHUNK, workers=2)
+
+    assert sorted(resumed.starts) == [CHUNK, 2 * CHUNK, 3 * CHUNK]
+    assert dest.read_bytes() == (mirror / "CLIP.webm").read_bytes()
+    assert not dest.with_name("CLIP.webm.part.json").exists()
+    manifest = json.loads((dest.parent / fetch_video.CHECKSUM_MANIFEST).read_text())
+    assert manifest["CLIP.webm"]["sha256"] == digest == fetch_video.sha256_file(mirror / "CLIP.webm")
+    assert manifest["CLIP.webm"]["size"] == dest.stat().st_size
+
+    # --verify re-hashes the file against the manifest; a corrupt copy is downloaded again.
+    assert fetch("CLIP", dest, source=str(mirror), chunk_size=CHUNK, verify=True) == digest
+    dest.write_bytes(b"corrupt" + dest.read_bytes()[7:])
+    assert fetch("CLIP", dest, source=str(mirror), chunk_size=CHUNK, verify=True) == digest
+    assert dest.read_bytes() == (mirror / "CLIP.webm").read_bytes()
+
+
+def test_dropped_connection_is_retried(tmp_path, mirror):
+    failures = {CHUNK: 1}
+
+    def fail(start):
+        if failures.get(start):
+            failures[start] -= 1
+            return http.client.IncompleteRead(b"partial", 100)
+        return None
+
+    backend = RecordingBackend(mirror, fail=fail)
+    dest = tmp_path / "CLIP.webm"
+    ChunkedDownload(backend, "CLIP.webm", dest, CHUNK, workers=1).run()
+    assert backend.starts.count(CHUNK) == 2
+    assert dest.read_bytes() == (mirror / "CLIP.webm").read_bytes()
+
+
+def test_checksum_mismatch_is_rejected(tmp_path, mirror):
+    dest = tmp_path / "CLIP.webm"
+    with pytest.raises(SystemExit):
+        fetch("CLIP", dest, source=str(mirror), chunk_size=CHUNK, expected_sha256="0" * 64)
+    assert not dest.exists()
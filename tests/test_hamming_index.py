@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from hamming_index import HammingIndex, cluster_by_hamming, cluster_naive, hamming, sampled_comparison, synthetic_hashes
+
+
+@pytest.mark.parametrize("threshold", [0, 1, 4, 8, 12, 40])
+def test_clusters_match_nested_loop(threshold):
+    hashes = synthetic_hashes(3000, threshold, seed=threshold)
+    assert cluster_by_hamming(hashes, threshold) == cluster_naive(hashes, threshold)
+
+
+def test_first_within_returns_smallest_id():
+    rng = random.Random(3)
+    index = HammingIndex(6)
+    stored = [rng.getrandbits(64) for _ in range(500)]
+    for value in stored:
+        index.add(value)
+    for _ in range(500):
+        query = rng.choice(stored) ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+        expected = next((i for i, h in enumerate(stored) if hamming(query, h) <= 6), None)
+        assert index.first_within(query) == expected
+    assert HammingIndex(40).linear and not HammingIndex(8).linear
+
+
+def test_seeds_take_the_first_clusters():
+    seed = 0xFFFF_0000_FFFF_0000
+    clusters = cluster_by_hamming([seed ^ 1, 0x1234, seed ^ 3], 4, seeds=[seed, 0])
+    assert clusters == [[0, 2], [], [1]]
+
+
+def test_sampled_comparison_agrees():
+    hashes = synthetic_hashes(2000, 8)
+    assert sampled_comparison(hashes, cluster_by_hamming(hashes, 8), 8, 300).endswith("same")
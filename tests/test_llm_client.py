@@ -0,0 +1,146 @@
+import argparse
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import llm_client
+from llm_client import LLMClient, LLMError, StubHandler, TokenBucket, add_llm_client_args, client_from_args
+
+
+class ScriptedHandler(StubHandler):
+    """Stub that first answers with the queued (status, headers) failures."""
+
+    script = []
+    seen = 0
+
+    def do_POST(self):
+        with self.lock:
+            ScriptedHandler.seen += 1
+            step = ScriptedHandler.script.pop(0) if ScriptedHandler.script else None
+        if step is None:
+            return super().do_POST()
+        self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        status, headers = step
+        self._send(status, {"error": {"message": "scripted"}}, headers)
+
+
+@pytest.fixture
+def stub():
+    ScriptedHandler.script = []
+    ScriptedHandler.seen = 0
+    StubHandler.fail_rate = StubHandler.latency = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the client's backoff sleeps instead of waiting them out."""
+    recorded = []
+    real_sleep = time.sleep
+
+    def sleep(seconds):
+        if threading.current_thread() is threading.main_thread():
+            recorded.append(seconds)
+        else:  # the stub's handler threads share the time module
+            real_sleep(seconds)
+
+    monkeypatch.setattr(llm_client.time, "sleep", sleep)
+    return recorded
+
+
+def make_client(url, **kwargs):
+    kwargs.setdefault("rps", 0)
+    return LLMClient(url, "key", "stub-model", **kwargs)
+
+
+def ask(client, text="hi"):
+    return json.loads(client.chat([{"type": "text", "text": text}]))
+
+
+def test_retries_429_and_5xx_honouring_retry_after(stub, sleeps):
+    ScriptedHandler.script = [(429, {"Retry-After": "2.5"}), (503, {})]
+    client = make_client(stub, retries=4, backoff_base=0.01)
+
+    assert ask(client)["label"].startswith("stub_")
+    assert ScriptedHandler.seen == 3
+    assert (client.requests, client.retried, client.failed) == (3, 2, 0)
+    assert sleeps[0] == 2.5
+    assert 0.0 <= sleeps[1] <= 0.02  # no Retry-After: full-jitter backoff
+
+
+def test_retry_after_is_capped(stub, sleeps):
+    ScriptedHandler.script = [(429, {"Retry-After": "600"})]
+    ask(make_client(stub, backoff_max=5.0))
+    assert sleeps == [5.0]
+
+
+def test_gives_up_after_retries(stub, sleeps):
+    ScriptedHandler.script = [(500, {})] * 3
+    client = make_client(stub, retries=3)
+    with pytest.raises(LLMError, match="HTTP 500"):
+        ask(client)
+    assert (client.requests, client.failed) == (3, 1)
+    assert len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried(stub, sleeps):
+    ScriptedHandler.script = [(400, {})]
+    client = make_client(stub)
+    with pytest.raises(LLMError, match="HTTP 400"):
+        ask(client)
+    assert ScriptedHandler.seen == 1 and sleeps == []
+
+
+def test_token_bucket_rate():
+    bucket = TokenBucket(20.0, burst=1)
+    started = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    elapsed = time.monotonic() - started
+    assert 0.45 <= elapsed < 1.5  # one banked token, then 10 more at 20/s
+
+    unlimited = TokenBucket(0)
+    started = time.monotonic()
+    for _ in range(1000):
+        unlimited.acquire()
+    assert time.monotonic() - started < 0.5
+
+
+def test_map_keeps_input_order(stub):
+    client = make_client(stub, concurrency=4)
+
+    def slow_first(i):
+        time.sleep((8 - i) * 0.01)
+        return i, ask(client, f"item {i}")["label"]
+
+    results = client.map(slow_first, list(range(8)))
+    assert [i for i, _ in results] == list(range(8))
+    assert len({label for _, label in results}) == 8
+    assert client.map(slow_first, []) == []
+
+
+def parse(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-model", default="stub-model")
+    parser.add_argument("--moonshot-base-url", default="http://127.0.0.1:1/v1")
+    add_llm_client_args(parser)
+    return parser.parse_args(argv)
+
+
+def test_client_from_args_requires_api_key(monkeypatch, tmp_path):
+    monkeypatch.delenv("MOONSHOT_API_KEY", raising=False)
+    assert client_from_args(parse([])) is None
+
+    monkeypatch.setenv("MOONSHOT_API_KEY", "x")
+    client = client_from_args(parse(["--llm-cache-dir", str(tmp_path), "--llm-concurrency", "3"]))
+    assert isinstance(client, LLMClient)
+    assert client.concurrency == 3 and client.cache is not None
+    assert client_from_args(parse(["--no-llm-cache"])).cache is None
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+import llm_payload
+from llm_payload import PayloadEncoder
+
+
+def test_no_codec_sends_originals(tmp_path, monkeypatch, capsys):
+    def missing() -> None:
+        raise ImportError("no cv2")
+
+    monkeypatch.setattr(llm_payload, "lazy_imports", missing)
+    image = tmp_path / "frame.png"
+    image.write_bytes(b"\x89PNG not really")
+    encoder = PayloadEncoder(cache_dir=tmp_path / "cache")
+    for _ in range(3):
+        assert encoder.encode(image) == (image.read_bytes(), "image/png")
+    assert capsys.readouterr().out.count("[WARN]") == 1
+    assert encoder.images == 3 and encoder.sent_bytes == encoder.original_bytes
+    assert not (tmp_path / "cache").exists()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    encoder = PayloadEncoder(cache_dir=tmp_path, cache_max_mb=0)
+    encoder.cache_max_bytes = 250
+    blobs = [tmp_path / "ab" / f"{i}.jpg" for i in range(3)]
+    for i, blob in enumerate(blobs):
+        encoder._store(blob, b"x" * 100)
+        os.utime(blob, ns=(i * 10**9, i * 10**9))
+    assert [b.exists() for b in blobs] == [False, True, True]
+    assert encoder.evicted == 1 and encoder._cache_bytes == 200
+
+
+def test_encode_downscales_and_caches(tmp_path):
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+    image = tmp_path / "frame.png"
+    cv2.imwrite(str(image), rng.integers(0, 256, (900, 1600, 3), dtype=np.uint8))
+    encoder = PayloadEncoder(max_edge=512, fmt="jpeg", quality=80, cache_dir=tmp_path / "cache")
+
+    data, mime = encoder.encode(image)
+    assert mime == "image/jpeg"
+    decoded = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape[:2] == (288, 512)
+    assert len(data) < image.stat().st_size
+
+    assert encoder.encode(image) == (data, mime)
+    assert encoder.cached == 1
+    assert encoder.data_uri(image).startswith("data:image/jpeg;base64,")